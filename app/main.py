@@ -1,44 +1,64 @@
 # app/main.py
 
 import os
+import re
+import hmac
+import hashlib
 import json
+import time
 import uuid
 import random
-import traceback
+import asyncio
+import weakref
+import contextlib
+from collections import OrderedDict
 
 from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Form, Depends, status
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from starlette.datastructures import Headers, MutableHeaders
 import httpx
-from app.services.github_listener import GitHubListener
 from app.services.analyzer import ProjectAnalyzer
+from app.models.project import ProjectRecord, AnalysisRecord
 from app.services.scoring import ScoringEngine
-from app.services.cv_writer import CVWriter
-from app.services.cv_parser import CVParser
-from docx2pdf import convert as docx_to_pdf_convert
+from app.services.cv_parser import CVParser, UploadTooLargeError, SUPPORTED_CV_EXTENSIONS
+from app.services.cv_cache import ParsedCVCache
+from app.services.cv_bulk import BulkCVIngestor, BulkLimitError
+from app.services.rate_limit import AsyncRateLimiter
+from app.services.profile_repository import ProfileRepository
+from app.services.auth_tokens import IdTokenCache, keep_id_token_certs_warm
+from app.services.mailer import MailQueue
+from app.services.json_payload import compact_json_response
+from app.services.metrics import REGISTRY, HTTP_REQUEST_SECONDS, HTTP_IN_FLIGHT
+from app.services.memory_watch import MemoryWatch
+from app.services.structured_logging import configure_logging, correlation_scope, get_logger
+from app.services.pdf_renderer import PDFRenderer, PDFRenderError
+from app.services.render_cache import RenderCache
+from app.services.resume_builder import ResumeBuilder
+from app.services.resume_renderers import TEXT_FORMATS, render_text
 from dotenv import load_dotenv
 
 # Kage: The initial read of the environment. Foundation for operations.
 load_dotenv()
 
+# Kage: Logs flow through a queue to a background writer. No request waits on the console.
+configure_logging(os.getenv("LOG_LEVEL", "INFO"), os.getenv("LOG_FORMAT", "json"))
+logger = get_logger("app")
+
 # Kage: Confirming the presence of vital components. Silence is not always absence.
-print(f"[Kage] Gemini API state: {'(absent)' if not os.getenv('GEMINI_API') else 'present'}")
+logger.info("Gemini API state: %s", '(absent)' if not os.getenv('GEMINI_API') else 'present')
 
 # Firebase Imports - The anchor to data persistence.
+# Kage: Only what every request needs. The Firestore client, and grpc with it, loads in startup.
 import firebase_admin
-from firebase_admin import credentials, firestore, auth
+from firebase_admin import auth
 from firebase_admin.exceptions import FirebaseError
 
 # Decoding tokens. A necessary step for trust.
 import jwt
 
-# Communication channel for validation.
-import smtplib
-from email.mime.text import MIMEText
-from email.header import Header
-
 # Shaping URLs. Precision in redirection.
 from urllib.parse import quote_plus
 
@@ -61,15 +81,15 @@ GITHUB_USER_EMAILS_API = "https://api.github.com/user/emails"
 GITHUB_SCOPES = "user:email,repo"
 FIREBASE_GITHUB_AUTH_HANDLER = f"https://{os.getenv('__app_id')}.firebaseapp.com/__/auth/handler"
 
-# Kage: Email transmission parameters. For vital communications.
-SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.example.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
-SMTP_USERNAME = os.getenv("SMTP_USERNAME", "your_email@example.com")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "your_email_password")
-SENDER_EMAIL = os.getenv("SENDER_EMAIL", "no-reply@kaku-ryu.com")
+# Kage: Email transmission parameters. For vital communications. Unset, the mail path stays closed.
+SMTP_SERVER = os.getenv("SMTP_SERVER")
+SMTP_PORT = int(os.getenv("SMTP_PORT") or 587)
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SENDER_EMAIL = os.getenv("SENDER_EMAIL")
 
 # Kage: Global data structures. The persistent memory.
-db = None
+db = None  # The Firestore client. Set in startup; None while persistence is dormant.
 user_cv_data_template = {
     "name": "Guest User",
     "email": "guest@example.com",
@@ -92,12 +112,81 @@ user_cv_data_template = {
 OUTPUT_DIR = "output"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Kage: The largest CV the gate will accept.
+MAX_CV_UPLOAD_BYTES = int(os.getenv("MAX_CV_UPLOAD_BYTES", 10 * 1024 * 1024))
+# Kage: Local memory of absorbed CVs. Survives restarts as long as the disk does.
+KAKU_CACHE_DIR = os.getenv("KAKU_CACHE_DIR", ".kaku-cache")
+# Kage: Extracted CV text is personal data. It is kept this long, within this much disk.
+CV_CACHE_TTL = float(os.getenv("CV_CACHE_TTL", 7 * 24 * 3600))
+CV_CACHE_MAX_BYTES = int(os.getenv("CV_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Kage: Bulk ingestion. Archives may be larger than one CV; each member still obeys the single-CV cap.
+MAX_BULK_CV_FILES = int(os.getenv("MAX_BULK_CV_FILES", 500))
+MAX_BULK_ARCHIVE_BYTES = int(os.getenv("MAX_BULK_ARCHIVE_BYTES", 200 * 1024 * 1024))
+BULK_CV_CONCURRENCY = int(os.getenv("BULK_CV_CONCURRENCY", 8))
+# Kage: What one request may hold in memory. Uploads past the budget wait on disk; README and commit text past it is not fetched.
+MAX_UPLOAD_MEMORY_BYTES = int(os.getenv("MAX_UPLOAD_MEMORY_BYTES", 16 * 1024 * 1024))
+MAX_README_CHARS = int(os.getenv("MAX_README_CHARS", 16000))
+MAX_PROJECT_TEXT_CHARS = int(os.getenv("MAX_PROJECT_TEXT_CHARS", 4_000_000))
+# Kage: Allocation tracking, from startup when set. An administrator may also switch it at /admin/memory/tracing.
+TRACEMALLOC_AT_STARTUP = os.getenv("TRACEMALLOC", "").lower() in ("1", "true", "yes")
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", 10))
+# Kage: The pace the Gemini quota allows for CV parsing.
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 60))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 4))
+# Kage: Where the external services live. Overridden for GitHub Enterprise, or the stand-ins of benchmarks/e2e.py.
+GITHUB_API_URL = os.getenv("GITHUB_API_URL") or None
+# Kage: PyGithub's pause between requests. Unset keeps its default; the benchmark sets 0 against its stand-in.
+GITHUB_SECONDS_BETWEEN_REQUESTS = float(os.getenv("GITHUB_SECONDS_BETWEEN_REQUESTS")) if os.getenv("GITHUB_SECONDS_BETWEEN_REQUESTS") else None
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", ProjectAnalyzer.API_BASE).rstrip("/")
+# Kage: Upstream record/replay. "record" keeps every GitHub and Gemini exchange in the cassette, tokens masked;
+# "replay" answers from it and sends nothing out.
+CASSETTE_MODE = os.getenv("KAKU_CASSETTE_MODE", "").strip().lower() or None
+CASSETTE_PATH = os.getenv("KAKU_CASSETTE_PATH", os.path.join(KAKU_CACHE_DIR, "cassettes", "upstream.jsonl"))
+CASSETTE_REPLAY_LATENCY = os.getenv("KAKU_CASSETTE_REPLAY_LATENCY", "").lower() in ("1", "true", "yes")
+# Kage: When set, /metrics answers only to this bearer token.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Kage: Administrators, by Firebase uid. A token with the custom claim admin=true also qualifies.
+ADMIN_UIDS = {uid.strip() for uid in os.getenv("KAKU_ADMIN_UIDS", "").split(",") if uid.strip()}
+# Kage: On-demand request profiling. Asked for with this header, or ?profile=1, by an administrator.
+PROFILE_HEADER = "X-Kaku-Profile"
+PROFILE_DIR = os.path.join(KAKU_CACHE_DIR, "profiles")
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", 0.001))
+MAX_STORED_PROFILES = int(os.getenv("MAX_STORED_PROFILES", 50))
+# Kage: The project listing. Evaluations are remembered briefly so pages of one listing agree.
+PROJECTS_CACHE_TTL = float(os.getenv("PROJECTS_CACHE_TTL", 300))
+MAX_CACHED_EVALUATIONS = int(os.getenv("MAX_CACHED_EVALUATIONS", 256))
+# Kage: A stored evaluation younger than this answers in place of a new one, on any instance. 0 never reads it.
+STORED_ANALYSIS_MAX_AGE = float(os.getenv("STORED_ANALYSIS_MAX_AGE", 3600))
+DEFAULT_PROJECTS_PAGE_SIZE = int(os.getenv("DEFAULT_PROJECTS_PAGE_SIZE", 50))
+MAX_PROJECTS_PAGE_SIZE = int(os.getenv("MAX_PROJECTS_PAGE_SIZE", 200))
+# Kage: What a project looks like on the wire unless more is asked for. README text and commit history stay home.
+PROJECT_COMPACT_FIELDS = (
+    "id", "name", "html_url", "description", "is_private", "stargazers_count", "forks_count", "languages",
+    "last_pushed_at", "summary", "skills", "technologies", "achievements", "keywords",
+    "estimated_complexity_qualitative", "score",
+)
+
+# Kage: The forms the user may receive.
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PDF_MEDIA_TYPE = "application/pdf"
+RESUME_FORMATS = ("pdf", "docx", "html", "md", "json")
+DEFAULT_RESUME_TEMPLATE = "default"
+# Kage: Templates are only what is named: a directory kept for them, or comma-separated .docx paths. Nothing by default.
+RESUME_TEMPLATE_DIR = os.getenv("RESUME_TEMPLATE_DIR") or None
+RESUME_TEMPLATE_FILES = [path.strip() for path in os.getenv("RESUME_TEMPLATE_FILES", "").split(",") if path.strip()]
+RESUME_CACHE_CONTROL = "private, no-cache"
+
 # Kage: Core tools, dormant until activated.
-github_listener = None
 project_analyzer = None
 scoring_engine = None
 cv_writer = None
 cv_parser = None
+pdf_renderer = None
+render_cache = None
+resume_builder = None
+request_profiler = None
+upstream_cassette = None
+_cv_writer_lock = asyncio.Lock()
 
 # Kage: Token scheme. A conceptual layer for access control.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -110,29 +199,138 @@ initial_auth_token = os.getenv('__initial_auth_token')
 raw_frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:8000')
 FRONTEND_URL = raw_frontend_url.split('#')[0].strip().strip('"\'')
 
-# Kage: Initializing Firebase. The first breath of the data connection.
-if not firebase_admin._apps:
+def initialize_firebase():
+    """
+    Kage: Initializing Firebase. The first breath of the data connection.
+    Runs in startup, not at import, so importing the application stays cheap.
+
+    Returns:
+        The Firestore client, or None if Firebase is unconfigured or failed.
+    """
+    from firebase_admin import credentials, firestore
+
     try:
-        if firebase_config_str:
+        if not firebase_admin._apps:
+            if not firebase_config_str:
+                logger.warning("Firebase configuration absent. Data persistence remains dormant.")
+                return None
             processed_firebase_config_str = firebase_config_str.replace('\n', '\\n')
             firebase_config = json.loads(processed_firebase_config_str)
             if "private_key" in firebase_config and isinstance(firebase_config["private_key"], str):
                 firebase_config["private_key"] = firebase_config["private_key"].replace("\\n", "\n")
             cred = credentials.Certificate(firebase_config)
             firebase_admin.initialize_app(cred)
-            db = firestore.client()
-            print("[Kage] Firebase initialized. The data path is open.")
-        else:
-            print("[Kage] Firebase configuration absent. Data persistence remains dormant.")
+        client = firestore.client()
+        logger.info("Firebase initialized. The data path is open.")
+        return client
     except json.JSONDecodeError as e:
-        print(f"[Kage] Firebase config: JSON corrupted. Error: {e}")
-        db = None
+        logger.warning("Firebase config: JSON corrupted. Error: %s", e)
     except Exception as e:
-        print(f"[Kage] Firebase initialization failed: {e}. Path remains unclear.")
-        db = None
+        logger.warning("Firebase initialization failed: %s. Path remains unclear.", e)
+    return None
+
+# Kage: Every Firestore round trip goes through the repository, off the event loop.
+# Its client is attached in startup.
+profile_repository = ProfileRepository(
+    None, app_id, user_cv_data_template,
+    max_workers=int(os.getenv("FIRESTORE_WORKERS", 8)),
+    cache_ttl=float(os.getenv("PROFILE_CACHE_TTL", 30)),
+)
+
+# Kage: Outbound mail. One worker, one kept-alive SMTP connection, retries with backoff.
+mail_queue = MailQueue(
+    SMTP_SERVER,
+    SMTP_PORT,
+    SMTP_USERNAME,
+    SMTP_PASSWORD,
+    SENDER_EMAIL,
+    use_starttls=os.getenv("SMTP_STARTTLS", "true").lower() != "false",
+    max_attempts=int(os.getenv("SMTP_MAX_ATTEMPTS", 4)),
+    batch_size=int(os.getenv("SMTP_BATCH_SIZE", 20)),
+)
+
+# Kage: Verified ID tokens, trusted until they expire.
+id_token_cache = IdTokenCache(auth.verify_id_token, max_entries=int(os.getenv("ID_TOKEN_CACHE_SIZE", 4096)))
+
+# Kage: Per-route memory peaks. Idle until tracing starts.
+memory_watch = MemoryWatch(frames=TRACEMALLOC_FRAMES)
+
+class RequestMiddleware:
+    """
+    Kage: What surrounds every request, as one pure ASGI layer, outermost first:
 
-# Kage: Current status of the data connection. A silent affirmation.
-print(f"[Kage] Data persistence status: {'Active' if db else 'Inactive'}")
+    - timing and in-flight count, labelled by route template rather than raw path;
+    - a correlation id, the caller's X-Request-ID if it sent one, on every log record
+      of the request and back in the response;
+    - one read of each profile per request (ProfileRepository.request_scope);
+    - a sampling profiler, only when an administrator asked for it (PROFILE_HEADER or
+      ?profile=1), up to the response's first byte;
+    - the request's memory peak against its route template, only while tracing.
+
+    A feature that is off costs a check, not a layer.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = (headers.get("x-request-id") or uuid.uuid4().hex)[:64]
+        route_of = lambda: getattr(scope.get("route"), "path", "unmatched")
+        status_code = 500
+        profiling = None
+
+        async def send_with_headers(message):
+            nonlocal status_code, profiling
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append("X-Request-ID", request_id)
+                if profiling is not None:
+                    stack, record = profiling
+                    profiling = None
+                    await stack.aclose()
+                    response_headers.append("X-Kaku-Profile-Id", record["id"] or "busy")
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            with correlation_scope(request_id), ProfileRepository.request_scope():
+                if headers.get(PROFILE_HEADER) or (b"profile=" in scope.get("query_string", b"") and Request(scope).query_params.get("profile") == "1"):
+                    profiling = await self._start_profile(scope)
+                try:
+                    if memory_watch.tracing:
+                        with memory_watch.track(route_of):
+                            await self.app(scope, receive, send_with_headers)
+                    else:
+                        await self.app(scope, receive, send_with_headers)
+                finally:
+                    # Kage: A request that failed before its first byte is profiled too; it is often the interesting one.
+                    if profiling is not None:
+                        await profiling[0].aclose()
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route_of(), status=status_code)
+            HTTP_IN_FLIGHT.dec()
+
+    @staticmethod
+    async def _start_profile(scope):
+        """Kage: (exit stack, record) of a started profile, or None unless an administrator asked."""
+        request = Request(scope)
+        try:
+            admin_id = await get_admin_user_id(request)
+        except HTTPException:
+            return None
+        stack = contextlib.AsyncExitStack()
+        record = await stack.enter_async_context(
+            _get_request_profiler().profile(f"{request.method} {request.url.path}", user_id=admin_id)
+        )
+        return stack, record
+
+app.add_middleware(RequestMiddleware)
 
 # Kage: Dependency for user identification. The first gate.
 async def get_current_user_id(request: Request) -> str:
@@ -154,111 +352,186 @@ async def get_current_user_id(request: Request) -> str:
     if auth_header and auth_header.startswith("Bearer "):
         id_token_from_header = auth_header.split(" ")[1]
         try:
-            decoded_token = auth.verify_id_token(id_token_from_header)
+            decoded_token = await id_token_cache.verify(id_token_from_header)
             return decoded_token['uid']
         except (FirebaseError, Exception):
             pass # Kage: Silence failures, move to next.
     
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized. No valid path found.")
 
+async def get_admin_user_id(request: Request) -> str:
+    """
+    Kage: Admits administrators only. Unlike get_current_user_id, a verified bearer
+    token is required; the unverified URL token is never accepted here.
+    """
+    auth_header = request.headers.get("Authorization") or ""
+    if auth_header.startswith("Bearer "):
+        try:
+            claims = await id_token_cache.verify(auth_header.split(" ")[1])
+        except Exception:
+            claims = None
+        if claims and (claims.get("admin") is True or claims.get("uid") in ADMIN_UIDS):
+            return claims["uid"]
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Administrators only.")
+
+def _get_request_profiler():
+    """Kage: The request profiler, built when first asked for."""
+    global request_profiler
+    if request_profiler is None:
+        from app.services.request_profiler import RequestProfiler
+        request_profiler = RequestProfiler(PROFILE_DIR, interval=PROFILE_INTERVAL_SECONDS, max_profiles=MAX_STORED_PROFILES)
+    return request_profiler
+
 # Kage: Startup sequence. Activating the tools.
 @app.on_event("startup")
 async def startup_event():
-    global github_listener, project_analyzer, scoring_engine, cv_writer, cv_parser, db
+    global project_analyzer, scoring_engine, cv_parser, pdf_renderer, render_cache, resume_builder, db, upstream_cassette
+
+    if TRACEMALLOC_AT_STARTUP:
+        memory_watch.start()
+        logger.info("Allocation tracking active, %d frames per allocation.", memory_watch.frames)
+
+    db = initialize_firebase()
+    profile_repository.db = db
+    # Kage: Current status of the data connection. A silent affirmation.
+    logger.info("Data persistence status: %s", 'Active' if db else 'Inactive')
 
     # Kage: Initial user authentication. The first step on the path.
     if initial_auth_token:
         try:
             if db:
-                decoded_token = auth.verify_id_token(initial_auth_token)
+                decoded_token = await id_token_cache.verify(initial_auth_token)
                 app.state.initial_canvas_user_id = decoded_token['uid']
-                print(f"[Kage] Primary user authenticated: {app.state.initial_canvas_user_id}.")
+                logger.info("Primary user authenticated: %s.", app.state.initial_canvas_user_id)
             else:
-                print("[Kage] Firebase inactive. Cannot verify initial user token. Proceeding as ephemeral.")
+                logger.warning("Firebase inactive. Cannot verify initial user token. Proceeding as ephemeral.")
                 app.state.initial_canvas_user_id = str(uuid.uuid4())
         except FirebaseError:
-            print("[Kage] Initial token invalid. Proceeding as ephemeral.")
+            logger.warning("Initial token invalid. Proceeding as ephemeral.")
             app.state.initial_canvas_user_id = str(uuid.uuid4())
     else:
         app.state.initial_canvas_user_id = str(uuid.uuid4())
-        print(f"[Kage] No initial token. Operating as ephemeral entity: {app.state.initial_canvas_user_id}.")
+        logger.info("No initial token. Operating as ephemeral entity: %s.", app.state.initial_canvas_user_id)
 
-    # Kage: Tool activation sequence.
-    try:
-        github_listener = GitHubListener()
-        print("[Kage] GitHub Listener: Active.")
-    except Exception as e:
-        print(f"[Kage] GitHub Listener: Failure. {e}")
+    if mail_queue.configured:
+        mail_queue.start()
+        logger.info("Mail Queue: Active.")
+    else:
+        logger.warning("Mail Queue: Dormant. SMTP credentials missing.")
 
+    # Kage: Google's signing keys are fetched now and kept fresh, never on a user's request.
+    if db:
+        app.state.id_token_cert_task = asyncio.create_task(
+            keep_id_token_certs_warm(float(os.getenv("ID_TOKEN_CERT_REFRESH_SECONDS", 600)))
+        )
+
+    if CASSETTE_MODE:
+        try:
+            from app.services.cassette import Cassette
+            os.makedirs(os.path.dirname(CASSETTE_PATH) or ".", exist_ok=True)
+            upstream_cassette = Cassette(CASSETTE_PATH, CASSETTE_MODE, replay_latency=CASSETTE_REPLAY_LATENCY)
+        except (ValueError, OSError) as e:
+            logger.warning("Upstream cassette unavailable; GitHub and Gemini are called directly. %s", e)
+            upstream_cassette = None
+
+    # Kage: Tool activation sequence. GitHub listeners are made per user, with their own key.
+    # The CV Writer and its python-docx wait for the first forged document (see _get_cv_writer).
     try:
         gemini_api_key = os.getenv("GEMINI_API")
         if not gemini_api_key:
-            print("[Kage] GEMINI_API environment variable not set. Project Analyzer and CV Parser will be dormant.")
+            logger.warning("GEMINI_API environment variable not set. Project Analyzer and CV Parser will be dormant.")
             project_analyzer = None
             cv_parser = None
         else:
-            project_analyzer = ProjectAnalyzer(model_name="gemini-2.0-flash", api_key=gemini_api_key)
-            print("[Kage] Project Analyzer: Active.")
-            cv_parser = CVParser(model_name="gemini-2.0-flash", api_key=gemini_api_key)
-            print("[Kage] CV Parser: Active.")
+            project_analyzer = ProjectAnalyzer(model_name="gemini-2.0-flash", api_key=gemini_api_key, api_base=GEMINI_API_BASE, cassette=upstream_cassette)
+            logger.info("Project Analyzer: Active.")
+            cv_cache = None
+            try:
+                cv_cache = ParsedCVCache(KAKU_CACHE_DIR, ttl=CV_CACHE_TTL, max_bytes=CV_CACHE_MAX_BYTES)
+            except Exception as e:
+                logger.warning("Parsed CV Cache: Failure. %s", e)
+            gemini_rate_limiter = AsyncRateLimiter(GEMINI_REQUESTS_PER_MINUTE, GEMINI_MAX_CONCURRENCY)
+            cv_parser = CVParser(
+                api_url=f"{GEMINI_API_BASE}/models/gemini-2.0-flash:generateContent", model_name="gemini-2.0-flash",
+                api_key=gemini_api_key, cache=cv_cache, rate_limiter=gemini_rate_limiter, cassette=upstream_cassette,
+            )
+            logger.info("CV Parser: Active.")
     except Exception as e:
-        print(f"[Kage] LLM tool activation failed: {e}")
+        logger.warning("LLM tool activation failed: %s", e)
         project_analyzer = None
         cv_parser = None
 
     try:
         scoring_engine = ScoringEngine()
-        print("[Kage] Scoring Engine: Active.")
+        logger.info("Scoring Engine: Active.")
+    except Exception as e:
+        logger.warning("Scoring Engine: Failure. %s", e)
+
+    # Kage: The PDF scribe. Its workers warm in the background; startup does not wait.
+    try:
+        pdf_renderer = PDFRenderer(
+            max_workers=int(os.getenv("PDF_RENDER_WORKERS", 2)),
+            timeout=float(os.getenv("PDF_RENDER_TIMEOUT", 60)),
+            queue_timeout=float(os.getenv("PDF_QUEUE_TIMEOUT", 30)),
+        )
+        app.state.pdf_warmup_task = asyncio.create_task(pdf_renderer.warm_up())
     except Exception as e:
-        print(f"[Kage] Scoring Engine: Failure. {e}")
+        logger.warning("PDF Renderer: Failure. %s", e)
 
     try:
-        cv_writer = CVWriter(output_dir=OUTPUT_DIR)
-        print("[Kage] CV Writer: Active.")
+        render_cache = RenderCache(
+            max_entries=int(os.getenv("RENDER_CACHE_MAX_ENTRIES", 128)),
+            max_bytes=int(os.getenv("RENDER_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            ttl_seconds=float(os.getenv("RENDER_CACHE_TTL", 3600)),
+        )
     except Exception as e:
-        print(f"[Kage] CV Writer: Failure. {e}")
+        logger.warning("Render Cache: Failure. %s", e)
+
+    try:
+        resume_builder = ResumeBuilder(max_cached=int(os.getenv("RESUME_MODEL_CACHE_SIZE", 256)))
+    except Exception as e:
+        logger.warning("Resume Builder: Failure. %s", e)
+
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Kage: The messenger is dismissed last; queued mail is reported, not silently lost.
+    await mail_queue.stop()
+
+async def _get_cv_writer():
+    """
+    Kage: The CV Writer, built on first use. Building imports python-docx and
+    prepares every template, so it happens off the event loop and only once.
+
+    Returns:
+        CVWriter: The writer, or None if it could not be built.
+    """
+    global cv_writer
+    if cv_writer is None:
+        async with _cv_writer_lock:
+            if cv_writer is None:
+                try:
+                    from app.services.cv_writer import CVWriter
+                    cv_writer = await asyncio.to_thread(CVWriter, output_dir=OUTPUT_DIR, template_dir=RESUME_TEMPLATE_DIR, template_files=RESUME_TEMPLATE_FILES)
+                    logger.info("CV Writer: Active.")
+                except Exception as e:
+                    logger.warning("CV Writer: Failure. %s", e)
+    return cv_writer
 
 # Kage: Data retrieval from the persistent realm.
 async def get_user_cv_data_from_firestore(user_id: str):
     """
     Kage: Retrieves user profile. If absent, a default form is manifested.
     """
-    global db
-    if not db or not app_id:
-        return user_cv_data_template.copy()
-
-    try:
-        user_doc_ref = db.collection('artifacts').document(app_id).collection('users').document(user_id).collection('cv_data').document('profile')
-        user_doc = user_doc_ref.get()
-        if user_doc.exists:
-            loaded_data = user_doc.to_dict()
-            for key, default_value in user_cv_data_template.items():
-                if key not in loaded_data:
-                    loaded_data[key] = default_value
-            return loaded_data
-        else:
-            user_doc_ref.set(user_cv_data_template)
-            return user_cv_data_template.copy()
-    except Exception as e:
-        print(f"[Kage] Data retrieval failed for {user_id}: {e}")
-        traceback.print_exc()
-        return user_cv_data_template.copy()
+    return await profile_repository.load_profile(user_id)
 
 # Kage: Email communication. A channel for validation.
 def send_verification_email(recipient_email: str, verification_code: str):
     """
-    Kage: Dispatches the verification code. Errors indicate a blocked path.
+    Kage: Hands the verification code to the mail queue and returns at once.
+    Delivery, retries and failures happen in the background.
+    Errors here indicate a blocked path: SMTP unconfigured or the queue not running.
     """
-    smtp_server = os.getenv("SMTP_SERVER")
-    smtp_port = int(os.getenv("SMTP_PORT")) if os.getenv("SMTP_PORT") else 587
-    smtp_username = os.getenv("SMTP_USERNAME")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    sender_email = os.getenv("SENDER_EMAIL")
-
-    if not all([smtp_server, smtp_username, smtp_password, sender_email]):
-        raise ValueError("Email path incomplete. SMTP credentials missing.")
-
     subject = "Kaku-Ryu: Path Verification Code"
     body = f"""
     Kaku-Ryu Disciple,
@@ -272,18 +545,11 @@ def send_verification_email(recipient_email: str, verification_code: str):
     Kage.
     """
 
-    msg = MIMEText(body, 'plain', 'utf-8')
-    msg['Subject'] = Header(subject, 'utf-8')
-    msg['From'] = sender_email
-    msg['To'] = recipient_email
     try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.sendmail(sender_email, recipient_email, msg.as_string())
-        print(f"[Kage] Verification sent to {recipient_email}.")
-    except (smtplib.SMTPAuthenticationError, smtplib.SMTPConnectError, Exception) as e:
-        print(f"[Kage] Email transmission failed to {recipient_email}: {e}")
+        mail_queue.send(recipient_email, subject, body)
+        logger.info("Verification queued for %s.", recipient_email)
+    except (ValueError, RuntimeError) as e:
+        logger.warning("Email transmission failed to %s: %s", recipient_email, e)
         raise ConnectionError(f"Email path obstructed: {e}")
 
 # Kage: Public facing portals. The points of entry.
@@ -306,10 +572,9 @@ async def signup(username: str = Form(...), email: str = Form(...), password: st
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="System foundation not set.")
     
     try:
-        user = auth.create_user(email=email, password=password, display_name=username)
+        user = await profile_repository.run(auth.create_user, email=email, password=password, display_name=username)
         verification_code = str(random.randint(100000, 999999))
         
-        user_doc_ref = db.collection('artifacts').document(app_id).collection('users').document(user.uid).collection('cv_data').document('profile')
         initial_user_data = {
             **user_cv_data_template,
             "email": email,
@@ -317,7 +582,7 @@ async def signup(username: str = Form(...), email: str = Form(...), password: st
             "email_verified": False,
             "verification_code": verification_code
         }
-        user_doc_ref.set(initial_user_data)
+        await profile_repository.set_profile(user.uid, initial_user_data)
         
         email_sent_successfully = True
         email_error_message = None
@@ -344,24 +609,23 @@ async def verify_email(email: str = Form(...), code: str = Form(...)):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="System foundation not set.")
     
     try:
-        user = auth.get_user_by_email(email)
+        user = await profile_repository.run(auth.get_user_by_email, email)
         user_id = user.uid
 
-        user_doc_ref = db.collection('artifacts').document(app_id).collection('users').document(user_id).collection('cv_data').document('profile')
-        user_doc = user_doc_ref.get()
+        stored_data = await profile_repository.get_profile(user_id)
         
-        if not user_doc.exists:
+        if stored_data is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User data not found.")
         
-        stored_data = user_doc.to_dict()
         email_already_verified = stored_data.get("email_verified", False)
 
         if email_already_verified:
             return JSONResponse(content={"message": "Path already verified."})
 
         if stored_data.get("verification_code") == code:
-            user_doc_ref.update({"email_verified": True, "verification_code": firestore.DELETE_FIELD})
-            print(f"[Kage] Email {email} path verified.")
+            from firebase_admin import firestore
+            await profile_repository.update_profile(user_id, {"email_verified": True, "verification_code": firestore.DELETE_FIELD})
+            logger.info("Email %s path verified.", email)
             return JSONResponse(content={"message": "Path verified. Proceed to login."})
         else:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Verification code invalid.")
@@ -380,16 +644,14 @@ async def resend_verification_code(email: str = Form(...)):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="System foundation not set.")
 
     try:
-        user = auth.get_user_by_email(email)
+        user = await profile_repository.run(auth.get_user_by_email, email)
         user_id = user.uid
 
-        user_doc_ref = db.collection('artifacts').document(app_id).collection('users').document(user_id).collection('cv_data').document('profile')
-        user_doc = user_doc_ref.get()
+        stored_data = await profile_repository.get_profile(user_id)
 
-        if not user_doc.exists:
+        if stored_data is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User data not found.")
         
-        stored_data = user_doc.to_dict()
         email_already_verified = stored_data.get("email_verified", False)
 
         if email_already_verified:
@@ -398,7 +660,7 @@ async def resend_verification_code(email: str = Form(...)):
         verification_code = stored_data.get("verification_code")
         if not verification_code:
             verification_code = str(random.randint(100000, 999999))
-            user_doc_ref.update({"verification_code": verification_code})
+            await profile_repository.update_profile(user_id, {"verification_code": verification_code})
 
         send_verification_email(email, verification_code)
         return JSONResponse(content={"message": "Verification code dispatched. Observe your inbox."})
@@ -419,14 +681,14 @@ async def login(email: str = Form(...), password: str = Form(...)):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="System foundation not set.")
     
     try:
-        user = auth.get_user_by_email(email)
+        user = await profile_repository.run(auth.get_user_by_email, email)
         user_id = user.uid
 
         user_data = await get_user_cv_data_from_firestore(user_id)
         if not user_data.get("email_verified"):
             return RedirectResponse(url=f"/verify_page?email={quote_plus(email)}&message={quote_plus('Path not verified. Complete verification first.')}&type=error", status_code=status.HTTP_302_FOUND)
 
-        custom_token = auth.create_custom_token(user.uid)
+        custom_token = await profile_repository.run(auth.create_custom_token, user.uid)
         
         return JSONResponse(content={"message": "Login successful. Path clear.", "id_token": custom_token.decode('utf-8')})
     except auth.UserNotFoundError:
@@ -506,23 +768,23 @@ async def github_callback(request: Request, code: str, state: str | None = None)
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Primary verified email from GitHub elusive.")
 
             try:
-                firebase_user = auth.get_user_by_email(primary_email)
+                firebase_user = await profile_repository.run(auth.get_user_by_email, primary_email)
                 user_uid = firebase_user.uid
             except auth.UserNotFoundError:
-                firebase_user = auth.create_user(
+                firebase_user = await profile_repository.run(
+                    auth.create_user,
                     email=primary_email,
                     display_name=github_username,
                     email_verified=True
                 )
                 user_uid = firebase_user.uid
 
-            firebase_custom_token = auth.create_custom_token(user_uid)
+            firebase_custom_token = await profile_repository.run(auth.create_custom_token, user_uid)
 
-            user_doc_ref = db.collection('artifacts').document(app_id).collection('users').document(user_uid).collection('cv_data').document('profile')
             existing_user_data = await get_user_cv_data_from_firestore(user_uid)
+            from firebase_admin import firestore
             
             updated_user_data = {
-                **existing_user_data,
                 "email": primary_email,
                 "name": github_username or existing_user_data.get("name", "N/A"),
                 "email_verified": True,
@@ -531,8 +793,9 @@ async def github_callback(request: Request, code: str, state: str | None = None)
                 "github_profile": github_profile_url or existing_user_data.get("github_profile", "N/A"),
                 "verification_code": firestore.DELETE_FIELD
             }
-            user_doc_ref.set(updated_user_data, merge=True)
-            print(f"[Kage] GitHub path integrated for {user_uid}.")
+            await profile_repository.save_profile_changes(user_uid, existing_user_data, updated_user_data)
+            _forget_evaluated_projects(user_uid)
+            logger.info("GitHub path integrated for %s.", user_uid)
 
             redirect_url = (
                 f"{FRONTEND_URL}/?"
@@ -562,12 +825,58 @@ async def set_github_token(github_token: str = Form(...), user_id: str = Depends
     encrypted_token = github_token # Kage: Placeholder. Encryption is the true safeguard.
 
     try:
-        user_doc_ref = db.collection('artifacts').document(app_id).collection('users').document(user_id).collection('cv_data').document('profile')
-        user_doc_ref.update({"github_token_encrypted": encrypted_token})
+        await profile_repository.update_profile(user_id, {"github_token_encrypted": encrypted_token})
+        _forget_evaluated_projects(user_id)
         return JSONResponse(content={"message": "GitHub access key recorded."})
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to secure access key: {e}")
 
+@app.get("/metrics")
+async def metrics(request: Request):
+    """
+    Kage: Stage latencies, counters, in-flight gauges, the GitHub rate limit and
+    Gemini token usage, in the Prometheus text format.
+    """
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized.")
+    return Response(content=REGISTRY.render(), media_type=REGISTRY.CONTENT_TYPE)
+
+@app.get("/admin/profiles")
+async def list_request_profiles(admin_id: str = Depends(get_admin_user_id)):
+    """Kage: The stored request profiles, newest first."""
+    return JSONResponse(content={"backend": _get_request_profiler().backend, "profiles": _get_request_profiler().list()})
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_request_profile(profile_id: str, admin_id: str = Depends(get_admin_user_id)):
+    """Kage: One stored profile, ready for speedscope or flamegraph.pl."""
+    stored = _get_request_profiler().get(profile_id)
+    if stored is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No such profile.")
+    content, media_type, filename = stored
+    return Response(content=content, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/admin/memory")
+async def get_memory_report(limit: int = 25, group_by: str = "lineno", admin_id: str = Depends(get_admin_user_id)):
+    """
+    Kage: Traced memory now and at its peak, each route's peak per request, and the
+    largest allocation sites, grouped by "lineno", "filename" or "traceback".
+    """
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="group_by must be lineno, filename or traceback.")
+    # Kage: A snapshot walks every traced block; it is taken off the event loop.
+    report = await asyncio.to_thread(memory_watch.report, limit=max(1, min(limit, 200)), group_by=group_by)
+    return JSONResponse(content=report)
+
+@app.post("/admin/memory/tracing")
+async def set_memory_tracing(enabled: bool = True, admin_id: str = Depends(get_admin_user_id)):
+    """Kage: Starts or stops allocation tracking. Starting again clears the route figures."""
+    if enabled:
+        memory_watch.start()
+    else:
+        memory_watch.stop()
+    logger.info("Allocation tracking %s by %s.", "started" if enabled else "stopped", admin_id)
+    return JSONResponse(content={"tracing": memory_watch.tracing})
+
 # Kage: Core application pathways.
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
@@ -591,7 +900,7 @@ async def read_root(request: Request):
     github_status_message = "GitHub API: Active." if (current_user_cv_data.get("github_oauth_token_encrypted") or current_user_cv_data.get("github_token_encrypted")) else "GitHub access: Dormant. Provide key."
     analyzer_status_message = "LLM Analyzer: Active." if project_analyzer else "LLM Analyzer: Dormant. Configuration needed."
     scoring_status_message = "Scoring Engine: Active." if scoring_engine else "Scoring Engine: Dormant. Configuration needed."
-    cv_writer_status_message = "CV Writer: Active." if cv_writer else "CV Writer: Dormant. Configuration needed."
+    cv_writer_status_message = "CV Writer: Active." if cv_writer else "CV Writer: Awakens with the first form."
     cv_parser_status_message = "CV Parser: Active." if cv_parser else "CV Parser: Dormant. Configuration needed."
 
     return templates.TemplateResponse("index.html", {
@@ -623,12 +932,139 @@ async def get_user_cv_data_api(user_id: str = Depends(get_current_user_id)):
     except HTTPException as e:
         raise e
     except Exception as e:
-        print(f"[Kage] Profile data retrieval failed for {user_id}: {e}")
-        traceback.print_exc()
+        logger.exception("Profile data retrieval failed for %s: %s", user_id, e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to perceive user profile: {e}")
 
+# Kage: Background writes still in flight. Held here so they are not collected mid-write.
+_background_tasks = set()
+# Kage: Recent evaluations by user id, as (expires, result), and evaluations still running.
+_evaluated_projects = OrderedDict()
+_pending_evaluations = {}
+# Evaluations started under a GitHub binding that has since changed. Their result is never remembered.
+_discarded_evaluations = weakref.WeakSet()
+
+def _github_binding(token: str) -> str:
+    """Kage: Names the GitHub binding an evaluation was made under, without keeping the key itself."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+def _persist_project_analysis(user_id: str, projects: list, binding: str = None):
+    """
+    Kage: Stores the evaluated projects, compressed and chunked, without delaying the
+    response. Failure is reported, never raised.
+    """
+    if not profile_repository.available or not projects:
+        return
+
+    async def persist():
+        try:
+            await profile_repository.save_project_analysis(user_id, projects, binding=binding)
+        except Exception as e:
+            logger.warning("Storing project analysis failed for %s: %s", user_id, e)
+
+    task = asyncio.create_task(persist())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def _collect_projects_data(user_id: str, refresh: bool = False) -> dict:
+    """
+    Kage: Observes and evaluates every project of the user. A result is remembered
+    for PROJECTS_CACHE_TTL seconds, and concurrent callers share one evaluation, so
+    paging through it or forging a resume right after does not evaluate again.
+    `refresh` sets the remembered result aside and evaluates anew; an evaluation
+    already running is joined, as it is newer than anything remembered.
+    """
+    if refresh:
+        _evaluated_projects.pop(user_id, None)
+    remembered = _evaluated_projects.get(user_id)
+    if remembered is not None and time.monotonic() < remembered[0]:
+        return remembered[1]
+
+    pending = _pending_evaluations.get(user_id)
+    if pending is None:
+        pending = asyncio.ensure_future(_evaluate_projects(user_id, refresh=refresh))
+        _pending_evaluations[user_id] = pending
+        pending.add_done_callback(lambda done: _pending_evaluations.pop(user_id, None) if _pending_evaluations.get(user_id) is done else None)
+    result = await asyncio.shield(pending)
+
+    if PROJECTS_CACHE_TTL > 0 and pending not in _discarded_evaluations:
+        _evaluated_projects[user_id] = (time.monotonic() + PROJECTS_CACHE_TTL, result)
+        _evaluated_projects.move_to_end(user_id)
+        while len(_evaluated_projects) > MAX_CACHED_EVALUATIONS:
+            _evaluated_projects.popitem(last=False)
+    return result
+
+def _forget_evaluated_projects(user_id: str):
+    """
+    Kage: The GitHub binding changed; the remembered evaluation no longer holds, nor
+    does one still running under the old key. Its waiters get their answer, but it
+    is not remembered, and the next caller starts afresh.
+    """
+    _evaluated_projects.pop(user_id, None)
+    pending = _pending_evaluations.pop(user_id, None)
+    if pending is not None:
+        _discarded_evaluations.add(pending)
+
 @app.get("/api/projects", response_class=JSONResponse)
-async def get_projects_data(user_id: str = Depends(get_current_user_id)):
+async def get_projects_data(request: Request, fields: str | None = None, page: int = 1, limit: int = DEFAULT_PROJECTS_PAGE_SIZE,
+                            refresh: bool = False, user_id: str = Depends(get_current_user_id)):
+    """
+    Kage: The evaluated projects, one page at a time.
+
+    By default each project carries only the compact fields the dashboard shows
+    (PROJECT_COMPACT_FIELDS). `fields` names the wanted fields, comma-separated;
+    "all" returns projects whole, README and commit history included. `refresh`
+    evaluates anew instead of answering from the remembered evaluation.
+    """
+    if page < 1 or limit < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Page and limit must be positive.")
+    limit = min(limit, MAX_PROJECTS_PAGE_SIZE)
+
+    if fields is None:
+        selected = PROJECT_COMPACT_FIELDS
+    elif fields.strip().lower() in ("all", "*"):
+        selected = None
+    else:
+        selected = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+
+    data = await _collect_projects_data(user_id, refresh=refresh)
+    projects = data["projects"]
+    start = (page - 1) * limit
+    return compact_json_response(request, {
+        **data,
+        "projects": [project.to_dict(selected) for project in projects[start:start + limit]],
+        "pagination": {
+            "page": page,
+            "limit": limit,
+            "total": len(projects),
+            "pages": max(1, -(-len(projects) // limit)),
+        },
+    })
+
+def _project_records(projects: list) -> list:
+    """Kage: Listener dicts become records as they are taken, so their README text is held once, compressed."""
+    records = []
+    projects.reverse()
+    while projects:
+        records.append(ProjectRecord.from_project(projects.pop()))
+    return records
+
+async def _recall_stored_evaluation(user_id: str, profile: dict, binding: str):
+    """
+    Kage: The evaluation stored by an earlier request, on this instance or another,
+    if it is recent enough and was made under the current GitHub binding. None otherwise.
+    """
+    pointer = profile.get("projects_analysis")
+    if STORED_ANALYSIS_MAX_AGE <= 0 or not profile_repository.available or not pointer:
+        return None
+    if pointer.get("binding") != binding or time.time() - pointer.get("updated_at", 0) > STORED_ANALYSIS_MAX_AGE:
+        return None
+    try:
+        return await profile_repository.load_project_analysis(user_id, pointer=pointer)
+    except Exception as e:
+        logger.warning("Stored analysis unreadable for %s: %s. Evaluating anew.", user_id, e)
+        return None
+
+async def _evaluate_projects(user_id: str, refresh: bool = False) -> dict:
     global db, project_analyzer, scoring_engine
 
     current_user_cv_data = await get_user_cv_data_from_firestore(user_id)
@@ -639,23 +1075,39 @@ async def get_projects_data(user_id: str = Depends(get_current_user_id)):
     if not user_github_token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="GitHub access key not present. Provide access.")
 
+    binding = _github_binding(user_github_token)
+    stored = None if refresh else await _recall_stored_evaluation(user_id, current_user_cv_data, binding)
+    if stored is not None:
+        logger.info("%s stored projects recalled for %s.", len(stored), user_id)
+        return {
+            "projects": stored,
+            "status": "success",
+            "message": f"Evaluation of {len(stored)} projects recalled.",
+            "username": current_user_cv_data.get("name", "Ephemeral Being"),
+            "user_id": user_id
+        }
+
     try:
-        user_github_listener = GitHubListener(github_token=user_github_token)
+        # Kage: PyGithub is loaded by the first project listing, not at startup.
+        from app.services.github_listener import GitHubListener
+        user_github_listener = GitHubListener(
+            github_token=user_github_token, max_readme_chars=MAX_README_CHARS, max_total_text_chars=MAX_PROJECT_TEXT_CHARS,
+            base_url=GITHUB_API_URL, cassette=upstream_cassette, seconds_between_requests=GITHUB_SECONDS_BETWEEN_REQUESTS,
+        )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"GitHub Listener: Initialization failed with user key: {e}")
 
     if not project_analyzer:
-        print("[Kage] Project Analyzer: Dormant. Proceeding without deep insight.")
-        raw_projects_data = user_github_listener.get_all_project_data(include_private=True, min_stars=0)
+        logger.warning("Project Analyzer: Dormant. Proceeding without deep insight.")
+        records = _project_records(user_github_listener.get_all_project_data(include_private=True, min_stars=0))
+        for record in records:
+            record.analysis = AnalysisRecord(
+                summary="Full analysis is not possible for this project.",
+                achievements=["Insight withheld: Analyzer inactive."],
+            )
+            record.score = 0.0
         return {
-            "projects": [{
-                **project,
-                "skills": [], "technologies": [], "achievements": ["Insight withheld: Analyzer inactive."],
-                "summary": "Full analysis is not possible for this project.",
-                "keywords": [], "estimated_complexity_qualitative": "N/A",
-                "performance_metrics": {},
-                "score": 0.0
-            } for project in raw_projects_data],
+            "projects": records,
             "status": "warning",
             "message": "Project Analyzer dormant. Full insight unavailable.",
             "username": current_user_cv_data.get("name", "Ephemeral Being"),
@@ -666,28 +1118,21 @@ async def get_projects_data(user_id: str = Depends(get_current_user_id)):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Scoring Engine: Dormant. Evaluation cannot proceed.")
 
     try:
-        raw_projects_data = user_github_listener.get_all_project_data(include_private=True, min_stars=0)
-        
-        analyzed_and_scored_projects = []
-        for project in raw_projects_data:
+        analyzed_and_scored_projects = _project_records(user_github_listener.get_all_project_data(include_private=True, min_stars=0))
+        for record in analyzed_and_scored_projects:
             try:
-                analyzed_data = await project_analyzer.analyze_project(project)
-                combined_data = {**project, **analyzed_data}
-                score = scoring_engine.calculate_score(combined_data)
-                combined_data['score'] = round(score, 2)
-                analyzed_and_scored_projects.append(combined_data)
+                record.analysis = AnalysisRecord.from_dict(await project_analyzer.analyze_project(record))
+                record.score = round(scoring_engine.calculate_score(record), 2)
             except Exception as e:
-                print(f"[Kage] Insight failed for project {project.get('name', 'Unnamed')}: {e}. Skipping depth.")
-                analyzed_and_scored_projects.append({
-                    **project,
-                    "skills": [], "technologies": [], "achievements": [f"Insight and evaluation failed: {e}"],
-                    "summary": "Full understanding and evaluation could not be completed for this project.",
-                    "keywords": [], "estimated_complexity_qualitative": "N/A",
-                    "performance_metrics": {},
-                    "score": 0.0
-                })
-
-        print(f"[Kage] {len(analyzed_and_scored_projects)} projects observed and evaluated for {user_id}.")
+                logger.warning("Insight failed for project %s: %s. Skipping depth.", record.name, e)
+                record.analysis = AnalysisRecord(
+                    summary="Full understanding and evaluation could not be completed for this project.",
+                    achievements=[f"Insight and evaluation failed: {e}"],
+                )
+                record.score = 0.0
+
+        logger.info("%s projects observed and evaluated for %s.", len(analyzed_and_scored_projects), user_id)
+        _persist_project_analysis(user_id, analyzed_and_scored_projects, binding=binding)
         return {
             "projects": analyzed_and_scored_projects,
             "status": "success",
@@ -709,87 +1154,212 @@ async def upload_cv(file: UploadFile = File(...), user_id: str = Depends(get_cur
     if not db or not user_id:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="System foundation or user identity absent for data storage.")
 
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    if file_extension not in [".docx", ".pdf"]:
+    file_extension = os.path.splitext(file.filename or "")[1].lower()
+    if file_extension not in SUPPORTED_CV_EXTENSIONS:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only .docx or .pdf forms are accepted.")
 
-    temp_file_path = os.path.join(OUTPUT_DIR, file.filename)
+    # Kage: The upload flows into a private spooled file. No shared path, no whole-file read.
+    # Its hash is taken on the way in; a form already absorbed is recalled, not parsed again.
+    hasher = ParsedCVCache.new_hasher()
     try:
-        with open(temp_file_path, "wb") as buffer:
-            buffer.write(await file.read())
-        
-        parsed_data = cv_parser.parse_cv(temp_file_path)
-        
-        current_user_cv_data.update(parsed_data)
+        spooled_cv, _ = await CVParser.spool_upload(file, max_bytes=MAX_CV_UPLOAD_BYTES, hasher=hasher)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+    try:
+        content_hash = hasher.hexdigest()
+        parsed_data = await cv_parser.parse_cv_async(spooled_cv, file_extension, user_id=user_id, content_hash=content_hash)
         
-        user_doc_ref = db.collection('artifacts').document(app_id).collection('users').document(user_id).collection('cv_data').document('profile')
-        user_doc_ref.set(current_user_cv_data)
-        print(f"[Kage] User CV absorbed and stored for {user_id}.")
+        # Kage: Only the fields the CV changed are written. Secrets and GitHub bindings are never touched.
+        await profile_repository.save_profile_changes(user_id, current_user_cv_data, {**current_user_cv_data, **parsed_data})
+        logger.info("User CV absorbed and stored for %s.", user_id)
+        # Kage: The replaced CVs are no longer the user's; their text leaves the cache.
+        if cv_parser.cache:
+            await asyncio.to_thread(cv_parser.cache.purge_user, user_id, keep=content_hash)
 
         return JSONResponse(content={"message": "CV absorbed and processed.", "data": parsed_data})
     except Exception as e:
-        print(f"[Kage] CV ingestion failed: {e}")
+        logger.warning("CV ingestion failed: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to process CV: {e}")
     finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+        spooled_cv.close()
 
-@app.get("/download-resume")
-async def download_resume(format: str = "pdf", user_id: str = Depends(get_current_user_id)):
+@app.post("/upload-cv/bulk")
+async def upload_cv_bulk(files: list[UploadFile] = File(...), user_id: str = Depends(get_current_user_id)):
     """
-    Kage: Generates and provides the user's compiled form.
+    Kage: Absorbs a batch of CVs (.docx, .pdf, or .zip archives of them) and streams
+    one NDJSON line per CV as it is parsed, then a summary line. The profile of the
+    caller is left untouched; results belong to the batch.
     """
-    global cv_writer
+    global cv_parser
 
-    if not cv_writer:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="CV Writer: Dormant. Cannot forge documents.")
-    if not db or not user_id:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="System foundation or user identity absent for document creation.")
+    if not cv_parser:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="CV Parser: Dormant. Cannot ingest.")
+
+    # Kage: Uploads are copied into private spooled files now; the request's own files close when this handler returns.
+    spooled_files, uploads = [], []
+    memory_left = MAX_UPLOAD_MEMORY_BYTES
+    try:
+        for file in files:
+            filename = file.filename or "unnamed"
+            if not BulkCVIngestor.accepts(filename):
+                uploads.append((filename, None, None))
+                continue
+            is_archive = filename.lower().endswith(BulkCVIngestor.BULK_ARCHIVE_EXTENSIONS)
+            hasher = ParsedCVCache.new_hasher()
+            memory_bytes = min(CVParser.SPOOL_MEMORY_BYTES, memory_left)
+            spooled, size = await CVParser.spool_upload(
+                file, max_bytes=MAX_BULK_ARCHIVE_BYTES if is_archive else MAX_CV_UPLOAD_BYTES, hasher=hasher,
+                memory_bytes=memory_bytes,
+            )
+            if size <= memory_bytes:
+                memory_left -= size
+            spooled_files.append(spooled)
+            uploads.append((filename, spooled, hasher.hexdigest()))
+
+        ingestor = BulkCVIngestor(cv_parser, max_files=MAX_BULK_CV_FILES, max_file_bytes=MAX_CV_UPLOAD_BYTES, concurrency=BULK_CV_CONCURRENCY)
+        jobs = ingestor.expand(uploads)
+    except (UploadTooLargeError, BulkLimitError) as e:
+        for spooled in spooled_files:
+            spooled.close()
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except BaseException:
+        for spooled in spooled_files:
+            spooled.close()
+        raise
 
+    logger.info("Bulk CV ingestion of %s file(s) started for %s.", len(jobs), user_id)
+
+    async def ndjson_lines():
+        try:
+            async for result in ingestor.stream(jobs, user_id=user_id):
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        finally:
+            for spooled in spooled_files:
+                spooled.close()
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+def _attachment_response(content: bytes, filename: str, media_type: str, etag: str = None, inline: bool = False) -> Response:
+    """
+    Kage: Delivers a forged form straight from memory, as a download or inline.
+    With an ETag, the client is told to revalidate rather than forge again.
+    """
+    disposition = "inline" if inline else "attachment"
+    headers = {"Content-Disposition": f'{disposition}; filename="{filename}"'}
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = RESUME_CACHE_CONTROL
+    return Response(content=content, media_type=media_type, headers=headers)
+
+async def _load_resume_model(user_id: str):
+    """
+    Kage: Gathers the profile and the evaluated projects, then lets the builder
+    select what the form will say. Every format starts from this model.
+    """
     current_user_cv_data = await get_user_cv_data_from_firestore(user_id)
 
     try:
-        # Kage: Direct call to get raw project data, bypassing FastAPI's JSONResponse wrapper
-        # when called internally. This ensures a consistent dictionary format.
-        projects_response = await get_projects_data(user_id=user_id)
+        # Kage: The whole evaluation, not the paged and projected API view of it.
+        projects_response = await _collect_projects_data(user_id)
         all_projects_data = projects_response.get('projects', [])
-
-        # Kage: Sort projects by score in descending order and select the top 4.
-        # This aligns with the principle of focusing on the most impactful projects.
-        sorted_projects = sorted(all_projects_data, key=lambda p: p.get('score', 0), reverse=True)
-        projects_data = sorted_projects[:4] # Select top 4
-
     except HTTPException as e:
-        print(f"[Kage] Project data for document forging failed: {e.detail}")
+        logger.warning("Project data for document forging failed: %s", e.detail)
         raise e
     except Exception as e:
-        print(f"[Kage] Project data acquisition for document forging obstructed: {e}")
-        traceback.print_exc()
+        logger.exception("Project data acquisition for document forging obstructed: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to gather project data for document creation: {e}")
 
-    cv_filename_base = f"{current_user_cv_data.get('name', 'Kaku-Ryu_Form').replace(' ', '_')}"
-    docx_output_filename = f"{cv_filename_base}.docx"
-    pdf_output_filename = f"{cv_filename_base}.pdf"
+    return resume_builder.build(all_projects_data, current_user_cv_data)
 
-    generated_docx_path = cv_writer.generate_cv(
-        projects_data,
-        current_user_cv_data,
-        output_filename=docx_output_filename
-    )
+async def _render_resume(resume, template: str, output_format: str, user_id: str):
+    """
+    Kage: Gives the model the requested shape.
+
+    Returns:
+        tuple: (content, filename, media_type, faithful). `faithful` is False when
+        the DOCX alternative stands in for an unavailable PDF.
+    """
+    # Kage: The name shapes only the offered filename. The form itself never touches shared disk.
+    cv_filename_base = re.sub(r"[^A-Za-z0-9._-]+", "_", resume.name or '').strip('._') or "Kaku-Ryu_Form"
 
-    if not generated_docx_path:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Document forging failed. DOCX path unmanifested.")
+    if output_format in TEXT_FORMATS:
+        media_type, extension = TEXT_FORMATS[output_format]
+        content = render_text(resume, output_format).encode("utf-8")
+        return content, f"{cv_filename_base}.{extension}", media_type, True
 
-    if format.lower() == "pdf":
-        pdf_path = os.path.join(OUTPUT_DIR, pdf_output_filename)
+    try:
+        docx_bytes = cv_writer.render_cv_bytes(resume, template=template)
+    except Exception as e:
+        logger.exception("Document forging failed: %s", e)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Document forging failed: {e}")
+
+    if output_format == "pdf":
         try:
-            docx_to_pdf_convert(generated_docx_path, pdf_path)
-            print(f"[Kage] Form transformed to PDF: {pdf_path}")
-            return FileResponse(path=pdf_path, filename=pdf_output_filename, media_type="application/pdf")
-        except Exception as e:
-            print(f"[Kage] PDF transformation failed: {e}. Presenting DOCX alternative.")
-            traceback.print_exc()
-            return FileResponse(path=generated_docx_path, filename=docx_output_filename, media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+            if not pdf_renderer:
+                raise PDFRenderError("PDF Renderer dormant.")
+            pdf_bytes = await pdf_renderer.convert_bytes(docx_bytes)
+            logger.info("Form transformed to PDF for %s (%s bytes).", user_id, len(pdf_bytes))
+            return pdf_bytes, f"{cv_filename_base}.pdf", PDF_MEDIA_TYPE, True
+        except PDFRenderError as e:
+            logger.warning("PDF transformation unavailable: %s Presenting DOCX alternative.", e)
+            return docx_bytes, f"{cv_filename_base}.docx", DOCX_MEDIA_TYPE, False
+
+    logger.info("Presenting DOCX form for %s (%s bytes).", user_id, len(docx_bytes))
+    return docx_bytes, f"{cv_filename_base}.docx", DOCX_MEDIA_TYPE, True
+
+async def _serve_resume(request: Request, user_id: str, output_format: str, template: str, inline: bool = False) -> Response:
+    """
+    Kage: The shared path of every resume response: model, identity, memory, forging.
+    """
+    if not resume_builder:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Resume Builder: Dormant. Cannot forge documents.")
+    if output_format not in RESUME_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown format. Available: {', '.join(RESUME_FORMATS)}")
+    if output_format in TEXT_FORMATS:
+        # Kage: The lighter shapes need neither the writer nor a template.
+        template = ""
     else:
-        print(f"[Kage] Presenting DOCX form: {generated_docx_path}")
-        return FileResponse(path=generated_docx_path, filename=docx_output_filename, media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        if not await _get_cv_writer():
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="CV Writer: Dormant. Cannot forge documents.")
+        if template not in cv_writer.available_templates:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown template. Available: {', '.join(cv_writer.available_templates)}")
+    if not db or not user_id:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="System foundation or user identity absent for document creation.")
+
+    resume = await _load_resume_model(user_id)
+
+    # Kage: The form's identity is the hash of what shapes it. A client already holding it receives nothing new.
+    cache_key = RenderCache.make_key(resume.digest, template, output_format)
+    etag = RenderCache.etag_for(cache_key)
+    if RenderCache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": RESUME_CACHE_CONTROL})
+
+    cached = render_cache.get(cache_key) if render_cache else None
+    if cached:
+        logger.info("Presenting remembered %s form for %s.", output_format.upper(), user_id)
+        return _attachment_response(cached["content"], cached["filename"], cached["media_type"], etag=cached["etag"], inline=inline)
+
+    content, filename, media_type, faithful = await _render_resume(resume, template, output_format, user_id)
+    if not faithful:
+        # Kage: The alternative is not what was asked for. It carries no identity and is not remembered.
+        return _attachment_response(content, filename, media_type, inline=inline)
+
+    if render_cache:
+        render_cache.put(cache_key, content, media_type, filename)
+    return _attachment_response(content, filename, media_type, etag=etag, inline=inline)
+
+@app.get("/download-resume")
+async def download_resume(request: Request, format: str = "pdf", template: str = DEFAULT_RESUME_TEMPLATE, user_id: str = Depends(get_current_user_id)):
+    """
+    Kage: Generates and provides the user's compiled form.
+    Formats: pdf, docx, html, md (Markdown) and json (JSON Resume).
+    """
+    return await _serve_resume(request, user_id, format.lower(), template)
+
+@app.get("/api/resume-preview")
+async def resume_preview(request: Request, user_id: str = Depends(get_current_user_id)):
+    """
+    Kage: The resume as an inline HTML page. No DOCX is forged to show it.
+    """
+    return await _serve_resume(request, user_id, "html", DEFAULT_RESUME_TEMPLATE, inline=True)
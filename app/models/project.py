@@ -0,0 +1,248 @@
+# app/models/project.py
+
+import sys
+import json
+import zlib
+import struct
+from dataclasses import dataclass, field, fields
+
+# Kage: The layout of a packed record. Fields are stored by position, so a change
+# to the fields below needs a new version.
+RECORD_FORMAT_VERSION = 1
+_RECORD_HEADER = struct.Struct(">BII")
+_RECORDS_COUNT = struct.Struct(">I")
+
+# The bulky text of a project. Kept compressed on the record and decoded on access.
+TEXT_FIELDS = ("readme_content", "recent_commits")
+
+
+def _encode(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _intern_all(values) -> list:
+    """Kage: Skill, technology and language names repeat across a portfolio; one copy of each is enough."""
+    return [sys.intern(value) if isinstance(value, str) else value for value in values or ()]
+
+
+@dataclass(slots=True)
+class AnalysisRecord:
+    """Kage: What the external mind saw in one project."""
+    summary: str = ""
+    skills: list = field(default_factory=list)
+    technologies: list = field(default_factory=list)
+    achievements: list = field(default_factory=list)
+    keywords: list = field(default_factory=list)
+    estimated_complexity_qualitative: str = "N/A"
+    performance_metrics: dict = field(default_factory=dict)
+    # Anything else the analysis returned.
+    extra: dict = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AnalysisRecord":
+        data = dict(data or {})
+        return cls(
+            summary=data.pop("summary", "") or "",
+            skills=_intern_all(data.pop("skills", None)),
+            technologies=_intern_all(data.pop("technologies", None)),
+            achievements=list(data.pop("achievements", None) or []),
+            keywords=_intern_all(data.pop("keywords", None)),
+            estimated_complexity_qualitative=data.pop("estimated_complexity_qualitative", "N/A") or "N/A",
+            performance_metrics=dict(data.pop("performance_metrics", None) or {}),
+            extra=data or None,
+        )
+
+    def to_list(self) -> list:
+        return [getattr(self, name) for name in ANALYSIS_FIELDS] + [self.extra]
+
+    @classmethod
+    def from_list(cls, values: list) -> "AnalysisRecord":
+        return cls(*values)
+
+
+ANALYSIS_FIELDS = tuple(f.name for f in fields(AnalysisRecord) if f.name != "extra")
+
+
+@dataclass(slots=True)
+class ProjectRecord:
+    """
+    Kage: One observed project, as it moves from GitHub through analysis and scoring
+    to the page. Slotted, its strings shared where they repeat, and its README and
+    commit messages held compressed until someone reads them.
+
+    It answers `.get()`, `[]` and `in` like the dict it replaces, with the analysis
+    fields and the score alongside the GitHub ones, so code written for merged
+    project dicts reads it unchanged. to_dict() gives that dict back.
+    """
+    id: int = None
+    name: str = "Unnamed Project"
+    full_name: str = ""
+    description: str = ""
+    html_url: str = ""
+    clone_url: str = ""
+    stargazers_count: int = 0
+    forks_count: int = 0
+    watchers_count: int = 0
+    created_at: str = None
+    updated_at: str = None
+    last_pushed_at: str = None
+    is_private: bool = False
+    languages: dict = field(default_factory=dict)
+    dependencies: list = field(default_factory=list)
+    has_jupyter_notebooks: bool = False
+    text_capped: bool = False
+    # Anything else the listener reported.
+    extra: dict = None
+    analysis: AnalysisRecord = None
+    score: float = None
+    # README and commit messages, compressed. See TEXT_FIELDS.
+    text_blob: bytes = b""
+
+    @classmethod
+    def from_project(cls, project: dict, analysis: AnalysisRecord = None, score: float = None) -> "ProjectRecord":
+        """Kage: Builds a record from a project dict as GitHubListener.get_repo_details returns it."""
+        data = dict(project)
+        text = [data.pop(name, None) for name in TEXT_FIELDS]
+        kwargs = {name: data.pop(name) for name in GITHUB_FIELDS if name in data}
+        if "languages" in kwargs:
+            kwargs["languages"] = {sys.intern(language): size for language, size in (kwargs["languages"] or {}).items()}
+        if "dependencies" in kwargs:
+            kwargs["dependencies"] = _intern_all(kwargs["dependencies"])
+        record = cls(**kwargs, extra=data or None, analysis=analysis, score=score)
+        record.set_text(*text)
+        return record
+
+    def set_text(self, readme_content: str = None, recent_commits: list = None):
+        readme_content, recent_commits = readme_content or "", list(recent_commits or [])
+        self.text_blob = zlib.compress(_encode([readme_content, recent_commits])) if readme_content or recent_commits else b""
+
+    def text(self) -> tuple:
+        """
+        Kage: The README and the commit messages, from one decompression. Callers
+        that need both read them here rather than through the two properties.
+
+        Returns:
+            tuple: (readme_content, recent_commits).
+        """
+        if not self.text_blob:
+            return "", []
+        readme_content, recent_commits = json.loads(zlib.decompress(self.text_blob))
+        return readme_content, recent_commits
+
+    @property
+    def readme_content(self) -> str:
+        return self.text()[0]
+
+    @property
+    def recent_commits(self) -> list:
+        return self.text()[1]
+
+    def keys(self) -> list:
+        keys = list(GITHUB_FIELDS) + list(TEXT_FIELDS) + list(self.extra or ())
+        if self.analysis is not None:
+            keys += list(ANALYSIS_FIELDS) + list(self.analysis.extra or ())
+        if self.score is not None:
+            keys.append("score")
+        return list(dict.fromkeys(keys))
+
+    def get(self, key: str, default=None):
+        """Kage: As a merged project dict would answer. The analysis wins a clash, as it did in the merge."""
+        analysis = self.analysis
+        if analysis is not None:
+            if key in ANALYSIS_FIELDS:
+                return getattr(analysis, key)
+            if analysis.extra and key in analysis.extra:
+                return analysis.extra[key]
+        if key in GITHUB_FIELDS:
+            return getattr(self, key)
+        if key == "score":
+            return default if self.score is None else self.score
+        if key in TEXT_FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def __getitem__(self, key: str):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def to_dict(self, keys=None) -> dict:
+        """
+        Kage: The plain dict of the record, or of the named keys only. Text is decoded
+        only when asked for.
+        """
+        if keys is None:
+            keys = self.keys()
+        result = {}
+        text = None
+        for key in keys:
+            if key in TEXT_FIELDS:
+                text = text or self.text()
+                result[key] = text[TEXT_FIELDS.index(key)]
+                continue
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                result[key] = value
+        return result
+
+    def to_bytes(self) -> bytes:
+        """
+        Kage: The compact binary form: a header, the fields by position as compressed
+        JSON, then the text blob as it already is.
+        """
+        meta = zlib.compress(_encode([
+            [getattr(self, name) for name in GITHUB_FIELDS],
+            self.extra,
+            self.analysis.to_list() if self.analysis is not None else None,
+            self.score,
+        ]))
+        return _RECORD_HEADER.pack(RECORD_FORMAT_VERSION, len(meta), len(self.text_blob)) + meta + self.text_blob
+
+    @classmethod
+    def from_bytes(cls, data: bytes, offset: int = 0) -> "ProjectRecord":
+        return cls._read(memoryview(data), offset)[0]
+
+    @classmethod
+    def _read(cls, view: memoryview, offset: int):
+        """Returns the record at offset and the offset just past it."""
+        version, meta_length, text_length = _RECORD_HEADER.unpack_from(view, offset)
+        if version != RECORD_FORMAT_VERSION:
+            raise ValueError(f"Unknown project record format {version}.")
+        offset += _RECORD_HEADER.size
+        github, extra, analysis, score = json.loads(zlib.decompress(view[offset:offset + meta_length]))
+        offset += meta_length
+        record = cls(**dict(zip(GITHUB_FIELDS, github)), extra=extra, score=score,
+                     analysis=AnalysisRecord.from_list(analysis) if analysis is not None else None)
+        if record.languages:
+            record.languages = {sys.intern(language): size for language, size in record.languages.items()}
+        record.text_blob = bytes(view[offset:offset + text_length])
+        return record, offset + text_length
+
+
+GITHUB_FIELDS = tuple(
+    f.name for f in fields(ProjectRecord) if f.name not in ("extra", "analysis", "score", "text_blob")
+)
+
+_MISSING = object()
+
+
+def pack_records(records: list) -> bytes:
+    """Kage: Many records in one buffer: a count, then each record's binary form."""
+    return _RECORDS_COUNT.pack(len(records)) + b"".join(record.to_bytes() for record in records)
+
+
+def unpack_records(data: bytes) -> list:
+    """Kage: Reverses pack_records."""
+    view = memoryview(data)
+    (count,), offset = _RECORDS_COUNT.unpack_from(view, 0), _RECORDS_COUNT.size
+    records = []
+    for _ in range(count):
+        record, offset = ProjectRecord._read(view, offset)
+        records.append(record)
+    return records
@@ -0,0 +1,48 @@
+# app/models/resume.py
+
+from dataclasses import dataclass, field, asdict
+
+
+@dataclass
+class ResumeWorkEntry:
+    """Kage: One step of the forged path, as it will appear on the page."""
+    title: str = "N/A"
+    company: str = "N/A"
+    start_date: str = "N/A"
+    end_date: str = "N/A"
+    responsibilities: list = field(default_factory=list)
+
+
+@dataclass
+class ResumeProject:
+    """Kage: One demonstrated strength, already trimmed for display."""
+    name: str = "Unnamed Project"
+    url: str = ""
+    summary: str = ""
+    achievements: list = field(default_factory=list)
+    technologies: list = field(default_factory=list)
+    score: float = 0.0
+
+
+@dataclass
+class ResumeModel:
+    """
+    Kage: The form before it takes a shape. Content has been selected, trimmed
+    and ordered; renderers only decide how it looks, never what it says.
+    """
+    name: str = "Your Name"
+    email: str = ""
+    phone: str = ""
+    linkedin: str = ""
+    github_profile: str = ""
+    professional_summary: str = ""
+    skills: list = field(default_factory=list)
+    technologies: list = field(default_factory=list)
+    languages: list = field(default_factory=list)
+    work_experience: list = field(default_factory=list)
+    projects: list = field(default_factory=list)
+    digest: str = ""
+
+    def to_dict(self) -> dict:
+        """Kage: A plain, serializable view of the model."""
+        return asdict(self)
@@ -4,6 +4,11 @@ import json
 import re
 import httpx
 from dotenv import load_dotenv
+from app.models.project import ProjectRecord
+from app.services.metrics import stage, record_gemini_usage
+from app.services.structured_logging import get_logger
+
+logger = get_logger("analyzer")
 
 class ProjectAnalyzer:
     """
@@ -13,18 +18,22 @@ class ProjectAnalyzer:
     extracting truth from raw data.
     """
     MAX_CONTENT_LENGTH = 15000  # Max content length for prompt
+    API_BASE = "https://generativelanguage.googleapis.com/v1beta"
 
-    def __init__(self, model_name: str = "gemini-2.0-flash", api_key: str = None):
+    def __init__(self, model_name: str = "gemini-2.0-flash", api_key: str = None, api_base: str = None, cassette=None):
         """
         Kage: Initializing the ProjectAnalyzer. A weapon requires a wielder.
         Without the GEMINI_API, this blade remains sheathed.
+        `api_base` points the analyzer at another Gemini endpoint root; API_BASE by default.
+        With a `cassette`, Gemini exchanges are recorded or replayed (see app.services.cassette).
         """
         if not api_key:
             raise ValueError("GEMINI_API environment variable not set. API key is required for ProjectAnalyzer. The path is unclear without it.")
         self.api_key = api_key
         self.model_name = model_name
-        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent?key={self.api_key}"
-        print(f"[Kage] ProjectAnalyzer initialized. Gemini model: {self.model_name}. A tool sharpened for insight.")
+        self.cassette = cassette
+        self.api_url = f"{(api_base or self.API_BASE).rstrip('/')}/models/{self.model_name}:generateContent?key={self.api_key}"
+        logger.info("ProjectAnalyzer initialized. Gemini model: %s. A tool sharpened for insight.", self.model_name)
 
     def _sanitize_text(self, text: str) -> str:
         """
@@ -55,8 +64,12 @@ class ProjectAnalyzer:
                 return text[:self.MAX_CONTENT_LENGTH] + "\n... (truncated)"
             return text or "N/A"
 
-        readme = limit_and_sanitize(data.get('readme_content', ''))
-        commits = "\n".join([self._sanitize_text(c) for c in data.get('recent_commits', [])])
+        if isinstance(data, ProjectRecord):
+            readme_content, recent_commits = data.text()  # One decompression for both fields.
+        else:
+            readme_content, recent_commits = data.get('readme_content', ''), data.get('recent_commits', [])
+        readme = limit_and_sanitize(readme_content)
+        commits = "\n".join([self._sanitize_text(c) for c in recent_commits])
         commits = limit_and_sanitize(commits)
 
         jupyter_note = ""
@@ -100,7 +113,7 @@ Return JSON ONLY. No other prose.
         name = data.get('name', 'Unknown')
 
         try:
-            print(f"[Kage] Initiating analysis for '{name}'. Seeking clarity.")
+            logger.debug("Initiating analysis for '%s'. Seeking clarity.", name)
 
             payload = {
                 "contents": messages,
@@ -112,20 +125,22 @@ Return JSON ONLY. No other prose.
                 }
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.api_url,
-                    headers={'Content-Type': 'application/json'},
-                    json=payload,
-                    timeout=300.0
-                )
-                response.raise_for_status()
+            async with httpx.AsyncClient(transport=self.cassette.async_transport("gemini") if self.cassette else None) as client:
+                with stage("gemini.analyze_project"):
+                    response = await client.post(
+                        self.api_url,
+                        headers={'Content-Type': 'application/json'},
+                        json=payload,
+                        timeout=300.0
+                    )
+                    response.raise_for_status()
                 result = response.json()
+                record_gemini_usage("analyzer", result)
 
                 try:
                     json_str = result['candidates'][0]['content']['parts'][0]['text']
                 except (KeyError, IndexError, TypeError):
-                    print(f"[Kage] ❌ Observation corrupted for '{name}'. Unexpected response structure.")
+                    logger.warning("Observation corrupted for '%s'. Unexpected response structure.", name)
                     return self._fallback(name, "Invalid external response structure.")
 
                 # Remove external formatting if present. Only the core matters.
@@ -138,20 +153,20 @@ Return JSON ONLY. No other prose.
                 try:
                     parsed = json.loads(json_str)
                     parsed.setdefault('performance_metrics', {}) # Ensure structure.
-                    print(f"[Kage] Analysis complete for '{name}'. Clarity achieved.")
+                    logger.debug("Analysis complete for '%s'. Clarity achieved.", name)
                     return parsed
                 except json.JSONDecodeError as e:
-                    print(f"[Kage] ❌ Flawed interpretation for '{name}'. JSON format compromised. Error: {e}. Partial data: {json_str[:500]}...")
+                    logger.warning("Flawed interpretation for '%s'. JSON format compromised. Error: %s. Partial data: %s...", name, e, json_str[:500])
                     return self._fallback(name, f"JSON parsing failed: {e}")
 
         except httpx.RequestError as e:
-            print(f"[Kage] ❌ Connection severed during analysis of '{name}'. Network impediment: {e}")
+            logger.warning("Connection severed during analysis of '%s'. Network impediment: %s", name, e)
             return self._fallback(name, f"Network error during external analysis: {e}")
         except httpx.HTTPStatusError as e:
-            print(f"[Kage] ❌ External intelligence resisted for '{name}'. Status: {e.response.status_code}. Response: {e.response.text}")
+            logger.warning("External intelligence resisted for '%s'. Status: %s. Response: %s", name, e.response.status_code, e.response.text)
             return self._fallback(name, f"External API error: {e.response.status_code} - {e.response.text}")
         except Exception as e:
-            print(f"[Kage] ❌ An unknown shadow appeared during '{name}' analysis. Error: {e}")
+            logger.exception("An unknown shadow appeared during '%s' analysis. Error: %s", name, e)
             return self._fallback(name, f"Unexpected error during external analysis: {e}")
 
     def _fallback(self, name="Unknown", reason="Analysis failed.") -> dict:
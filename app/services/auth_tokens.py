@@ -0,0 +1,137 @@
+# app/services/auth_tokens.py
+
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from app.services.structured_logging import get_logger
+
+logger = get_logger("auth")
+
+# Kage: Where Google publishes the keys that sign Firebase ID tokens.
+ID_TOKEN_CERT_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+
+class IdTokenCache:
+    """
+    Kage: The memory of proven identities. A token verified once is trusted until
+    its own expiry, so a repeat request costs a hash and a dictionary lookup instead
+    of a signature check. Only the SHA-256 of a token is kept, never the token itself.
+
+    Verification itself (the `verifier`, e.g. firebase_admin.auth.verify_id_token)
+    runs off the event loop, and concurrent first requests with one token share a
+    single verification.
+    """
+    def __init__(self, verifier, max_entries: int = 4096):
+        """
+        Args:
+            verifier: Blocking callable taking a token and returning its claims, raising if invalid.
+            max_entries (int): Verified tokens remembered, least recently used first out.
+        """
+        self.verifier = verifier
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        """
+        Kage: Recalls the claims of a token verified before.
+
+        Returns:
+            dict: The claims, or None if unknown or expired.
+        """
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, claims = entry
+            if time.time() >= expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def _remember(self, key: str, claims: dict):
+        expires = claims.get("exp")
+        if not isinstance(expires, (int, float)) or expires <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (float(expires), claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def verify(self, token: str) -> dict:
+        """
+        Kage: Returns the claims of a valid token, from memory when possible.
+
+        Raises:
+            Whatever the verifier raises for an invalid token. Failures are never remembered.
+        """
+        claims = self.get(token)
+        if claims is not None:
+            return claims
+
+        key = self._key(token)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(asyncio.to_thread(self.verifier, token))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        claims = await asyncio.shield(pending)
+        self._remember(key, claims)
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _firebase_cert_request():
+    """
+    Kage: The HTTP request object firebase_admin verifies ID tokens with. Its session
+    caches the certificates by their Cache-Control headers, so fetching through it warms
+    the very cache verification reads. None if this firebase_admin version hides it.
+    """
+    try:
+        from firebase_admin import auth
+        return auth._get_client(None)._token_verifier.request
+    except Exception:
+        return None
+
+
+def fetch_id_token_certs() -> bool:
+    """Kage: Fetches the signing certificates through firebase_admin's cached session. Blocking."""
+    request = _firebase_cert_request()
+    if request is None:
+        return False
+    response = request(ID_TOKEN_CERT_URL, method="GET")
+    return response.status == 200
+
+
+async def keep_id_token_certs_warm(interval_seconds: float = 600.0):
+    """
+    Kage: Fetches the certificates at once, then again every interval. While the
+    cached copy is fresh a refresh is served from cache; once stale it is renewed
+    here, in the background, rather than inside a user's request.
+    """
+    warmed = False
+    while True:
+        try:
+            if await asyncio.to_thread(fetch_id_token_certs):
+                if not warmed:
+                    logger.info("ID token certificates warm.")
+                    warmed = True
+            else:
+                logger.warning("ID token certificates could not be pre-fetched; verification will fetch them on demand.")
+                return
+        except Exception as e:
+            logger.warning("ID token certificate refresh failed: %s", e)
+        await asyncio.sleep(interval_seconds)
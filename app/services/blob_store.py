@@ -0,0 +1,23 @@
+# app/services/blob_store.py
+
+import hashlib
+
+# Kage: The first byte of a packed blob names its format.
+# Project records packed by app.models.project.pack_records, already compressed field by field.
+CODEC_RECORDS = b"r"
+
+# Firestore documents are limited to 1 MiB; a chunk leaves room for its own fields.
+CHUNK_BYTES = 900 * 1024
+
+
+def codec_name(packed: bytes) -> str:
+    return {CODEC_RECORDS: "records"}.get(packed[:1], "unknown")
+
+
+def blob_digest(packed: bytes) -> str:
+    return hashlib.sha256(packed).hexdigest()
+
+
+def split_chunks(packed: bytes, chunk_bytes: int = CHUNK_BYTES) -> list:
+    """Kage: Cuts a packed blob into pieces that each fit a Firestore document."""
+    return [packed[start:start + chunk_bytes] for start in range(0, len(packed), chunk_bytes)] or [b""]
@@ -0,0 +1,281 @@
+# app/services/cassette.py
+
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import httpx
+
+from app.services.structured_logging import get_logger, request_id_var
+
+logger = get_logger("cassette")
+
+CASSETTE_FORMAT_VERSION = 1
+CASSETTE_MODES = ("record", "replay")
+
+# Kage: What never reaches a cassette. Credentials in query parameters are masked; request headers are never written.
+REDACTED = "REDACTED"
+SECRET_QUERY_PARAMS = {"key", "access_token", "client_secret", "token", "code"}
+# Response headers replayed as recorded. The rest describe the recording's transport, not the answer.
+KEPT_RESPONSE_HEADERS = {
+    "content-type", "link", "etag", "last-modified", "retry-after",
+    "x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset", "x-ratelimit-used", "x-ratelimit-resource",
+}
+
+
+class CassetteMissError(ConnectionError):
+    """Raised in replay mode when no recorded response matches a request."""
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(name, REDACTED if name.lower() in SECRET_QUERY_PARAMS else value) for name, value in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(sorted(query)), ""))
+
+
+def _body_digest(body) -> str:
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body or b"").hexdigest()
+
+
+def _encode_body(body) -> dict:
+    if isinstance(body, str):
+        return {"text": body}
+    try:
+        return {"text": (body or b"").decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(body).decode("ascii")}
+
+
+def _decode_body(entry: dict) -> bytes:
+    if "base64" in entry:
+        return base64.b64decode(entry["base64"])
+    return entry.get("text", "").encode("utf-8")
+
+
+class Cassette:
+    """
+    Kage: The memory of what GitHub and Gemini answered. In "record" mode every
+    request the listener, analyzer and CV parser make goes out as usual and the
+    exchange is appended to a JSON Lines file, credentials masked. In "replay"
+    mode nothing goes out; each request is answered from the file.
+
+    A request is matched by service, method, masked URL and body digest. A request
+    made several times is answered in recorded order, the last answer repeating.
+    Each exchange carries the correlation id of the request it served, so the
+    exchanges one user's request caused can be picked out.
+    """
+    def __init__(self, path: str, mode: str, replay_latency: bool = False):
+        """
+        Args:
+            path (str): The cassette file.
+            mode (str): "record" or "replay".
+            replay_latency (bool): In replay, wait as long as the recorded exchange took.
+                Off, replies are immediate.
+
+        Raises:
+            ValueError: If the mode is unknown.
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Cassette mode must be one of {CASSETTE_MODES}, not {mode!r}.")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = bool(replay_latency)
+        self._lock = threading.Lock()
+        self._recorded = {}
+        self._served = {}
+        if mode == "replay":
+            self._load()
+        logger.info("Cassette %s: %s.", mode, path)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @staticmethod
+    def _key(service: str, method: str, url: str, body) -> tuple:
+        return service, method.upper(), redact_url(url), _body_digest(body)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if entry.get("version", CASSETTE_FORMAT_VERSION) != CASSETTE_FORMAT_VERSION:
+                        raise ValueError(f"Cassette {self.path} has format {entry.get('version')}.")
+                    key = (entry["service"], entry["method"], entry["url"], entry["request_sha256"])
+                    self._recorded.setdefault(key, []).append(entry)
+        except FileNotFoundError:
+            logger.warning("Cassette %s does not exist; every request will miss.", self.path)
+        logger.info("Cassette %s holds %d exchanges.", self.path, sum(len(entries) for entries in self._recorded.values()))
+
+    def record(self, service: str, method: str, url: str, request_body, status: int, headers, body, elapsed: float):
+        """Kage: Appends one exchange. Credentials in the URL are masked first; request headers are not written."""
+        entry = {
+            "version": CASSETTE_FORMAT_VERSION,
+            "service": service,
+            "method": method.upper(),
+            "url": redact_url(url),
+            "request_sha256": _body_digest(request_body),
+            "request": _encode_body(request_body),
+            "status": status,
+            "headers": [[name, value] for name, value in headers if name.lower() in KEPT_RESPONSE_HEADERS],
+            "response": _encode_body(body),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "request_id": request_id_var.get(),
+            "recorded_at": round(time.time(), 3),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def lookup(self, service: str, method: str, url: str, body) -> dict:
+        """
+        Kage: The recorded exchange answering this request.
+
+        Raises:
+            CassetteMissError: If none was recorded.
+        """
+        key = self._key(service, method, url, body)
+        with self._lock:
+            entries = self._recorded.get(key)
+            if not entries:
+                logger.warning("Cassette miss: %s %s %s", service, key[1], key[2])
+                raise CassetteMissError(f"No recorded {service} response for {key[1]} {key[2]}.")
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+    @staticmethod
+    def response_of(entry: dict) -> tuple:
+        """Returns (status, header pairs, body bytes) of a recorded exchange."""
+        return entry["status"], [tuple(pair) for pair in entry["headers"]], _decode_body(entry["response"])
+
+    def async_transport(self, service: str) -> "CassetteTransport":
+        """Kage: An httpx transport for `service` that records through, or replays from, this cassette."""
+        return CassetteTransport(self, service)
+
+    def github_connection_classes(self) -> tuple:
+        """
+        Kage: (http, https) connection classes for PyGithub's
+        Requester.injectConnectionClasses. PyGithub is imported here, not before.
+        """
+        from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+        cassette = self
+
+        def connection_class(scheme: str, real_class):
+            class CassetteConnection(_GitHubCassetteConnection):
+                pass
+            CassetteConnection.cassette = cassette
+            CassetteConnection.scheme = scheme
+            CassetteConnection.real_class = real_class
+            return CassetteConnection
+
+        return connection_class("http", HTTPRequestsConnectionClass), connection_class("https", HTTPSRequestsConnectionClass)
+
+    def install_for_github(self):
+        """Kage: Routes PyGithub through this cassette. The hook is process-wide, as is the cassette."""
+        from github.Requester import Requester
+        Requester.injectConnectionClasses(*self.github_connection_classes())
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """Kage: Records or replays the requests of an httpx.AsyncClient."""
+    def __init__(self, cassette: Cassette, service: str):
+        self.cassette = cassette
+        self.service = service
+        self._transport = httpx.AsyncHTTPTransport() if cassette.recording else None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        if not self.cassette.recording:
+            try:
+                entry = self.cassette.lookup(self.service, request.method, str(request.url), body)
+            except CassetteMissError as e:
+                raise httpx.ConnectError(str(e), request=request) from e
+            if self.cassette.replay_latency:
+                await asyncio.sleep(entry["elapsed_ms"] / 1000)
+            status, headers, content = Cassette.response_of(entry)
+            return httpx.Response(status, headers=headers, content=content, request=request)
+
+        started = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        self.cassette.record(self.service, request.method, str(request.url), body, response.status_code,
+                             response.headers.multi_items(), content, time.perf_counter() - started)
+        headers = [(name, value) for name, value in response.headers.multi_items() if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self):
+        if self._transport is not None:
+            await self._transport.aclose()
+
+
+class _CassetteResponse:
+    """What PyGithub's Requester reads of a response."""
+    def __init__(self, status: int, headers: list, text: str):
+        self.status = status
+        self.headers = dict(headers)
+        self.text = text
+
+    def getheaders(self):
+        return list(self.headers.items())
+
+    def read(self):
+        return self.text
+
+
+class _GitHubCassetteConnection:
+    """The connection interface PyGithub's Requester drives; bound to a cassette by Cassette.github_connection_classes."""
+    cassette = None
+    scheme = "https"
+    real_class = None
+
+    def __init__(self, host, port=None, *args, **kwargs):
+        self.host = host
+        self.port = port
+        self._args, self._kwargs = args, kwargs
+        self._real = None
+        self._request = None
+
+    def _url(self, path: str) -> str:
+        default_port = 443 if self.scheme == "https" else 80
+        netloc = self.host if not self.port or int(self.port) == default_port else f"{self.host}:{self.port}"
+        return f"{self.scheme}://{netloc}{path}"
+
+    def request(self, verb, url, input, headers):
+        self._request = (verb, url, input, headers)
+
+    def getresponse(self):
+        verb, path, body, headers = self._request
+        if hasattr(body, "read"):
+            body = body.read()
+        url = self._url(path)
+        if not self.cassette.recording:
+            entry = self.cassette.lookup("github", verb, url, body)
+            if self.cassette.replay_latency:
+                time.sleep(entry["elapsed_ms"] / 1000)
+            status, response_headers, content = Cassette.response_of(entry)
+            return _CassetteResponse(status, response_headers, content.decode("utf-8"))
+
+        started = time.perf_counter()
+        self._real = self._real or self.real_class(self.host, self.port, *self._args, **self._kwargs)
+        self._real.request(verb, path, body, headers)
+        response = self._real.getresponse()
+        response_headers = list(response.getheaders())
+        text = response.read()
+        self.cassette.record("github", verb, url, body, response.status, response_headers, text, time.perf_counter() - started)
+        return _CassetteResponse(response.status, response_headers, text)
+
+    def close(self):
+        if self._real is not None:
+            self._real.close()
@@ -0,0 +1,161 @@
+# app/services/cv_bulk.py
+
+import os
+import time
+import asyncio
+import zipfile
+import tempfile
+
+from app.services.cv_cache import ParsedCVCache
+from app.services.cv_parser import CVParser, SUPPORTED_CV_EXTENSIONS
+from app.services.structured_logging import get_logger
+
+logger = get_logger("cv_bulk")
+
+
+class BulkLimitError(ValueError):
+    """Raised when a bulk batch holds more CVs than the configured limit."""
+
+
+class BulkCVIngestor:
+    """
+    Kage: Absorbs many forms at once. Zip archives are opened, every CV becomes one
+    job, and jobs run concurrently: extraction in the parser's worker pool, parsing
+    through the parser's rate-governed Gemini gate. Results are yielded as each job
+    finishes, not when the batch does.
+    """
+    BULK_ARCHIVE_EXTENSIONS = (".zip",)
+    # Bulk results are cached apart from the user's own CV, which /upload-cv purges on every upload.
+    CACHE_SCOPE_PREFIX = "bulk:"
+
+    def __init__(self, cv_parser: CVParser, max_files: int = 500, max_file_bytes: int = 10 * 1024 * 1024, concurrency: int = 8):
+        """
+        Args:
+            cv_parser (CVParser): The parser doing the work; its cache and rate limiter apply.
+            max_files (int): CVs allowed per batch, archive members included.
+            max_file_bytes (int): Size cap of a single CV, archive members included.
+            concurrency (int): Jobs in flight at once.
+        """
+        self.cv_parser = cv_parser
+        self.max_files = max(1, int(max_files))
+        self.max_file_bytes = max(1, int(max_file_bytes))
+        self.concurrency = max(1, int(concurrency))
+
+    @classmethod
+    def accepts(cls, filename: str) -> bool:
+        return os.path.splitext(filename or "")[1].lower() in SUPPORTED_CV_EXTENSIONS + cls.BULK_ARCHIVE_EXTENSIONS
+
+    def expand(self, uploads: list) -> list:
+        """
+        Kage: Turns uploaded files into jobs. Archives yield one job per supported member;
+        anything unreadable or unsupported becomes a job that only reports its error.
+
+        Args:
+            uploads (list): (filename, spooled file, content hash or None) tuples.
+
+        Returns:
+            list: Job dicts with "filename" and either "source"/"extension"/"content_hash",
+                  a zip "member", or an "error".
+
+        Raises:
+            BulkLimitError: If the batch holds more than max_files CVs.
+        """
+        jobs = []
+        for filename, spooled, content_hash in uploads:
+            extension = os.path.splitext(filename or "")[1].lower()
+            if extension in SUPPORTED_CV_EXTENSIONS:
+                jobs.append({"filename": filename, "extension": extension, "source": spooled, "content_hash": content_hash})
+            elif extension in self.BULK_ARCHIVE_EXTENSIONS:
+                jobs.extend(self._expand_archive(filename, spooled))
+            else:
+                jobs.append({"filename": filename, "error": "Unsupported file type. Only .docx, .pdf and .zip are accepted."})
+            if len(jobs) > self.max_files:
+                raise BulkLimitError(f"Batch exceeds the {self.max_files} CV limit.")
+        return jobs
+
+    def _expand_archive(self, filename: str, spooled) -> list:
+        try:
+            archive = zipfile.ZipFile(spooled)
+        except zipfile.BadZipFile as e:
+            return [{"filename": filename, "error": f"Unreadable archive: {e}"}]
+
+        jobs = []
+        for info in archive.infolist():
+            member_name = info.filename
+            base_name = os.path.basename(member_name)
+            if info.is_dir() or member_name.startswith("__MACOSX/") or not base_name or base_name.startswith("."):
+                continue
+            display_name = f"{filename}/{member_name}"
+            extension = os.path.splitext(base_name)[1].lower()
+            if extension not in SUPPORTED_CV_EXTENSIONS:
+                jobs.append({"filename": display_name, "error": "Unsupported file type. Only .docx and .pdf are accepted."})
+            elif info.file_size > self.max_file_bytes:
+                jobs.append({"filename": display_name, "error": f"CV exceeds the {self.max_file_bytes:,} byte limit."})
+            else:
+                jobs.append({"filename": display_name, "extension": extension, "archive": archive, "member": info})
+            if len(jobs) > self.max_files:
+                break
+        return jobs
+
+    def _read_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """Copies one archive member into a spooled file, hashing it on the way. The declared size is not trusted."""
+        spooled = tempfile.SpooledTemporaryFile(max_size=CVParser.SPOOL_MEMORY_BYTES, mode="w+b", prefix="kaku-cv-")
+        hasher = ParsedCVCache.new_hasher()
+        size = 0
+        try:
+            with archive.open(info) as member:
+                for chunk in iter(lambda: member.read(CVParser.UPLOAD_CHUNK_BYTES), b""):
+                    size += len(chunk)
+                    if size > self.max_file_bytes:
+                        raise ValueError(f"CV exceeds the {self.max_file_bytes:,} byte limit.")
+                    hasher.update(chunk)
+                    spooled.write(chunk)
+        except BaseException:
+            spooled.close()
+            raise
+        spooled.seek(0)
+        return spooled, hasher.hexdigest()
+
+    async def _run_job(self, index: int, job: dict, cache_scope: str, semaphore: asyncio.Semaphore) -> dict:
+        result = {"index": index, "filename": job["filename"]}
+        if job.get("error"):
+            return {**result, "status": "error", "error": job["error"]}
+
+        async with semaphore:
+            started = time.monotonic()
+            member_file = None
+            try:
+                source, content_hash = job.get("source"), job.get("content_hash")
+                if job.get("member") is not None:
+                    loop = asyncio.get_running_loop()
+                    member_file, content_hash = await loop.run_in_executor(None, self._read_member, job["archive"], job["member"])
+                    source = member_file
+                data = await self.cv_parser.parse_cv_async(source, job["extension"], user_id=cache_scope, content_hash=content_hash)
+                return {**result, "status": "ok", "seconds": round(time.monotonic() - started, 3), "data": data}
+            except Exception as e:
+                logger.warning("%s failed: %s", job['filename'], e)
+                return {**result, "status": "error", "error": str(e)}
+            finally:
+                if member_file is not None:
+                    member_file.close()
+
+    async def stream(self, jobs: list, user_id: str = None):
+        """
+        Kage: Runs the jobs and yields one result dict per CV as it completes, then a
+        closing {"summary": ...}. Abandoning the generator cancels the jobs still pending.
+        """
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        cache_scope = f"{self.CACHE_SCOPE_PREFIX}{user_id}" if user_id else None
+        tasks = [asyncio.create_task(self._run_job(index, job, cache_scope, semaphore)) for index, job in enumerate(jobs)]
+        counts = {"ok": 0, "error": 0}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                counts[result["status"]] += 1
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        yield {"summary": {"files": len(jobs), **counts, "seconds": round(time.monotonic() - started, 3)}}
@@ -0,0 +1,234 @@
+# app/services/cv_cache.py
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from app.services.structured_logging import get_logger
+
+logger = get_logger("cv_cache")
+
+
+class ParsedCVCache:
+    """
+    Kage: The memory of absorbed forms. A CV is known by the SHA-256 of its bytes;
+    what was extracted from it, and what Gemini made of that text, are remembered
+    on local disk so a re-upload of the same file costs neither extraction nor a call.
+
+    Entries are scoped per user: one user's upload never answers another's. Parsed
+    data is tied to the model that produced it; a different model re-parses from
+    the remembered text.
+
+    What is remembered is personal data, so it does not stay: an entry expires
+    `ttl` seconds after it was written, the oldest entries go once the cache
+    outgrows `max_bytes`, and a user's entries go when their CV is replaced
+    (see purge_user).
+    """
+    def __init__(self, cache_dir: str, max_memory_entries: int = 64, ttl: float = 7 * 24 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            cache_dir (str): Root directory of the cache. Created if absent.
+            max_memory_entries (int): Entries also held in memory, least recently used first out.
+            ttl (float): Seconds an entry is kept after it was written. 0 keeps entries until evicted.
+            max_bytes (int): Disk size the entries may take together. 0 sets no limit.
+        """
+        self.root = os.path.join(cache_dir, "parsed_cv")
+        self.max_memory_entries = max(0, int(max_memory_entries))
+        self.ttl = max(0.0, float(ttl))
+        self.max_bytes = max(0, int(max_bytes))
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        os.makedirs(self.root, exist_ok=True)
+        removed = self.sweep()
+        logger.info("ParsedCVCache initialized at %s (%s bytes held, %s entries expired or evicted).", self.root, self._bytes, removed)
+
+    @staticmethod
+    def new_hasher():
+        """Kage: The hasher fed while an upload is spooled, so no second pass is needed."""
+        return hashlib.sha256()
+
+    @staticmethod
+    def hash_file(source, chunk_size: int = 64 * 1024) -> str:
+        """
+        Kage: Hashes a file path or seekable binary file object. File objects are
+        returned to position 0.
+        """
+        hasher = hashlib.sha256()
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as handle:
+                for chunk in iter(lambda: handle.read(chunk_size), b""):
+                    hasher.update(chunk)
+            return hasher.hexdigest()
+        source.seek(0)
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            hasher.update(chunk)
+        source.seek(0)
+        return hasher.hexdigest()
+
+    def _user_dir(self, user_id: str) -> str:
+        # The user id is hashed so it never shapes a path directly.
+        return os.path.join(self.root, hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32])
+
+    def _path(self, user_id: str, content_hash: str) -> str:
+        return os.path.join(self._user_dir(user_id), f"{content_hash}.json")
+
+    def _expired(self, written_at: float, now: float = None) -> bool:
+        return bool(self.ttl) and (now or time.time()) - written_at > self.ttl
+
+    def _remember(self, path: str, entry: dict, written_at: float):
+        if not self.max_memory_entries:
+            return
+        with self._lock:
+            self._memory[path] = (written_at, entry)
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _discard(self, path: str):
+        with self._lock:
+            self._memory.pop(path, None)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Could not remove CV cache entry %s: %s", path, e)
+
+    def _scan(self) -> list:
+        """(path, written_at, size) of every entry on disk."""
+        entries = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def sweep(self) -> int:
+        """
+        Kage: Removes expired entries, then the oldest ones until the cache is back
+        under nine tenths of max_bytes.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        now = time.time()
+        kept, total, removed = [], 0, 0
+        for path, written_at, size in self._scan():
+            if self._expired(written_at, now):
+                self._discard(path)
+                removed += 1
+            else:
+                kept.append((written_at, path, size))
+                total += size
+        if self.max_bytes and total > self.max_bytes:
+            kept.sort()
+            for _, path, size in kept:
+                if total <= self.max_bytes * 0.9:
+                    break
+                self._discard(path)
+                total -= size
+                removed += 1
+        with self._lock:
+            self._bytes = total
+        if removed:
+            logger.info("CV cache sweep removed %s entries; %s bytes held.", removed, total)
+        return removed
+
+    def purge_user(self, user_id: str, keep: str = None) -> int:
+        """
+        Kage: Forgets every CV of a user, except the one with content hash `keep`.
+        Called when the user's CV is replaced.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        user_dir = self._user_dir(user_id)
+        try:
+            filenames = os.listdir(user_dir)
+        except FileNotFoundError:
+            return 0
+        removed = 0
+        for filename in filenames:
+            if filename.endswith(".json") and filename != f"{keep}.json":
+                self._discard(os.path.join(user_dir, filename))
+                removed += 1
+        if removed:
+            logger.debug("Removed %s cached CV(s) of a replaced profile.", removed)
+        return removed
+
+    def get(self, user_id: str, content_hash: str):
+        """
+        Kage: Recalls what is known of a CV.
+
+        Returns:
+            dict: {"text": str, "parsed": dict or None, "model": str or None}, or None if unknown.
+        """
+        path = self._path(user_id, content_hash)
+        with self._lock:
+            remembered = self._memory.get(path)
+            if remembered is not None:
+                self._memory.move_to_end(path)
+        if remembered is not None:
+            if not self._expired(remembered[0]) and os.path.exists(path):
+                return remembered[1]
+            self._discard(path)
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                written_at = os.fstat(handle.fileno()).st_mtime
+                if self._expired(written_at):
+                    handle.close()
+                    self._discard(path)
+                    return None
+                entry = json.load(handle)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Unreadable CV cache entry %s: %s", path, e)
+            return None
+        self._remember(path, entry, written_at)
+        return entry
+
+    def put(self, user_id: str, content_hash: str, text: str, parsed: dict = None, model: str = None):
+        """
+        Kage: Remembers the extracted text of a CV and, when parsing succeeded, its
+        parsed data. The file is replaced atomically; a failed write is reported, not raised.
+        A write that takes the cache past max_bytes sweeps it.
+        """
+        path = self._path(user_id, content_hash)
+        entry = {"text": text, "parsed": parsed, "model": model if parsed is not None else None}
+        over_limit = False
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                    json.dump(entry, handle, ensure_ascii=False)
+                    size = handle.tell()
+                try:
+                    replaced = os.stat(path).st_size
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            with self._lock:
+                # Kage: An overwritten entry no longer counts; only the difference is added.
+                self._bytes += size - replaced
+                over_limit = bool(self.max_bytes) and self._bytes > self.max_bytes
+        except OSError as e:
+            logger.warning("Could not persist CV cache entry %s: %s", path, e)
+        self._remember(path, entry, time.time())
+        if over_limit:
+            self.sweep()
@@ -1,30 +1,86 @@
 # app/services/cv_parser.py
 
+import io
 import os
 import json
-import requests
+import asyncio
+import tempfile
+import functools
+import contextlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import httpx
 from dotenv import load_dotenv
 import re
-from docx import Document
-from pypdf import PdfReader # For PDF text extraction
+from app.services.pdf_text import PDFTextExtractor, PartialText
+from app.services.cv_cache import ParsedCVCache
+from app.services.cv_sections import LocalCVExtract
+from app.services.rate_limit import AsyncRateLimiter
+from app.services.metrics import stage, record_gemini_usage
+from app.services.structured_logging import get_logger
 
 # Load environment variables
 load_dotenv()
 
+logger = get_logger("cv_parser")
+
+SUPPORTED_CV_EXTENSIONS = (".docx", ".pdf")
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an uploaded CV exceeds the configured size cap."""
+
+
+def _docx_text(data: bytes) -> str:
+    """Kage: Reads a .docx in a worker process; python-docx holds the GIL for the whole parse."""
+    from docx import Document  # python-docx is loaded with the first .docx, not at startup.
+    return "\n".join(paragraph.text for paragraph in Document(io.BytesIO(data)).paragraphs)
+
+
 class CVParser:
-    def __init__(self, api_url="https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent", model_name="gemini-2.0-flash", api_key: str = None):
+    # Uploads are held in memory up to this size, then rolled over to an anonymous temp file.
+    SPOOL_MEMORY_BYTES = 1024 * 1024
+    UPLOAD_CHUNK_BYTES = 64 * 1024
+    MAX_CV_TEXT_LENGTH = 20000 # Characters
+    REQUEST_TIMEOUT_SECONDS = 180
+    RATE_LIMIT_RETRIES = 2
+
+    def __init__(self, api_url="https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent", model_name="gemini-2.0-flash", api_key: str = None, extraction_workers: int = None, cache: ParsedCVCache = None, rate_limiter: AsyncRateLimiter = None, cassette=None):
         """
         Initializes the CVParser with Google Gemini API configuration.
         Args:
             api_url (str): The base URL for the Gemini API's generateContent endpoint.
             model_name (str): The name of the Gemini model to use.
             api_key (str, optional): The Gemini API key. If None, it falls back to GEMINI_API environment variable.
+            extraction_workers (int, optional): Extractions run at once, and the size of the
+                process pool reading .docx files. Defaults to CV_EXTRACT_WORKERS, then to the CPU count.
+            cache (ParsedCVCache, optional): Remembers extraction output and parsed data by
+                file content hash and user. Without it every upload is parsed afresh.
+            rate_limiter (AsyncRateLimiter, optional): Paces Gemini calls to the API quota.
+                Without it calls go out as soon as they are made.
+            cassette (Cassette, optional): Records Gemini exchanges, or replays them (see app.services.cassette).
         """
         self.api_url = api_url
         self.model_name = model_name
         self.api_key = api_key if api_key else os.getenv("GEMINI_API", "")
-
-        print(f"[Kage CV Parser] CVParser init: GEMINI_API key loaded: {'(not set or empty)' if not self.api_key else '*****' + self.api_key[-4:]}")
+        self.extraction_workers = max(1, int(extraction_workers or os.getenv("CV_EXTRACT_WORKERS", 0)) or os.cpu_count() or 1)
+        # Threads only wait here: PDF pages are read by the extractor's processes, .docx files by _docx_pool.
+        self._extraction_pool = ThreadPoolExecutor(max_workers=self.extraction_workers, thread_name_prefix="cv-extract")
+        methods = multiprocessing.get_all_start_methods()
+        self._docx_pool = ProcessPoolExecutor(
+            max_workers=self.extraction_workers,
+            mp_context=multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn"),
+        )
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.cassette = cassette
+        self._pdf_extractor = PDFTextExtractor(
+            max_workers=int(os.getenv("CV_PDF_WORKERS", 0)) or None,
+            time_budget=float(os.getenv("CV_PDF_TIME_BUDGET", 15)),
+            max_chars=self.MAX_CV_TEXT_LENGTH,
+        )
+
+        logger.info("CVParser init: GEMINI_API key loaded: %s", '(not set or empty)' if not self.api_key else '*****' + self.api_key[-4:])
 
         if not self.api_key:
             raise ValueError(
@@ -32,32 +88,86 @@ class CVParser:
                 "'GEMINI_API' entry in your .env file in the root directory, "
                 "or that the environment variable is otherwise provided."
             )
-        print(f"[Kage CV Parser] CVParser initialized for Gemini model: {self.model_name}")
+        logger.info("CVParser initialized for Gemini model: %s", self.model_name)
 
-    def _extract_text_from_docx(self, docx_path: str) -> str:
-        """Extracts text from a .docx file."""
+    def _extract_text_from_docx(self, docx_source) -> str:
+        """Extracts text from a .docx file path or binary file object, in the parser's process pool."""
         try:
-            document = Document(docx_path)
-            full_text = []
-            for para in document.paragraphs:
-                full_text.append(para.text)
-            return "\n".join(full_text)
+            if isinstance(docx_source, (str, os.PathLike)):
+                with open(docx_source, "rb") as handle:
+                    data = handle.read()
+            else:
+                docx_source.seek(0)
+                data = docx_source.read()
+            return self._docx_pool.submit(_docx_text, data).result()
         except Exception as e:
-            print(f"Error extracting text from DOCX {docx_path}: {e}")
+            logger.warning("Error extracting text from DOCX %s: %s", getattr(docx_source, 'name', docx_source), e)
             return ""
 
-    def _extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extracts text from a .pdf file using pypdf."""
+    def _extract_text_from_pdf(self, pdf_source) -> str:
+        """
+        Extracts text from a .pdf file path or binary file object. Page ranges are
+        extracted in parallel processes, stop at MAX_CV_TEXT_LENGTH characters and
+        are bounded by the per-document time budget.
+        """
         try:
-            reader = PdfReader(pdf_path)
-            full_text = []
-            for page in reader.pages:
-                full_text.append(page.extract_text())
-            return "\n".join(full_text)
+            return self._pdf_extractor.extract(pdf_source)
         except Exception as e:
-            print(f"Error extracting text from PDF {pdf_path}: {e}")
+            logger.warning("Error extracting text from PDF %s: %s", getattr(pdf_source, 'name', pdf_source), e)
             return ""
 
+    def _extract_text(self, source, file_extension: str) -> str:
+        """
+        Dispatches text extraction on the file extension.
+        Args:
+            source: A file path or a seekable binary file object.
+            file_extension (str): ".docx" or ".pdf".
+        """
+        if file_extension == ".docx":
+            return self._extract_text_from_docx(source)
+        if file_extension == ".pdf":
+            return self._extract_text_from_pdf(source)
+        raise ValueError("Unsupported file type. Only .docx and .pdf are supported.")
+
+    @classmethod
+    async def spool_upload(cls, upload, max_bytes: int, hasher=None, memory_bytes: int = None):
+        """
+        Streams an upload into a spooled temporary file, chunk by chunk, so the whole
+        file is never held in memory at once and no shared path is ever written.
+        Args:
+            upload: Any object with an async `read(size)` method (e.g. FastAPI's UploadFile).
+            max_bytes (int): The size cap.
+            hasher (optional): A hashlib object fed every chunk, so the content hash
+                comes for free (see ParsedCVCache.new_hasher).
+            memory_bytes (int, optional): How much may stay in memory before the file
+                moves to disk. Defaults to SPOOL_MEMORY_BYTES; 0 or less goes to disk at once.
+        Returns:
+            tuple: (spooled file positioned at 0, size in bytes). The caller closes it.
+        Raises:
+            UploadTooLargeError: If the upload exceeds max_bytes.
+        """
+        memory_bytes = cls.SPOOL_MEMORY_BYTES if memory_bytes is None else int(memory_bytes)
+        spooled = tempfile.SpooledTemporaryFile(max_size=max(1, memory_bytes), mode="w+b", prefix="kaku-cv-")
+        size = 0
+        try:
+            if memory_bytes <= 0:
+                spooled.rollover()
+            while True:
+                chunk = await upload.read(cls.UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"CV exceeds the {max_bytes:,} byte limit.")
+                spooled.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+        except BaseException:
+            spooled.close()
+            raise
+        spooled.seek(0)
+        return spooled, size
+
     def _sanitize_text(self, text: str) -> str:
         """
         Sanitizes text to remove or replace problematic Unicode characters that might cause
@@ -85,6 +195,7 @@ class CVParser:
     def parse_cv(self, cv_path: str) -> dict:
         """
         Parses a CV file (DOCX or PDF) to extract structured information using Gemini.
+        Blocking convenience wrapper around parse_cv_async, for scripts outside an event loop.
         Args:
             cv_path (str): The path to the CV file.
         Returns:
@@ -93,27 +204,92 @@ class CVParser:
                   languages, work_experience).
         """
         file_extension = os.path.splitext(cv_path)[1].lower()
-        cv_text = ""
+        if file_extension not in SUPPORTED_CV_EXTENSIONS:
+            raise ValueError("Unsupported file type. Only .docx and .pdf are supported.")
+        with open(cv_path, "rb") as cv_file:
+            return asyncio.run(self.parse_cv_async(cv_file, file_extension))
 
-        if file_extension == ".docx":
-            cv_text = self._extract_text_from_docx(cv_path)
-        elif file_extension == ".pdf":
-            cv_text = self._extract_text_from_pdf(cv_path)
-        else:
+    async def extract_text_async(self, source, file_extension: str) -> str:
+        """
+        Runs the blocking pypdf/python-docx extraction in the parser's worker pool,
+        keeping the event loop free.
+        """
+        loop = asyncio.get_running_loop()
+        with stage(f"cv_parser.extract{file_extension}"):
+            return await loop.run_in_executor(self._extraction_pool, self._extract_text, source, file_extension)
+
+    async def parse_cv_async(self, source, file_extension: str, user_id: str = None, content_hash: str = None) -> dict:
+        """
+        Parses a CV without blocking the event loop: extraction runs in the worker pool,
+        the Gemini call goes through an async HTTP client.
+
+        With a cache and a user id, a file already seen for that user is answered from
+        the cache: parsed data is returned as is, and remembered text skips extraction.
+        Args:
+            source: A file path or a seekable binary file object.
+            file_extension (str): ".docx" or ".pdf".
+            user_id (str, optional): Scopes the cache entry. Without it the cache is bypassed.
+            content_hash (str, optional): SHA-256 hex digest of the file, if already known
+                (e.g. computed while spooling). Computed from the source otherwise.
+        Returns:
+            dict: Parsed CV data, or the fallback structure on failure.
+        """
+        if file_extension not in SUPPORTED_CV_EXTENSIONS:
             raise ValueError("Unsupported file type. Only .docx and .pdf are supported.")
 
+        use_cache = self.cache is not None and bool(user_id)
+        cached = None
+        loop = asyncio.get_running_loop()
+        if use_cache:
+            # Kage: Hashing and the cache read and write touch the disk, so they run in the worker pool.
+            if not content_hash:
+                content_hash = await loop.run_in_executor(self._extraction_pool, ParsedCVCache.hash_file, source)
+            cached = await loop.run_in_executor(self._extraction_pool, self.cache.get, user_id, content_hash)
+            if cached and cached.get("parsed") is not None and cached.get("model") == self.model_name:
+                logger.debug("CV %s recalled from cache.", content_hash[:12])
+                return dict(cached["parsed"])
+
+        if cached and cached.get("text"):
+            cv_text = cached["text"]
+        else:
+            cv_text = await self.extract_text_async(source, file_extension)
         if not cv_text:
-            print(f"[Kage CV Parser] No text extracted from {cv_path}.")
+            logger.warning("No text extracted from %s.", getattr(source, 'name', source))
             return self._fallback_data()
 
+        local = LocalCVExtract(cv_text)
+        parsed_data = await self._request_parse(cv_text, local)
+        # Kage: Text the time budget cut short, and what was parsed from it, are not remembered; another try may read it whole.
+        if use_cache and not isinstance(cv_text, PartialText):
+            await loop.run_in_executor(
+                self._extraction_pool,
+                functools.partial(self.cache.put, user_id, content_hash, cv_text, parsed=parsed_data, model=self.model_name),
+            )
+        return parsed_data if parsed_data is not None else self._fallback_data(local)
+
+    def _build_payload(self, cv_text: str, local: LocalCVExtract = None) -> dict:
+        """
+        Builds the Gemini request payload for an extracted CV text. Only the sections the
+        LLM has to interpret are sent, and contact fields already found locally are not asked for.
+        """
+        local = local or LocalCVExtract(cv_text)
+        ask_contact = [field for field in ("email", "phone", "linkedin") if field in local.missing_contact_fields]
+
         # Sanitize the extracted text before sending to the LLM
-        sanitized_cv_text = self._sanitize_text(cv_text)
+        sanitized_cv_text = self._sanitize_text(local.llm_text())
         
         # Limit the CV text length to prevent excessively long prompts
-        MAX_CV_TEXT_LENGTH = 20000 # Characters
-        if len(sanitized_cv_text) > MAX_CV_TEXT_LENGTH:
-            sanitized_cv_text = sanitized_cv_text[:MAX_CV_TEXT_LENGTH] + "\n... (truncated CV content)"
-            print(f"[Kage CV Parser] CV text truncated for LLM processing.")
+        if len(sanitized_cv_text) > self.MAX_CV_TEXT_LENGTH:
+            sanitized_cv_text = sanitized_cv_text[:self.MAX_CV_TEXT_LENGTH] + "\n... (truncated CV content)"
+            logger.debug("CV text truncated for LLM processing.")
+
+        contact_descriptions = {
+            "email": "Candidate's email address.",
+            "phone": "Candidate's phone number.",
+            "linkedin": "URL of the candidate's LinkedIn profile.",
+        }
+        contact_instructions = "".join(f'- "{field}": {contact_descriptions[field]}\n' for field in ask_contact)
+        contact_template = "".join(f'  "{field}": "N/A",\n' for field in ask_contact)
 
         prompt = f"""
 You are an expert CV parser. Analyze the following CV text and extract the information into a structured JSON format. Provide no explanations, no markdown, only the JSON. Ensure the JSON is clean, valid, and immediately usable.
@@ -125,10 +301,7 @@ CV Text:
 
 Extract the following fields:
 - "name": Full name of the candidate.
-- "email": Candidate's email address.
-- "phone": Candidate's phone number.
-- "linkedin": URL of the candidate's LinkedIn profile.
-- "professional_summary": A concise professional summary (1-3 sentences) from the CV.
+{contact_instructions}- "professional_summary": A concise professional summary (1-3 sentences) from the CV.
 - "user_defined_skills": A list of key skills mentioned in the CV (e.g., "Project Management", "Data Analysis", "Cloud Computing").
 - "user_defined_technologies": A list of specific technologies/tools mentioned (e.g., "Python", "React", "AWS", "Docker", "TensorFlow").
 - "spoken_languages": A list of human spoken languages mentioned (e.g., "English (Fluent)", "Spanish (Conversational)").
@@ -144,10 +317,7 @@ If a field is not found or applicable, use "N/A" for strings, empty list [] for
 Return JSON only:
 {{
   "name": "N/A",
-  "email": "N/A",
-  "phone": "N/A",
-  "linkedin": "N/A",
-  "professional_summary": "N/A",
+{contact_template}  "professional_summary": "N/A",
   "user_defined_skills": [],
   "user_defined_technologies": [],
   "spoken_languages": [],
@@ -175,9 +345,7 @@ Return JSON only:
                     "type": "OBJECT",
                     "properties": {
                         "name": {"type": "STRING"},
-                        "email": {"type": "STRING"},
-                        "phone": {"type": "STRING"},
-                        "linkedin": {"type": "STRING"},
+                        **{field: {"type": "STRING"} for field in ask_contact},
                         "professional_summary": {"type": "STRING"},
                         "user_defined_skills": {"type": "ARRAY", "items": {"type": "STRING"}},
                         "user_defined_technologies": {"type": "ARRAY", "items": {"type": "STRING"}},
@@ -197,41 +365,63 @@ Return JSON only:
                             }
                         }
                     },
-                    "required": ["name", "email", "phone", "linkedin", "professional_summary", "user_defined_skills", "user_defined_technologies", "spoken_languages", "work_experience"]
+                    "required": ["name", *ask_contact, "professional_summary", "user_defined_skills", "user_defined_technologies", "spoken_languages", "work_experience"]
                 },
                 "temperature": 0.2,
                 "topP": 0.9
             }
         }
+        return payload
 
+    async def parse_text_async(self, cv_text: str) -> dict:
+        """
+        Sends extracted CV text to Gemini through an async client and normalizes the answer.
+        Args:
+            cv_text (str): The raw extracted text.
+        Returns:
+            dict: Parsed CV data, or the fallback structure on failure.
+        """
+        local = LocalCVExtract(cv_text)
+        parsed_data = await self._request_parse(cv_text, local)
+        return parsed_data if parsed_data is not None else self._fallback_data(local)
+
+    async def _request_parse(self, cv_text: str, local: LocalCVExtract = None):
+        """
+        Gemini call behind parse_text_async. Locally extracted contact fields take
+        precedence over the LLM's answer.
+        Returns:
+            dict: Parsed CV data, or None on failure so that failures are never cached.
+        """
+        local = local or LocalCVExtract(cv_text)
+        payload = self._build_payload(cv_text, local)
         text = "" # Initialize text for error messages
 
         try:
-            print(f"[Kage CV Parser] Sending CV text to Gemini for parsing...")
-            api_url_with_key = f"{self.api_url}?key={self.api_key}"
-            
-            res = requests.post(api_url_with_key, headers={'Content-Type': 'application/json'}, json=payload, timeout=180)
-            res.raise_for_status()
+            logger.debug("Sending CV text to Gemini for parsing.")
+            async with httpx.AsyncClient(transport=self.cassette.async_transport("gemini") if self.cassette else None) as client:
+                res = await self._post_gemini(client, payload)
+                res.raise_for_status()
+                gemini_response = res.json()
+            record_gemini_usage("cv_parser", gemini_response)
 
-            gemini_response = res.json()
             if gemini_response.get("candidates") and len(gemini_response["candidates"]) > 0 and \
                gemini_response["candidates"][0].get("content") and \
                gemini_response["candidates"][0]["content"].get("parts") and \
                len(gemini_response["candidates"][0]["content"]["parts"]) > 0:
                 text = gemini_response["candidates"][0]["content"]["parts"][0].get("text", "")
             else:
-                print(f"[Kage CV Parser] ❌ Gemini response structure unexpected: {gemini_response}")
-                return self._fallback_data()
+                logger.warning("Gemini response structure unexpected: %s", gemini_response)
+                return None
 
             parsed_data = json.loads(text)
-            print(f"[Kage CV Parser] CV parsed successfully.")
+            logger.debug("CV parsed successfully.")
             
             final_parsed_data = {
-                "name": parsed_data.get("name", "N/A"),
-                "email": parsed_data.get("email", "N/A"),
-                "phone": parsed_data.get("phone", "N/A"),
-                "linkedin": parsed_data.get("linkedin", "N/A"),
-                "github_profile": parsed_data.get("github_profile", "N/A"),
+                "name": parsed_data.get("name") or local.name or "N/A",
+                "email": local.contact["email"] or parsed_data.get("email", "N/A"),
+                "phone": local.contact["phone"] or parsed_data.get("phone", "N/A"),
+                "linkedin": local.contact["linkedin"] or parsed_data.get("linkedin", "N/A"),
+                "github_profile": local.contact["github_profile"] or parsed_data.get("github_profile", "N/A"),
                 "professional_summary": parsed_data.get("professional_summary", "N/A"),
                 "user_defined_skills": parsed_data.get("user_defined_skills", []),
                 "user_defined_technologies": parsed_data.get("user_defined_technologies", []),
@@ -240,27 +430,61 @@ Return JSON only:
             }
             return final_parsed_data
 
-        except requests.exceptions.ConnectionError:
-            print(f"[Kage CV Parser] ❌ Cannot reach Gemini API. Check network connection.")
-        except requests.exceptions.Timeout:
-            print(f"[Kage CV Parser] ❌ Timeout during CV parsing with Gemini API.")
-        except requests.exceptions.RequestException as e:
-            error_details = f"Status Code: {e.response.status_code if e.response else 'N/A'}"
-            if e.response and e.response.text:
+        except httpx.ConnectError:
+            logger.error("Cannot reach Gemini API. Check network connection.")
+        except httpx.TimeoutException:
+            logger.error("Timeout during CV parsing with Gemini API.")
+        except httpx.HTTPStatusError as e:
+            error_details = f"Status Code: {e.response.status_code}"
+            if e.response.text:
                 error_details += f", Response Body: {e.response.text}"
-            print(f"[Kage CV Parser] ❌ HTTP error with Gemini API: {e}. Details: {error_details}")
-            print(f"Gemini Raw Output (if available): {text[:500]}...")
+            logger.error("HTTP error with Gemini API: %s. Details: %s", e, error_details)
+            logger.debug("Gemini Raw Output (if available): %s...", text[:500])
+        except httpx.RequestError as e:
+            logger.error("Request error with Gemini API: %s", e)
         except json.JSONDecodeError:
-            print(f"[Kage CV Parser] ❌ JSON parsing failed from Gemini API. Output:\n{text}")
+            logger.error("JSON parsing failed from Gemini API. Output:\n%s", text)
         except Exception as e:
-            print(f"[Kage CV Parser] ❌ Unexpected error during CV parsing: {e}")
+            logger.exception("Unexpected error during CV parsing: %s", e)
 
-        return self._fallback_data()
+        return None
 
-    def _fallback_data(self) -> dict:
-        """Returns a default structure in case of parsing failure."""
-        print("[Kage CV Parser] Using fallback data for CV parsing.")
-        return {
+    async def _post_gemini(self, client: httpx.AsyncClient, payload: dict) -> httpx.Response:
+        """
+        Posts a request to Gemini through the rate limiter, if any. HTTP 429 is retried
+        up to RATE_LIMIT_RETRIES times after the pause the API advises (Retry-After),
+        or an exponential one.
+        """
+        for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+            async with (self.rate_limiter or contextlib.nullcontext()):
+                with stage("gemini.cv_parse"):
+                    res = await client.post(
+                        self.api_url,
+                        params={"key": self.api_key},
+                        headers={'Content-Type': 'application/json'},
+                        json=payload,
+                        timeout=self.REQUEST_TIMEOUT_SECONDS
+                    )
+            if res.status_code != 429 or attempt == self.RATE_LIMIT_RETRIES:
+                return res
+            try:
+                delay = float(res.headers.get("Retry-After", ""))
+            except ValueError:
+                delay = 2.0 ** (attempt + 1)
+            logger.warning("Gemini rate limit reached. Retrying in %gs.", delay)
+            if self.rate_limiter is not None:
+                self.rate_limiter.penalize(delay)
+            else:
+                await asyncio.sleep(delay)
+        return res
+
+    def _fallback_data(self, local: LocalCVExtract = None) -> dict:
+        """
+        Returns a default structure in case of parsing failure. Whatever was read
+        locally (contact fields, name, skill and language lists) is kept.
+        """
+        logger.info("Using fallback data for CV parsing.")
+        fallback = {
             "name": "N/A",
             "email": "N/A",
             "phone": "N/A",
@@ -272,6 +496,11 @@ Return JSON only:
             "languages": [],
             "work_experience": [] # Fallback for list of objects
         }
+        if local is not None:
+            fallback.update(local.fields())
+            if local.sections.get("summary"):
+                fallback["professional_summary"] = local.sections["summary"]
+        return fallback
 
 # Example Usage:
 if __name__ == "__main__":
@@ -342,6 +571,7 @@ if __name__ == "__main__":
 
     # Save dummy DOCX
     try:
+        from docx import Document
         doc = Document()
         doc.add_paragraph(dummy_docx_content)
         doc.save(dummy_docx_path)
@@ -0,0 +1,215 @@
+# app/services/cv_sections.py
+
+import re
+
+# Kage: What a pattern can read, no oracle is asked to read.
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+# Phone candidates stay on one line; separators are spaces, dots, dashes and brackets.
+PHONE_PATTERN = re.compile(r"(?<![\w+])\+?\(?\d[\d \t().-]{6,}\d(?!\w)")
+PHONE_LABEL_PATTERN = re.compile(r"\b(?:phone|tel(?:ephone)?|mobile|mob|cell|ph)\b\.?\s*(?:no\.?|number)?\s*[:.]?", re.IGNORECASE)
+# "2019 - 2021", "01.2019 - 05.2021", "03/2018-04/2020", "05.2021": dates, not phones.
+_DATE_TOKEN = r"\(?(?:\d{1,2}[./-])?(?:19|20)\d{2}\)?"
+DATE_SHAPE_PATTERN = re.compile(rf"^{_DATE_TOKEN}(?:\s*[-.]?\s*{_DATE_TOKEN})?$")
+LINKEDIN_PATTERN = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/(?:in|pub)/([A-Za-z0-9_%-]+)", re.IGNORECASE)
+GITHUB_PATTERN = re.compile(r"(?:https?://)?(?:www\.)?github\.com/([A-Za-z0-9](?:[A-Za-z0-9-]{0,38}))(?![A-Za-z0-9-])", re.IGNORECASE)
+CONTACT_LABEL_PATTERN = re.compile(r"\b(?:e-?mail|phone|tel|mobile|linkedin|github)\b\s*:?", re.IGNORECASE)
+NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z.'-]*(?:\s+[A-Za-z][A-Za-z.'-]*){1,4}$")
+LIST_SPLIT_PATTERN = re.compile(r"[\n,;|•●▪*]+|\s+-\s+|^\s*-\s*", re.MULTILINE)
+
+# GitHub paths that are pages, not people.
+_GITHUB_RESERVED = frozenset({"about", "features", "orgs", "pricing", "settings", "topics", "marketplace", "login", "join"})
+
+# Heading text (lower case, without a trailing colon) -> section key.
+SECTION_HEADINGS = {
+    "summary": "summary", "professional summary": "summary", "profile": "summary",
+    "professional profile": "summary", "about me": "summary", "about": "summary", "objective": "summary",
+    "experience": "experience", "work experience": "experience", "professional experience": "experience",
+    "employment": "experience", "employment history": "experience", "work history": "experience",
+    "career history": "experience",
+    "skills": "skills", "key skills": "skills", "core skills": "skills", "technical skills": "skills",
+    "core competencies": "skills", "competencies": "skills",
+    "technologies": "technologies", "tools": "technologies", "tech stack": "technologies",
+    "tools & technologies": "technologies", "tools and technologies": "technologies",
+    "programming languages": "technologies",
+    "languages": "languages", "spoken languages": "languages", "language skills": "languages",
+    "education": "education", "certifications": "certifications", "certificates": "certifications",
+    "projects": "projects", "awards": "other", "interests": "other", "hobbies": "other",
+    "references": "other", "publications": "other", "volunteering": "other", "volunteer experience": "other",
+}
+_MAX_HEADING_LENGTH = max(len(heading) for heading in SECTION_HEADINGS) + 1
+
+# Sections the LLM still reads, in prompt order. The header carries the name.
+LLM_SECTIONS = ("header", "summary", "experience", "skills", "technologies", "languages")
+CONTACT_FIELDS = ("email", "phone", "linkedin", "github_profile")
+
+
+def _phone_in(text: str, labelled: bool) -> str:
+    """
+    Kage: The first phone-shaped value of one line. Date shapes never qualify. An
+    unlabelled value must also look like a phone: a leading + or (, or digits
+    grouped by separators. A bare run of digits is an ID until labelled.
+    """
+    for candidate in PHONE_PATTERN.finditer(text):
+        value = candidate.group(0).strip()
+        digits = re.sub(r"\D", "", value)
+        if not 8 <= len(digits) <= 15 or DATE_SHAPE_PATTERN.match(value):
+            continue
+        if labelled or value[0] in "+(" or len(re.findall(r"\d+", value)) >= 2:
+            return value
+    return ""
+
+
+def extract_phone(text: str, header: str) -> str:
+    """
+    Kage: A phone number only where a CV puts one: after a phone label anywhere,
+    or on a header line. "" when nothing qualifies, so the LLM is asked instead.
+    """
+    for line in (text or "").splitlines():
+        label = PHONE_LABEL_PATTERN.search(line)
+        if label:
+            phone = _phone_in(line[label.end():], labelled=True)
+            if phone:
+                return phone
+    for line in (header or "").splitlines():
+        phone = _phone_in(EMAIL_PATTERN.sub("", line), labelled=False)
+        if phone:
+            return phone
+    return ""
+
+
+def extract_contact_fields(text: str, header: str = None) -> dict:
+    """
+    Kage: Reads email, phone, LinkedIn and GitHub profile URLs from CV text.
+    `header` is the text before the first heading (see segment_sections); it is
+    derived from `text` when not given.
+
+    Returns:
+        dict: One entry per CONTACT_FIELDS key; "" where nothing was found.
+    """
+    contact = dict.fromkeys(CONTACT_FIELDS, "")
+    if not text:
+        return contact
+
+    email = EMAIL_PATTERN.search(text)
+    if email:
+        contact["email"] = email.group(0)
+
+    if header is None:
+        header = segment_sections(text).get("header", "")
+    contact["phone"] = extract_phone(text, header)
+
+    linkedin = LINKEDIN_PATTERN.search(text)
+    if linkedin:
+        contact["linkedin"] = f"https://www.linkedin.com/in/{linkedin.group(1)}"
+
+    for github in GITHUB_PATTERN.finditer(text):
+        if github.group(1).lower() not in _GITHUB_RESERVED:
+            contact["github_profile"] = f"https://github.com/{github.group(1)}"
+            break
+    return contact
+
+
+def _heading_key(line: str):
+    candidate = line.strip().strip(":").strip()
+    if not candidate or len(candidate) > _MAX_HEADING_LENGTH:
+        return None
+    return SECTION_HEADINGS.get(candidate.lower())
+
+
+def segment_sections(text: str) -> dict:
+    """
+    Kage: Splits CV text on recognized headings. Text before the first heading is
+    the "header". Repeated headings of one kind are concatenated.
+
+    Returns:
+        dict: section key -> section text. Only sections that were found are present.
+    """
+    sections = {}
+    current = "header"
+    buffer = []
+    for line in (text or "").splitlines():
+        key = _heading_key(line)
+        if key:
+            if buffer:
+                sections[current] = (sections.get(current, "") + "\n" + "\n".join(buffer)).strip()
+            current, buffer = key, []
+        elif line.strip():
+            buffer.append(line.strip())
+    if buffer:
+        sections[current] = (sections.get(current, "") + "\n" + "\n".join(buffer)).strip()
+    return sections
+
+
+def split_list_section(text: str, max_item_length: int = 60) -> list:
+    """Kage: A skills or languages section as a list. Order is kept; duplicates and prose fall away."""
+    items, seen = [], set()
+    for item in LIST_SPLIT_PATTERN.split(text or ""):
+        item = item.strip(" \t.:-")
+        if item and len(item) <= max_item_length and item.lower() not in seen:
+            seen.add(item.lower())
+            items.append(item)
+    return items
+
+
+def guess_name(header: str) -> str:
+    """Kage: The first header line, when it reads like a name and nothing else."""
+    for line in (header or "").splitlines():
+        line = line.strip()
+        if line:
+            return line if NAME_PATTERN.match(line) else ""
+    return ""
+
+
+class LocalCVExtract:
+    """
+    Kage: Everything learned from a CV without the LLM: contact fields, the
+    sections, and a best-effort reading of the lists. Decides what the LLM
+    still needs to see, and what to answer when the LLM is silent.
+    """
+    def __init__(self, text: str):
+        self.text = text or ""
+        self.sections = segment_sections(self.text)
+        self.contact = extract_contact_fields(self.text, self.sections.get("header", ""))
+        self.name = guess_name(self.sections.get("header", ""))
+
+    @property
+    def missing_contact_fields(self) -> tuple:
+        return tuple(field for field in CONTACT_FIELDS if not self.contact[field])
+
+    def llm_text(self) -> str:
+        """
+        Kage: The part of the CV the LLM must read. Without recognized headings the
+        whole text is sent, as before.
+        """
+        if not any(key in self.sections for key in LLM_SECTIONS if key != "header"):
+            return self.text
+        parts = []
+        for key in LLM_SECTIONS:
+            section = self.sections.get(key, "")
+            if key == "header":
+                # Contact lines already read need not be read again.
+                for pattern in (EMAIL_PATTERN, LINKEDIN_PATTERN, GITHUB_PATTERN):
+                    section = pattern.sub("", section)
+                if self.contact["phone"]:
+                    section = section.replace(self.contact["phone"], "")
+                section = CONTACT_LABEL_PATTERN.sub("", section)
+                section = "\n".join(line for line in section.splitlines() if re.search(r"\w", line))
+            if section:
+                parts.append(f"## {key.title()}\n{section}")
+        return "\n\n".join(parts)
+
+    def fields(self) -> dict:
+        """
+        Kage: The parsed-data fields that could be read locally, in CVParser's shape.
+        Absent values are "N/A" or [] as the parser's fallback expects.
+        """
+        return {
+            "name": self.name or "N/A",
+            "email": self.contact["email"] or "N/A",
+            "phone": self.contact["phone"] or "N/A",
+            "linkedin": self.contact["linkedin"] or "N/A",
+            "github_profile": self.contact["github_profile"] or "N/A",
+            "user_defined_skills": split_list_section(self.sections.get("skills", "")),
+            "user_defined_technologies": split_list_section(self.sections.get("technologies", "")),
+            "languages": split_list_section(self.sections.get("languages", "")),
+        }
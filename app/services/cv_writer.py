@@ -1,13 +1,24 @@
 # app/services/cv_writer.py
 
+import io
 import os
+import re
+import copy
 from docx import Document
-from docx.shared import Pt
+from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.enum.style import WD_STYLE_TYPE
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 from docx.opc.constants import RELATIONSHIP_TYPE as RT
 
+from app.models.resume import ResumeModel
+from app.services.resume_builder import ResumeBuilder
+from app.services.metrics import timed
+from app.services.structured_logging import get_logger
+
+logger = get_logger("cv_writer")
+
 class CVWriter:
     """
     Kage: The scribe of forms. This module is tasked with forging the
@@ -15,14 +26,118 @@ class CVWriter:
     presentable form. It operates with precision, ensuring every detail
     finds its rightful place.
     """
-    def __init__(self, output_dir="output"):
+    DEFAULT_TEMPLATE = "default"
+    HYPERLINK_STYLE = "Hyperlink"
+    # Kage: The styles every template must carry for the scribe to write upon it.
+    REQUIRED_STYLES = ("Normal", "Heading 1", "Heading 2", "List Bullet")
+
+    def __init__(self, output_dir="output", template_dir=None, template_files=None):
         """
         Kage: Initializes the CVWriter. A defined destination is essential
         for the manifestation of documents.
+
+        Base documents are prepared once here: styles applied, content cleared,
+        then frozen. Each request clones the frozen body (see _new_document).
+
+        Templates are only what is named: a directory set aside for them, or a list
+        of files. Each becomes a template named after its slugified filename,
+        beside "default".
+
+        Args:
+            output_dir (str): Destination for generate_cv.
+            template_dir (str, optional): Directory holding only .docx templates.
+            template_files (list, optional): Paths of .docx templates.
         """
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
-        print(f"[Kage CV] CVWriter initialized. Output directory: {self.output_dir}")
+        self._templates = {self.DEFAULT_TEMPLATE: self._freeze(self._prepare_base(Document()))}
+        if template_dir:
+            self._load_templates(self._template_paths(template_dir))
+        if template_files:
+            self._load_templates(template_files)
+        logger.info("CVWriter initialized. Output directory: %s. Templates: %s", self.output_dir, ', '.join(self.available_templates))
+
+    @property
+    def available_templates(self) -> list:
+        """Kage: The names of the prepared templates."""
+        return sorted(self._templates)
+
+    def _prepare_base(self, document, apply_default_voice=True):
+        """
+        Kage: Readies a document to serve as a base. The body is emptied, leaving
+        only its section settings, and the hyperlink style is ensured so links
+        reference it instead of carrying their own formatting.
+        """
+        body = document.element.body
+        for child in list(body):
+            if child.tag != qn('w:sectPr'):
+                body.remove(child)
+
+        styles = document.styles
+        if apply_default_voice:
+            # Kage: Setting the document's voice. Compact and clear.
+            font = styles['Normal'].font
+            font.name = 'Calibri'
+            font.size = Pt(10.5)
+
+        if self.HYPERLINK_STYLE not in [style.name for style in styles]:
+            hyperlink_style = styles.add_style(self.HYPERLINK_STYLE, WD_STYLE_TYPE.CHARACTER)
+            hyperlink_style.font.color.rgb = RGBColor(0x00, 0x00, 0xFF)
+            hyperlink_style.font.underline = True
+        return document
+
+    def _freeze(self, document) -> tuple:
+        """
+        Kage: Holds a prepared base for cloning: the document, and every part but its
+        body. Those parts (styles, numbering, theme, headers...) are shared by all
+        clones; the scribe reads them and never writes them.
+        """
+        shared = tuple(part for part in document.part.package.iter_parts() if part is not document.part)
+        return document, shared
+
+    @staticmethod
+    def _template_paths(template_dir) -> list:
+        if not os.path.isdir(template_dir):
+            logger.warning("Template directory absent: %s", template_dir)
+            return []
+        return [os.path.join(template_dir, filename) for filename in sorted(os.listdir(template_dir))]
+
+    def _load_templates(self, paths):
+        """
+        Kage: Prepares each named .docx. A template lacking the required styles is
+        set aside, not forced.
+        """
+        for path in paths:
+            filename = os.path.basename(path)
+            if not filename.lower().endswith(".docx") or filename.startswith("~$"):
+                continue
+            name = re.sub(r"[^a-z0-9]+", "-", os.path.splitext(filename)[0].lower()).strip("-")
+            if not name or name in self._templates:
+                continue
+            try:
+                document = Document(path)
+                style_names = {style.name for style in document.styles}
+                missing = [style for style in self.REQUIRED_STYLES if style not in style_names]
+                if missing:
+                    logger.warning("Template '%s' set aside. Missing styles: %s", filename, ', '.join(missing))
+                    continue
+                self._templates[name] = self._freeze(self._prepare_base(document, apply_default_voice=False))
+            except Exception as e:
+                logger.warning("Template '%s' could not be prepared: %s", filename, e)
+
+    def _new_document(self, template=DEFAULT_TEMPLATE):
+        """
+        Kage: Clones a frozen base at the XML level: the body part and its
+        relationships are deep-copied, the other parts shared. Well under a
+        millisecond, where reopening the package costs about as much as Document().
+
+        Raises:
+            ValueError: If the template is unknown.
+        """
+        if template not in self._templates:
+            raise ValueError(f"Unknown template '{template}'. Available: {', '.join(self.available_templates)}")
+        document, shared = self._templates[template]
+        return copy.deepcopy(document, {id(part): part for part in shared})
 
     def _add_heading(self, document, text, level=1, center=False):
         """Kage: Adds a section heading. Clarity in structure."""
@@ -59,15 +174,17 @@ class CVWriter:
             new_run = OxmlElement('w:r')
             r_pr = OxmlElement('w:rPr')
 
-            if underline:
+            # Kage: The look lives in the template's hyperlink style. The run only points to it.
+            r_style = OxmlElement('w:rStyle')
+            r_style.set(qn('w:val'), paragraph.part.document.styles[self.HYPERLINK_STYLE].style_id)
+            r_pr.append(r_style)
+
+            if not underline:
                 u = OxmlElement('w:u')
-                u.set(qn('w:val'), 'single')
+                u.set(qn('w:val'), 'none')
                 r_pr.append(u)
 
-            color = OxmlElement('w:color')
-            color.set(qn('w:val'), '0000FF')
-            r_pr.append(color)
-
+            new_run.append(r_pr)
             text_elem = OxmlElement('w:t')
             text_elem.text = text
             new_run.append(text_elem)
@@ -75,219 +192,143 @@ class CVWriter:
             hyperlink.append(new_run)
             paragraph._element.append(hyperlink)
         except Exception as e:
-            print(f"[Kage CV] Failed to add hyperlink '{text}': {e}")
+            logger.warning("Failed to add hyperlink '%s': %s", text, e)
 
-    def _filter_technologies_for_display(self, technologies: list) -> list:
-        """
-        Kage: Filters out overly granular or less relevant technologies for CV display.
-        Focuses on major frameworks, tools, and platforms, as requested by the Master.
+    def build_document(self, resume: ResumeModel, template=DEFAULT_TEMPLATE):
         """
-        # Define a list of common, often too granular, Python libraries or generic terms
-        # that might be identified by LLM but are not ideal for high-level CV tech lists.
-        # This list can be expanded based on feedback.
-        EXCLUDE_TECH_KEYWORDS = [
-            # Generic/Low-level Python libraries/tools
-            "requests", "json", "os", "uuid", "random", "traceback", "dotenv",
-            "smtplib", "email", "header", "urllib.parse", "httpx", "jwt",
-            "uvicorn", "pygithub", "pyjwt", "pyyaml", "toml", "pypdf",
-            "python-docx", "docx2pdf", "keyboard", "pygetwindow", "rasterio",
-            "pyinstaller", "pyopengl", "pyqt5", # PyQt5 is a framework, but often listed with its components
-            
-            # Generic development concepts/features (better covered by skills/achievements)
-            "api design", "authentication", "backend development", "frontend development",
-            "github integration", "cv parsing", "data extraction", "llm-powered project analysis",
-            "oauth", "project summarization", "resume generation", "scoring systems",
-            "template design", "web ui development", "rest apis", "websocket",
-            
-            # Languages/Markup already covered in Programming Languages section (or to be combined)
-            "css", "css3", "html", "html5", "javascript", "python", "bash", "c", "c++",
-            "dart", "go", "java", "kotlin", "rust", "swift", "typescript", "tex",
-            
-            # Specific SDKs/components if the platform itself is listed
-            "firebase js sdk", "firebase-admin", 
-            
-            # Other potentially too granular or implied tools
-            "jinja2", # Template engine, can be implied by Python web frameworks
-            "git", # Source control is a skill, not a specific tech for this list
-            "linux", # Operating system, often implied by development environment
-            "vs code", # IDE, generally not listed as a core project technology
-            "excel", "google sheets", "power bi", "tableau", # Data analysis tools, but not core *project* tech
-        ]
-        
-        # Normalize to lower case for comparison
-        excluded_lower = [k.lower() for k in EXCLUDE_TECH_KEYWORDS]
-        
-        filtered = []
-        for tech in technologies:
-            if tech.lower() not in excluded_lower:
-                filtered.append(tech)
-        return filtered
-
-    def generate_cv(self, projects_data: list, user_cv_data: dict, output_filename="resume.docx"):
-        """
-        Kage: Forges the complete CV document.
-        It accepts all user-related data as a single dictionary (user_cv_data)
-        and project data, then constructs the document with precision.
+        Kage: Gives the selected content its DOCX shape, in memory.
+        What appears was decided by the ResumeBuilder; the scribe only writes.
 
         Args:
-            projects_data (list): A list of dictionaries, each representing an analyzed project.
-            user_cv_data (dict): A dictionary containing all user profile information
-                                 (name, email, phone, summary, skills, technologies, etc.).
-            output_filename (str): The desired filename for the generated DOCX.
+            resume (ResumeModel): The format-neutral resume.
+            template (str): The name of a prepared template.
 
         Returns:
-            str: The full path to the generated DOCX file, or None if generation fails.
+            docx.document.Document: The constructed, unsaved document.
         """
-        document = Document()
-
-        # Kage: Setting the document's voice. Compact and clear.
-        style = document.styles['Normal']
-        font = style.font
-        font.name = 'Calibri'
-        font.size = Pt(10.5)
-
-        # Kage: Destructuring the user's essence from the provided data.
-        name = user_cv_data.get('name', 'Your Name')
-        email = user_cv_data.get('email', '')
-        phone = user_cv_data.get('phone', '')
-        professional_summary = user_cv_data.get('professional_summary', '')
-        user_defined_skills = user_cv_data.get('user_defined_skills', [])
-        user_defined_technologies = user_cv_data.get('user_defined_technologies', [])
-        languages = user_cv_data.get('languages', []) # This is for spoken languages
-        linkedin = user_cv_data.get('linkedin', '')
-        github_profile = user_cv_data.get('github_profile', '')
-        work_experience = user_cv_data.get('work_experience', [])
+        document = self._new_document(template)
 
         # Kage: Constructing the header. The identity.
-        self._add_heading(document, name, level=1, center=True)
+        self._add_heading(document, resume.name, level=1, center=True)
         contact_paragraph = document.add_paragraph()
         contact_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
-        if linkedin and linkedin != "N/A":
-            self._add_clickable_hyperlink(contact_paragraph, linkedin, "LinkedIn")
+        if resume.linkedin:
+            self._add_clickable_hyperlink(contact_paragraph, resume.linkedin, "LinkedIn")
             contact_paragraph.add_run(" | ")
-        if github_profile and github_profile != "N/A":
-            self._add_clickable_hyperlink(contact_paragraph, github_profile, "GitHub")
+        if resume.github_profile:
+            self._add_clickable_hyperlink(contact_paragraph, resume.github_profile, "GitHub")
             contact_paragraph.add_run(" | ")
-        contact_items = []
-        if email:
-            contact_items.append(email)
-        if phone and phone != "N/A":
-            contact_items.append(phone)
+        contact_items = [item for item in (resume.email, resume.phone) if item]
         if contact_items:
             contact_paragraph.add_run(" | ".join(contact_items))
 
         # Kage: Adding the professional summary. The distilled purpose.
-        if professional_summary:
+        if resume.professional_summary:
             self._add_heading(document, "Professional Summary", level=2)
-            self._add_paragraph(document, professional_summary)
+            self._add_paragraph(document, resume.professional_summary)
 
         # Kage: Enumerating skills. The abilities honed.
-        if user_defined_skills:
+        if resume.skills:
             self._add_heading(document, "Skills", level=2)
-            self._add_paragraph(document, ", ".join(sorted(user_defined_skills)), bold=True)
+            self._add_paragraph(document, ", ".join(resume.skills), bold=True)
 
         # Kage: Enumerating technologies. The tools mastered.
-        if user_defined_technologies:
+        if resume.technologies:
             self._add_heading(document, "Technologies", level=2)
-            self._add_paragraph(document, ", ".join(sorted(user_defined_technologies)), bold=True)
+            self._add_paragraph(document, ", ".join(resume.technologies), bold=True)
 
         # Kage: Listing spoken languages. The communication paths.
-        if languages:
+        if resume.languages:
             self._add_heading(document, "Languages", level=2)
-            self._add_paragraph(document, ", ".join(sorted(languages)), bold=True)
-            # Kage: This section is specifically for spoken languages (e.g., English, Arabic, Japanese).
+            self._add_paragraph(document, ", ".join(resume.languages), bold=True)
 
         # Kage: Detailing work experience. The forged path.
-        # Kage: Limiting work experience entries to a maximum of 2 for conciseness.
-        max_work_experience_entries = 2 
-        work_experience_to_display = work_experience[:max_work_experience_entries]
-
-        if work_experience_to_display:
+        if resume.work_experience:
             self._add_heading(document, "Work Experience", level=2)
-            for entry in work_experience_to_display:
-                # Kage: Now correctly formatting the work experience entry from an object
-                # into a readable paragraph.
-                title = entry.get('title', 'N/A')
-                company = entry.get('company', 'N/A')
-                start_date = entry.get('start_date', 'N/A')
-                end_date = entry.get('end_date', 'N/A')
-                responsibilities = entry.get('responsibilities', [])
-
+            for entry in resume.work_experience:
                 # Add title and company
                 work_exp_para = document.add_paragraph()
-                work_exp_run = work_exp_para.add_run(f"{title} | {company}")
+                work_exp_run = work_exp_para.add_run(f"{entry.title} | {entry.company}")
                 work_exp_run.bold = True
                 work_exp_run.font.size = Pt(11)
 
                 # Add duration
-                duration_text = f"{start_date} - {end_date}"
-                self._add_paragraph(document, duration_text, italic=True)
+                self._add_paragraph(document, f"{entry.start_date} - {entry.end_date}", italic=True)
 
                 # Add responsibilities as bullet points
-                if responsibilities:
-                    self._add_bullet_list(document, responsibilities)
-                
+                if entry.responsibilities:
+                    self._add_bullet_list(document, entry.responsibilities)
+
                 # Add a small separator after each entry for readability
                 document.add_paragraph().add_run("---").alignment = WD_ALIGN_PARAGRAPH.CENTER
 
-
         # Kage: Presenting projects. The demonstrated strength.
-        if projects_data:
+        if resume.projects:
             self._add_heading(document, "Projects", level=2)
-            # Sort projects by score in descending order for impact
-            sorted_projects = sorted(projects_data, key=lambda p: p.get('score', 0), reverse=True)
-            # The top 4 limit is already applied in main.py, so no need to slice here again.
-            # projects_data already contains only the top 4.
 
-            for project in sorted_projects:
+            for project in resume.projects:
                 title_paragraph = document.add_paragraph()
                 title_paragraph.paragraph_format.space_after = Pt(1)
 
-                run = title_paragraph.add_run(project.get('name', 'Unnamed Project'))
+                run = title_paragraph.add_run(project.name)
                 run.bold = True
                 run.font.size = Pt(11)
 
-                if project.get('html_url'):
+                if project.url:
                     title_paragraph.add_run(" | ")
-                    self._add_clickable_hyperlink(title_paragraph, project['html_url'], "View Project")
+                    self._add_clickable_hyperlink(title_paragraph, project.url, "View Project")
 
-                if project.get('summary'):
-                    self._add_paragraph(document, project['summary'])
+                if project.summary:
+                    self._add_paragraph(document, project.summary)
 
-                if project.get('achievements'):
+                if project.achievements:
                     self._add_paragraph(document, "Key Achievements:", bold=True)
-                    # Kage: Limit achievements to a maximum of 3 bullet points for conciseness.
-                    self._add_bullet_list(document, project['achievements'][:3]) 
-
-                # Kage: Combine Programming Languages and Key Technologies into a single filtered line.
-                combined_proj_tech_lang = []
-
-                # Add programming languages from GitHub data
-                project_languages = project.get('languages', {})
-                if project_languages:
-                    # Filter out common web languages if they are the only ones, as per previous request
-                    # This logic is now handled more robustly by the filter function if needed.
-                    combined_proj_tech_lang.extend(project_languages.keys())
-
-                # Add technologies identified by analyzer
-                project_technologies = project.get('technologies', [])
-                combined_proj_tech_lang.extend(project_technologies)
-                
-                # Apply filtering and then sort for final display
-                filtered_combined_proj_tech_lang = self._filter_technologies_for_display(list(set(combined_proj_tech_lang)))
-                
-                if filtered_combined_proj_tech_lang: # Corrected variable name
-                    self._add_paragraph(document, "Technologies & Languages: " + ", ".join(sorted(filtered_combined_proj_tech_lang)), italic=True)
-                
+                    self._add_bullet_list(document, project.achievements)
+
+                if project.technologies:
+                    self._add_paragraph(document, "Technologies & Languages: " + ", ".join(project.technologies), italic=True)
+
+        return document
+
+    @timed("cv_writer.render")
+    def render_cv_bytes(self, resume: ResumeModel, template=DEFAULT_TEMPLATE) -> bytes:
+        """
+        Kage: Forges the CV into a memory buffer. No shared directory, no collisions,
+        nothing left behind on disk.
+
+        Returns:
+            bytes: The DOCX document.
+        """
+        document = self.build_document(resume, template)
+        buffer = io.BytesIO()
+        document.save(buffer)
+        return buffer.getvalue()
+
+    def generate_cv(self, projects_data: list, user_cv_data: dict, output_filename="resume.docx", template=DEFAULT_TEMPLATE):
+        """
+        Kage: Forges the CV and writes it into the output directory.
+
+        Args:
+            projects_data (list): A list of dictionaries, each representing an analyzed project.
+            user_cv_data (dict): A dictionary containing all user profile information.
+            output_filename (str): The desired filename for the generated DOCX.
+            template (str): The name of a prepared template.
+
+        Returns:
+            str: The full path to the generated DOCX file, or None if generation fails.
+        """
+        resume = ResumeBuilder(max_cached=1).build(projects_data, user_cv_data)
+        document = self.build_document(resume, template)
+
         # Kage: Finalizing the form. Securing the manifestation.
         output_path = os.path.join(self.output_dir, output_filename)
         try:
             document.save(output_path)
-            print(f"[Kage CV] CV generated successfully: {output_path}")
+            logger.info("CV generated successfully: %s", output_path)
             return output_path
         except Exception as e:
-            print(f"[Kage CV] Failed to save CV: {e}")
+            logger.warning("Failed to save CV: %s", e)
             return None
 
 # Kage: Dummy version for testing purposes.
@@ -4,22 +4,41 @@ import json
 import base64
 import re
 import xml.etree.ElementTree as ET
-import toml
-import yaml
 from datetime import datetime
 from dotenv import load_dotenv
 from github import Github, Auth, UnknownObjectException
+from app.services.metrics import stage, timed, record_github_rate_limit
+from app.services.structured_logging import get_logger
 
 
 load_dotenv()
 
+logger = get_logger("github")
+
 class GitHubListener:
-    def __init__(self, github_token: str = None): # Modified: Accept token as argument
+    # Caps on the text one listing may hold. READMEs past the analyzer's prompt
+    # limit were never read anyway.
+    MAX_README_CHARS = 16000
+    MAX_COMMIT_MESSAGE_CHARS = 500
+    MAX_COMMITS = 10
+    MAX_TOTAL_TEXT_CHARS = 4_000_000
+
+    def __init__(self, github_token: str = None, max_readme_chars: int = None, max_total_text_chars: int = None, base_url: str = None, cassette=None,
+                 seconds_between_requests: float = None): # Modified: Accept token as argument
         """
         Initializes the GitHubListener.
         Args:
             github_token (str, optional): The GitHub personal access token to use.
             If None, it falls back to GITHUB_TOKEN environment variable.
+            max_readme_chars (int, optional): README characters kept per repository.
+            max_total_text_chars (int, optional): README and commit characters one
+            get_all_project_data call may hold. Repositories past it are listed without text.
+            base_url (str, optional): The GitHub API root, for GitHub Enterprise or a local
+            stand-in. Defaults to https://api.github.com.
+            cassette (Cassette, optional): Records GitHub exchanges, or replays them
+            (see app.services.cassette).
+            seconds_between_requests (float, optional): PyGithub's pause between two
+            requests. None keeps PyGithub's default (0.25 s); 0 against a local stand-in.
         """
         self.github_token = github_token if github_token else os.getenv("GITHUB_TOKEN")
         if not self.github_token:
@@ -29,7 +48,18 @@ class GitHubListener:
             )
 
         self.auth = Auth.Token(self.github_token)
-        self.g = Github(auth=self.auth)
+        # PyGithub picks its connection class when the client is made; the cassette must be in place first.
+        if cassette is not None:
+            cassette.install_for_github()
+        options = {}
+        if base_url:
+            options["base_url"] = base_url.rstrip("/")
+        if seconds_between_requests is not None:
+            options["seconds_between_requests"] = max(0.0, float(seconds_between_requests))
+        self.g = Github(auth=self.auth, **options)
+        self.max_readme_chars = int(max_readme_chars or self.MAX_README_CHARS)
+        self.max_total_text_chars = int(max_total_text_chars or self.MAX_TOTAL_TEXT_CHARS)
+        # Full names only. Repository objects carry their whole API payload.
         self._cached_repos = None
         # _authenticated_user_login is no longer cached here, as the listener is per-user instance
         # and the user object is fetched on demand for the current token.
@@ -57,25 +87,33 @@ class GitHubListener:
             # print(f"Authenticated as: {user.login}") # Uncomment for debugging
             return user
         except Exception as e:
-            print(f"Authentication failed with provided token: {e}")
+            logger.warning("Authentication failed with provided token: %s", e)
             raise
 
     def get_all_user_repos(self, include_private=False, min_stars=0):
         """
         Fetches all repositories for the authenticated user, optionally including private ones.
-        Caches the results for the current instance (which is per-user).
+        Caches their names for the current instance (which is per-user); a repeat call
+        returns lazy Repository objects that load on first attribute access.
         """
         if self._cached_repos is not None:
-            return self._cached_repos
+            return [self.g.get_repo(full_name, lazy=True) for full_name in self._cached_repos]
+
+        with stage("github.list_repos"):
+            repos = list(self._iter_user_repos(include_private, min_stars))
+        self._record_rate_limit()
+        return repos
 
+    def _iter_user_repos(self, include_private, min_stars):
+        """Yields the matching repositories page by page. Their names are cached once all are seen."""
         user = self._get_authenticated_user()
-        repos = []
-        print(f"Fetching repositories for {user.login}...")
+        names = []
+        logger.info("Fetching repositories for %s.", user.login)
 
         for repo in user.get_repos():
             # Skip the GitHub profile README repository (named after the user's login)
             if repo.name.lower() == user.login.lower():
-                print(f"  Skipping profile README repository: {repo.name}")
+                logger.debug("Skipping profile README repository: %s", repo.name)
                 continue
 
             if not include_private and repo.private:
@@ -85,11 +123,11 @@ class GitHubListener:
             if not repo.private and repo.stargazers_count < min_stars:
                 continue
 
-            repos.append(repo)
+            names.append(repo.full_name)
+            yield repo
 
-        self._cached_repos = repos
-        print(f"Finished fetching {len(repos)} repositories.")
-        return repos
+        self._cached_repos = names
+        logger.info("Finished fetching %d repositories.", len(names))
 
     def _get_file_content(self, repo, path):
         """Helper to get content of a file from a repo."""
@@ -119,7 +157,7 @@ class GitHubListener:
             dependencies.extend(data.get('devDependencies', {}).keys())
             dependencies.extend(data.get('peerDependencies', {}).keys())
         except json.JSONDecodeError:
-            print("       Invalid package.json format.")
+            logger.debug("Invalid package.json format.")
         return dependencies
 
     def _parse_composer_json(self, content):
@@ -129,10 +167,11 @@ class GitHubListener:
             dependencies.extend(data.get('require', {}).keys())
             dependencies.extend(data.get('require-dev', {}).keys())
         except json.JSONDecodeError:
-            print("       Invalid composer.json format.")
+            logger.debug("Invalid composer.json format.")
         return dependencies
 
     def _parse_pubspec_yaml(self, content):
+        import yaml  # Imported on first use; most repositories never need it.
         dependencies = []
         try:
             data = yaml.safe_load(content)
@@ -141,7 +180,7 @@ class GitHubListener:
             if 'dev_dependencies' in data:
                 dependencies.extend(data['dev_dependencies'].keys())
         except yaml.YAMLError:
-            print("       Invalid pubspec.yaml format.")
+            logger.debug("Invalid pubspec.yaml format.")
         return dependencies
 
     def _parse_pom_xml(self, content):
@@ -154,7 +193,7 @@ class GitHubListener:
                 if artifact_id_element is not None:
                     dependencies.append(artifact_id_element.text)
         except ET.ParseError:
-            print("       Invalid pom.xml format.")
+            logger.debug("Invalid pom.xml format.")
         return dependencies
 
     def _parse_csproj(self, content):
@@ -174,7 +213,7 @@ class GitHubListener:
                     else:
                         dependencies.append(import_stmt.attrib['Project'].split('\\')[-1].replace('.props', '').replace('.targets', ''))
         except ET.ParseError:
-            print("       Invalid .csproj format.")
+            logger.debug("Invalid .csproj format.")
         return dependencies
 
     def _parse_build_gradle(self, content):
@@ -203,6 +242,7 @@ class GitHubListener:
         return dependencies
 
     def _parse_cargo_toml(self, content):
+        import toml
         dependencies = []
         try:
             data = toml.loads(content)
@@ -213,7 +253,7 @@ class GitHubListener:
             if 'build-dependencies' in data:
                 dependencies.extend(data['build-dependencies'].keys())
         except Exception:
-            print("       Invalid Cargo.toml format.")
+            logger.debug("Invalid Cargo.toml format.")
         return dependencies
 
     def _parse_podfile(self, content):
@@ -237,7 +277,7 @@ class GitHubListener:
                     deps = parser(content)
                     dependencies.extend(deps)
                 except Exception as e:
-                    print(f"         Failed to parse {filename} for {repo.name}: {e}")
+                    logger.debug("Failed to parse %s for %s: %s", filename, repo.name, e)
 
         try:
             root_contents = repo.get_contents("/")
@@ -250,21 +290,34 @@ class GitHubListener:
                                 deps = self._parse_csproj(content)
                                 dependencies.extend(deps)
                             except Exception as e:
-                                print(f"         Failed to parse {item.name} for {repo.name}: {e}")
+                                logger.debug("Failed to parse %s for %s: %s", item.name, repo.name, e)
                     elif item.name.lower().endswith((".java", ".kt")):
                         pass
         except UnknownObjectException:
             pass
         except Exception as e:
-            print(f"         Error listing root contents for specific file checks in {repo.name}: {e}")
+            logger.debug("Error listing root contents for specific file checks in %s: %s", repo.name, e)
 
         return list(set(dependencies))
 
-    def get_repo_details(self, repo):
+    def _record_rate_limit(self):
+        """
+        Reports the rate limit from the headers of the last response. PyGithub only
+        asks the API when no response has been seen yet, which cannot happen here.
+        """
+        try:
+            remaining, limit = self.g.rate_limiting
+            record_github_rate_limit(remaining, limit)
+        except Exception:
+            pass
+
+    @timed("github.repo_details")
+    def get_repo_details(self, repo, include_text=True):
         """
         Extracts detailed information from a single PyGithub Repository object.
         Args:
             repo (PyGithub.Repository.Repository): The repository object.
+            include_text (bool): Fetch the README and recent commit messages (capped).
         Returns:
             dict: A dictionary of structured project data.
         """
@@ -294,22 +347,17 @@ class GitHubListener:
         except Exception as e:
             pass
 
-        try:
-            readme = repo.get_readme()
-            repo_data["readme_content"] = base64.b64decode(readme.content).decode('utf-8')
-        except UnknownObjectException:
-            repo_data["readme_content"] = ""
-        except Exception as e:
-            repo_data["readme_content"] = ""
+        if include_text:
+            repo_data["readme_content"] = self._read_readme(repo)
 
-        try:
-            commits = repo.get_commits(per_page=10)
-            for i, commit in enumerate(commits):
-                if i >= 10: break
-                if commit.commit.message:
-                    repo_data["recent_commits"].append(commit.commit.message.strip())
-        except Exception as e:
-            repo_data["recent_commits"] = []
+            try:
+                commits = repo.get_commits(per_page=self.MAX_COMMITS)
+                for i, commit in enumerate(commits):
+                    if i >= self.MAX_COMMITS: break
+                    if commit.commit.message:
+                        repo_data["recent_commits"].append(commit.commit.message.strip()[:self.MAX_COMMIT_MESSAGE_CHARS])
+            except Exception as e:
+                repo_data["recent_commits"] = []
 
         repo_data["dependencies"] = self._get_dependencies_from_repo(repo)
 
@@ -318,32 +366,59 @@ class GitHubListener:
             for content_file in contents:
                 if content_file.type == "file" and content_file.name.lower().endswith(".ipynb"):
                     repo_data["has_jupyter_notebooks"] = True
-                    print(f"  Detected Jupyter Notebook in {repo.name}")
+                    logger.debug("Detected Jupyter Notebook in %s.", repo.name)
                     break
         except UnknownObjectException:
             pass 
         except Exception as e:
-            print(f"  Error checking for Jupyter notebooks in {repo.name}: {e}")
+            logger.debug("Error checking for Jupyter notebooks in %s: %s", repo.name, e)
 
         return repo_data
 
+    def _read_readme(self, repo):
+        """The README, cut to max_readme_chars. Only the cut text outlives this call."""
+        try:
+            readme = repo.get_readme()
+            # UTF-8 needs at most 4 bytes a character; a split character at the cut is dropped.
+            raw = base64.b64decode(readme.content)[:self.max_readme_chars * 4]
+            return raw.decode('utf-8', errors='ignore')[:self.max_readme_chars]
+        except UnknownObjectException:
+            return ""
+        except Exception as e:
+            return ""
+
     def get_all_project_data(self, include_private=False, min_stars=0):
         """
-        Fetches detailed data for all relevant user repositories.
+        Fetches detailed data for all relevant user repositories. Repositories are
+        processed as they are listed, so one Repository object is held at a time.
+        Once max_total_text_chars of README and commit text are held, the remaining
+        repositories are listed without text and marked "text_capped".
         Returns:
             list: A list of dictionaries, each representing a structured project.
         """
-        all_repos = self.get_all_user_repos(include_private=include_private, min_stars=min_stars)
+        if self._cached_repos is not None:
+            all_repos = self.get_all_user_repos(include_private=include_private, min_stars=min_stars)
+        else:
+            all_repos = self._iter_user_repos(include_private, min_stars)
         project_data_list = []
+        text_chars = 0
         for repo in all_repos:
             try:
-                details = self.get_repo_details(repo)
+                include_text = text_chars < self.max_total_text_chars
+                details = self.get_repo_details(repo, include_text=include_text)
+                if not include_text:
+                    details["text_capped"] = True
+                text_chars += len(details["readme_content"]) + sum(len(message) for message in details["recent_commits"])
                 project_data_list.append(details)
-                print(f"  Successfully processed {repo.name}.")
+                logger.debug("Successfully processed %s.", repo.name)
             except Exception as e:
-                print(f"Failed to get details for {repo.name}: {e}")
+                logger.warning("Failed to get details for %s: %s", repo.name, e)
 
-        print(f"\nSuccessfully gathered data for {len(project_data_list)} projects.")
+        self._record_rate_limit()
+        capped = sum(1 for details in project_data_list if details.get("text_capped"))
+        if capped:
+            logger.warning("Text budget of %d characters reached; %d projects listed without README or commits.", self.max_total_text_chars, capped)
+        logger.info("Gathered data for %d projects.", len(project_data_list))
         return project_data_list
 
 # Example Usage:
@@ -0,0 +1,73 @@
+# app/services/json_payload.py
+
+import json
+import gzip
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Kage: The standard encoder remains a sound fallback.
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Kage: Below this size compression costs more than it saves.
+MIN_COMPRESS_BYTES = 1024
+
+
+def dumps(value) -> bytes:
+    """Kage: Encodes a value as compact UTF-8 JSON, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def choose_encoding(accept_encoding: str):
+    """
+    Kage: Picks the best content coding the client accepts: brotli, then gzip.
+
+    Returns:
+        str: "br", "gzip", or None for identity.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def compact_json_response(request, content, status_code: int = 200, headers: dict = None) -> Response:
+    """
+    Kage: A JSON response encoded fast and compressed as the client allows.
+    """
+    body = dumps(content)
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = choose_encoding(request.headers.get("accept-encoding")) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
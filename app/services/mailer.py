@@ -0,0 +1,184 @@
+# app/services/mailer.py
+
+import time
+import random
+import asyncio
+import smtplib
+from email.mime.text import MIMEText
+from email.header import Header
+from app.services.structured_logging import get_logger
+
+logger = get_logger("mail")
+
+
+class MailQueue:
+    """
+    Kage: The messenger. Mail is handed over and the request moves on; a single
+    background worker delivers it over one authenticated SMTP connection that
+    stays open between messages. Messages waiting together are sent together,
+    and a failed delivery is retried with exponential backoff.
+    """
+    def __init__(self, server: str, port: int, username: str, password: str, sender: str,
+                 use_starttls: bool = True, max_attempts: int = 4, backoff_seconds: float = 2.0,
+                 batch_size: int = 20, idle_seconds: float = 60.0, timeout: float = 30.0):
+        """
+        Args:
+            server, port, username, password: The SMTP relay and its credentials.
+            sender (str): The From address.
+            use_starttls (bool): Upgrade the connection with STARTTLS before login.
+            max_attempts (int): Deliveries tried per message before it is dropped.
+            backoff_seconds (float): First retry delay; doubled on every further attempt.
+            batch_size (int): Messages sent over the connection in one go.
+            idle_seconds (float): An unused connection is closed after this long.
+            timeout (float): Socket timeout of the SMTP connection.
+        """
+        self.server = server
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.use_starttls = use_starttls
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_seconds = float(backoff_seconds)
+        self.batch_size = max(1, int(batch_size))
+        self.idle_seconds = float(idle_seconds)
+        self.timeout = float(timeout)
+        self._queue = None
+        self._worker = None
+        self._retries = set()
+        self._connection = None
+        self._last_used = 0.0
+
+    @property
+    def configured(self) -> bool:
+        return all([self.server, self.username, self.password, self.sender])
+
+    def start(self):
+        """Kage: Starts the worker. Call from within the running event loop."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Kage: Stops the worker and closes the connection. Undelivered mail is reported."""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        for task in list(self._retries):
+            task.cancel()
+        if self._queue is not None and not self._queue.empty():
+            logger.warning("%s message(s) left undelivered at shutdown.", self._queue.qsize())
+        await asyncio.to_thread(self._disconnect)
+
+    def send(self, recipient: str, subject: str, body: str):
+        """
+        Kage: Queues a plain-text message. Returns at once.
+
+        Raises:
+            ValueError: If SMTP is not configured.
+            RuntimeError: If the worker has not been started.
+        """
+        if not self.configured:
+            raise ValueError("Email path incomplete. SMTP credentials missing.")
+        if self._queue is None:
+            raise RuntimeError("Mail queue is not running.")
+        msg = MIMEText(body, 'plain', 'utf-8')
+        msg['Subject'] = Header(subject, 'utf-8')
+        msg['From'] = self.sender
+        msg['To'] = recipient
+        self._queue.put_nowait({"recipient": recipient, "content": msg.as_string(), "attempt": 1})
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                failed = await asyncio.to_thread(self._deliver, batch)
+            except Exception as e:
+                logger.warning("Delivery of %s message(s) failed: %s", len(batch), e)
+                failed = batch
+            for message in failed:
+                self._schedule_retry(message)
+
+    def _schedule_retry(self, message: dict):
+        if message["attempt"] >= self.max_attempts:
+            logger.warning("Giving up on mail to %s after %s attempts.", message['recipient'], message['attempt'])
+            return
+        delay = self.backoff_seconds * (2 ** (message["attempt"] - 1)) * random.uniform(0.8, 1.2)
+        message = {**message, "attempt": message["attempt"] + 1}
+
+        async def requeue():
+            await asyncio.sleep(delay)
+            self._queue.put_nowait(message)
+
+        task = asyncio.create_task(requeue())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    def _connect(self) -> smtplib.SMTP:
+        """Kage: The open connection if it is still alive and recent; a fresh one otherwise. Blocking."""
+        if self._connection is not None:
+            if time.monotonic() - self._last_used > self.idle_seconds:
+                self._disconnect()
+            else:
+                try:
+                    if self._connection.noop()[0] == 250:
+                        return self._connection
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._disconnect()
+
+        connection = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.use_starttls:
+                connection.starttls()
+            connection.login(self.username, self.password)
+        except BaseException:
+            connection.close()
+            raise
+        self._connection = connection
+        return connection
+
+    def _disconnect(self):
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except Exception:
+                self._connection.close()
+            self._connection = None
+
+    def _deliver(self, batch: list) -> list:
+        """
+        Kage: Sends a batch over one connection. Blocking; runs in a worker thread.
+
+        Returns:
+            list: The messages that were not delivered and may be retried.
+        """
+        connection = self._connect()
+        failed = []
+        for index, message in enumerate(batch):
+            try:
+                refused = connection.sendmail(self.sender, message["recipient"], message["content"])
+                if refused:
+                    logger.warning("Recipient refused: %s.", message['recipient'])
+                else:
+                    logger.info("Mail sent to %s.", message['recipient'])
+            except smtplib.SMTPRecipientsRefused:
+                logger.warning("Recipient refused: %s.", message['recipient'])
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                # The connection is gone; everything not yet sent is retried.
+                logger.warning("Connection lost while sending to %s: %s", message['recipient'], e)
+                self._connection = None
+                failed.extend(batch[index:])
+                break
+            except smtplib.SMTPResponseException as e:
+                logger.warning("Mail to %s failed: %s", message['recipient'], e)
+                if e.smtp_code < 500:  # 5xx is permanent; retrying cannot help.
+                    failed.append(message)
+            except smtplib.SMTPException as e:
+                logger.warning("Mail to %s failed: %s", message['recipient'], e)
+                failed.append(message)
+        self._last_used = time.monotonic()
+        return failed
@@ -0,0 +1,222 @@
+# app/services/metrics.py
+
+import math
+import time
+import inspect
+import threading
+import functools
+import contextlib
+
+# Kage: Bucket bounds in seconds, from a cache hit to a slow LLM answer.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, "", value) for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for sample_name, key, extra, value in self._samples():
+            lines.append(f"{sample_name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("A counter only goes up.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, f'le="{_format_value(bound)}"', cumulative))
+                samples.append((f"{self.name}_bucket", key, 'le="+Inf"', state["count"]))
+                samples.append((f"{self.name}_sum", key, "", state["sum"]))
+                samples.append((f"{self.name}_count", key, "", state["count"]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Kage: The ledger of what the application does and how long it takes. Metrics
+    are kept in process memory and rendered in the Prometheus text format.
+    Registering a name twice returns the metric already registered.
+    """
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}.")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram("kaku_stage_duration_seconds", "Latency of each stage of work.", ("stage",))
+STAGE_TOTAL = REGISTRY.counter("kaku_stage_total", "Completed stages of work by outcome.", ("stage", "outcome"))
+STAGE_IN_FLIGHT = REGISTRY.gauge("kaku_stage_in_flight", "Stages of work currently running.", ("stage",))
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("kaku_http_request_duration_seconds", "Latency of HTTP requests.", ("method", "route", "status"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("kaku_http_requests_in_flight", "HTTP requests currently being served.")
+
+GITHUB_RATE_LIMIT_REMAINING = REGISTRY.gauge("kaku_github_rate_limit_remaining", "GitHub API requests left in the current window, as last reported.")
+GITHUB_RATE_LIMIT = REGISTRY.gauge("kaku_github_rate_limit", "GitHub API request limit of the current window, as last reported.")
+
+GEMINI_TOKENS = REGISTRY.counter("kaku_gemini_tokens_total", "Gemini tokens reported by usageMetadata.", ("component", "kind"))
+GEMINI_USAGE_FIELDS = {"promptTokenCount": "prompt", "candidatesTokenCount": "candidates", "totalTokenCount": "total"}
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """
+    Kage: Times a stage of work and counts it as "ok" or "error". Usable around
+    synchronous code and around awaits alike.
+    """
+    STAGE_IN_FLIGHT.inc(stage=name)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+        STAGE_TOTAL.inc(stage=name, outcome=outcome)
+        STAGE_IN_FLIGHT.dec(stage=name)
+
+
+def timed(name: str):
+    """Kage: Decorator form of stage(), for plain and async functions."""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_gemini_usage(component: str, response: dict):
+    """Kage: Adds the token counts of a Gemini response's usageMetadata, if present."""
+    usage = response.get("usageMetadata") if isinstance(response, dict) else None
+    if not isinstance(usage, dict):
+        return
+    for field, kind in GEMINI_USAGE_FIELDS.items():
+        count = usage.get(field)
+        if isinstance(count, (int, float)) and count > 0:
+            GEMINI_TOKENS.inc(count, component=component, kind=kind)
+
+
+def record_github_rate_limit(remaining, limit):
+    if isinstance(remaining, int) and remaining >= 0:
+        GITHUB_RATE_LIMIT_REMAINING.set(remaining)
+    if isinstance(limit, int) and limit > 0:
+        GITHUB_RATE_LIMIT.set(limit)
@@ -0,0 +1,193 @@
+# app/services/pdf_renderer.py
+
+import os
+import signal
+import asyncio
+import shutil
+import tempfile
+from app.services.structured_logging import get_logger
+
+logger = get_logger("pdf")
+
+
+class PDFRenderError(RuntimeError):
+    """Kage: The PDF path is closed. No backend, a full queue, a timeout or a failed conversion."""
+
+
+class PDFRenderer:
+    """
+    Kage: The second scribe. Transforms forged DOCX forms into PDF through a
+    headless LibreOffice, so the path no longer depends on Microsoft Word.
+
+    A fixed number of worker slots bounds concurrency. Each slot owns its own
+    LibreOffice profile directory, warmed once at startup, so conversions run
+    side by side without fighting over a shared installation and without
+    paying the first-run profile cost on a user's request.
+    """
+    def __init__(self, soffice_path: str = None, max_workers: int = 2, timeout: float = 60.0,
+                 queue_timeout: float = 30.0, profile_root: str = None):
+        """
+        Kage: Prepares the rendering slots. The binary is located once; its absence
+        is not fatal, only a closed path reported on every request.
+
+        Args:
+            soffice_path (str, optional): Path to the soffice binary. Falls back to
+                SOFFICE_PATH, then to `soffice`/`libreoffice` on PATH.
+            max_workers (int): Maximum number of concurrent conversions.
+            timeout (float): Seconds a single conversion may run before it is killed.
+            queue_timeout (float): Seconds a request may wait for a free slot.
+            profile_root (str, optional): Directory holding the per-slot profiles.
+        """
+        self.soffice_path = soffice_path or os.getenv("SOFFICE_PATH") or shutil.which("soffice") or shutil.which("libreoffice")
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = float(timeout)
+        self.queue_timeout = float(queue_timeout)
+        self.profile_root = profile_root or os.path.join(tempfile.gettempdir(), "kaku-ryu-soffice")
+        self._slots = None
+        logger.info("PDFRenderer initialized. Backend: %s, workers: %s, timeout: %ss", self.soffice_path or '(absent)', self.max_workers, self.timeout)
+
+    @property
+    def available(self) -> bool:
+        """Kage: True when a LibreOffice binary was found."""
+        return bool(self.soffice_path)
+
+    def _get_slots(self) -> asyncio.Queue:
+        """Kage: The slot queue is bound to the running loop, so it is created on first use."""
+        if self._slots is None:
+            self._slots = asyncio.Queue()
+            for slot in range(self.max_workers):
+                self._slots.put_nowait(slot)
+        return self._slots
+
+    def _profile_uri(self, slot: int) -> str:
+        """Kage: Each slot is isolated within its own LibreOffice user installation."""
+        profile_dir = os.path.join(self.profile_root, f"slot-{slot}")
+        os.makedirs(profile_dir, exist_ok=True)
+        return "file://" + os.path.abspath(profile_dir).replace(os.sep, "/")
+
+    @staticmethod
+    def _kill(process):
+        """Kage: Ends the conversion and every process it started, soffice.bin included."""
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+
+    async def _run(self, slot: int, source_path: str, output_dir: str) -> str:
+        """Kage: One conversion inside one slot. Killed without mercy when the time runs out."""
+        command = [
+            self.soffice_path,
+            f"-env:UserInstallation={self._profile_uri(slot)}",
+            "--headless", "--invisible", "--nologo", "--norestore", "--nolockcheck",
+            "--convert-to", "pdf",
+            "--outdir", output_dir,
+            source_path,
+        ]
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                # Kage: soffice is a wrapper around soffice.bin. Its own session lets the whole group be killed.
+                start_new_session=os.name == "posix",
+            )
+        except OSError as e:
+            # Kage: A binary that vanished or cannot be executed closes the path like any other failure.
+            raise PDFRenderError(f"LibreOffice could not be started: {e}") from e
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._kill(process)
+            await process.wait()
+            raise PDFRenderError(f"Conversion exceeded {self.timeout:.0f}s and was terminated.")
+        except BaseException:
+            # Kage: A cancelled request must not leave soffice running after its slot is handed back.
+            self._kill(process)
+            raise
+
+        pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(source_path))[0] + ".pdf")
+        if process.returncode != 0 or not os.path.exists(pdf_path):
+            detail = stderr.decode("utf-8", "ignore").strip()[:300] if stderr else f"exit code {process.returncode}"
+            raise PDFRenderError(f"LibreOffice conversion failed: {detail}")
+        return pdf_path
+
+    async def convert(self, docx_path: str, output_dir: str) -> str:
+        """
+        Kage: Converts a DOCX form into PDF within the configured limits.
+
+        Args:
+            docx_path (str): The DOCX file to convert.
+            output_dir (str): Directory receiving the PDF.
+
+        Returns:
+            str: The full path to the generated PDF.
+
+        Raises:
+            PDFRenderError: When no backend exists, no slot frees up within
+                `queue_timeout`, or the conversion fails or times out.
+        """
+        if not self.available:
+            raise PDFRenderError("No LibreOffice binary found. Set SOFFICE_PATH or install LibreOffice.")
+
+        slots = self._get_slots()
+        try:
+            slot = await asyncio.wait_for(slots.get(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PDFRenderError(f"All {self.max_workers} PDF workers busy for {self.queue_timeout:.0f}s.")
+
+        try:
+            return await self._run(slot, docx_path, output_dir)
+        finally:
+            slots.put_nowait(slot)
+
+    async def convert_bytes(self, docx_bytes: bytes) -> bytes:
+        """
+        Kage: Converts an in-memory DOCX into PDF bytes. LibreOffice reads and
+        writes files, so the work happens in a private temporary directory that
+        is removed as soon as the result is read.
+
+        Raises:
+            PDFRenderError: Under the same conditions as `convert`.
+        """
+        with tempfile.TemporaryDirectory(prefix="kaku-pdf-") as work_dir:
+            docx_path = os.path.join(work_dir, "resume.docx")
+            with open(docx_path, "wb") as handle:
+                handle.write(docx_bytes)
+            pdf_path = await self.convert(docx_path, work_dir)
+            with open(pdf_path, "rb") as handle:
+                return handle.read()
+
+    async def warm_up(self):
+        """
+        Kage: Runs one throwaway conversion per slot so every profile exists
+        before the first real request arrives. Failures are reported, not raised.
+        """
+        if not self.available:
+            logger.warning("No LibreOffice binary. PDF path dormant; DOCX will be presented instead.")
+            return
+
+        slots = self._get_slots()
+        with tempfile.TemporaryDirectory(prefix="kaku-warmup-") as work_dir:
+            source_path = os.path.join(work_dir, "warmup.txt")
+            with open(source_path, "w", encoding="utf-8") as handle:
+                handle.write("Kaku-Ryu")
+
+            async def warm_slot():
+                slot = await slots.get()
+                try:
+                    slot_dir = os.path.join(work_dir, f"slot-{slot}")
+                    os.makedirs(slot_dir, exist_ok=True)
+                    await self._run(slot, source_path, slot_dir)
+                finally:
+                    slots.put_nowait(slot)
+
+            results = await asyncio.gather(*(warm_slot() for _ in range(self.max_workers)), return_exceptions=True)
+
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            logger.warning("Warm-up incomplete for %s worker(s): %s", len(failures), failures[0])
+        else:
+            logger.info("%s PDF worker(s) warmed.", self.max_workers)
@@ -0,0 +1,193 @@
+# app/services/pdf_text.py
+
+import os
+import math
+import time
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from app.services.structured_logging import get_logger
+
+logger = get_logger("pdf_text")
+
+# Kage: One ceiling for every document in flight. A flood of uploads cannot fork without limit.
+_PROCESS_SLOTS = None
+_PROCESS_SLOTS_LOCK = threading.Lock()
+
+
+def _process_slots(count: int) -> threading.BoundedSemaphore:
+    global _PROCESS_SLOTS
+    with _PROCESS_SLOTS_LOCK:
+        if _PROCESS_SLOTS is None:
+            _PROCESS_SLOTS = threading.BoundedSemaphore(count)
+        return _PROCESS_SLOTS
+
+
+class PartialText(str):
+    """Text cut short by the time budget or a failed page range. Not to be remembered as the document's text."""
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int, conn):
+    """
+    Worker body. Extracts pages [start, stop), clamped to the document, and sends
+    ("ok", text, page_count) or ("error", reason, None).
+    """
+    try:
+        from pypdf import PdfReader
+        reader = PdfReader(pdf_path)
+        page_count = len(reader.pages)
+        texts = []
+        for index in range(start, min(stop, page_count)):
+            texts.append(reader.pages[index].extract_text() or "")
+        conn.send(("ok", "\n".join(texts), page_count))
+    except Exception as e:
+        conn.send(("error", str(e), None))
+    finally:
+        conn.close()
+
+
+class PDFTextExtractor:
+    """
+    Extracts PDF text in parallel page ranges, each in its own short-lived process.
+
+    Ranges are collected in page order, and extraction stops as soon as the ordered
+    text reaches `max_chars`. Every document gets a hard time budget; a process still
+    running when it expires is killed, so a malformed PDF that hangs pypdf costs at
+    most the budget and never holds a worker beyond it. Processes are used instead of
+    a shared pool precisely so one can be killed without disturbing the others. Even
+    the page count is read in a worker: the first range reports it. A small CV is one
+    range in one worker; the forkserver has pypdf loaded already, so that worker starts
+    without importing it.
+
+    Text the budget or a failed range cut short is returned as PartialText.
+    """
+    PAGES_PER_CHUNK = 4
+
+    def __init__(self, max_workers: int = None, time_budget: float = 15.0, max_chars: int = 20000):
+        """
+        Args:
+            max_workers (int, optional): Maximum concurrent extraction processes across all
+                documents. Defaults to the CPU count.
+            time_budget (float): Seconds allowed per document.
+            max_chars (int): Extraction stops once this many characters have been collected.
+        """
+        self.max_workers = max(1, int(max_workers or os.cpu_count() or 1))
+        self.time_budget = float(time_budget)
+        self.max_chars = int(max_chars)
+        methods = multiprocessing.get_all_start_methods()
+        # forkserver children start from a clean, single-threaded parent; spawn is the portable fallback.
+        self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if "forkserver" in methods:
+            # Kage: Imported once in the server, inherited by every worker it forks.
+            self._context.set_forkserver_preload(["pypdf"])
+        self._slots = _process_slots(self.max_workers)
+
+    def _materialize(self, source):
+        """Returns (path, temp_dir). Worker processes read from a path, never from pickled bytes."""
+        if isinstance(source, (str, os.PathLike)):
+            return os.fspath(source), None
+        temp_dir = tempfile.mkdtemp(prefix="kaku-pdf-text-")
+        path = os.path.join(temp_dir, "cv.pdf")
+        source.seek(0)
+        with open(path, "wb") as handle:
+            shutil.copyfileobj(source, handle)
+        source.seek(0)
+        return path, temp_dir
+
+    def _chunks(self, first: int, page_count: int) -> list:
+        size = max(1, min(self.PAGES_PER_CHUNK, math.ceil((page_count - first) / self.max_workers)))
+        return [(start, min(start + size, page_count)) for start in range(first, page_count, size)]
+
+    @staticmethod
+    def _ordered_length(texts: dict) -> int:
+        total, index = 0, 0
+        while index in texts:
+            total += len(texts[index])
+            index += 1
+        return total
+
+    def extract(self, source) -> str:
+        """
+        Kage: Extracts the text of a PDF within the time budget, every page in a
+        worker process that is killed when the budget runs out.
+
+        Args:
+            source: A file path or a seekable binary file object.
+
+        Returns:
+            str: The text of the completed page ranges, in page order. Ranges that failed
+                 or did not finish within the budget are omitted, and the text is then a
+                 PartialText.
+        """
+        deadline = time.monotonic() + self.time_budget
+        path, temp_dir = self._materialize(source)
+        try:
+            return self._extract_parallel(path, deadline)
+        finally:
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _extract_parallel(self, path: str, deadline: float) -> str:
+        # Kage: The first range also reports the page count; the others are planned once it is known.
+        chunks = [(0, self.PAGES_PER_CHUNK)]
+        running = {}
+        texts = {}
+        cut_short = False
+        next_chunk = 0
+        try:
+            while next_chunk < len(chunks) or running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Time budget of %gs exhausted after %s/%s page ranges.", self.time_budget, len(texts), len(chunks))
+                    cut_short = True
+                    break
+
+                # Launch while slots are free. With nothing running yet, wait for a slot up to the deadline.
+                while next_chunk < len(chunks) and len(running) < self.max_workers:
+                    if not self._slots.acquire(timeout=0 if running else remaining):
+                        break
+                    start, stop = chunks[next_chunk]
+                    receiver, sender = self._context.Pipe(duplex=False)
+                    process = self._context.Process(target=_extract_page_range, args=(path, start, stop, sender), daemon=True)
+                    try:
+                        process.start()
+                    except Exception:
+                        self._slots.release()
+                        raise
+                    sender.close()
+                    running[receiver] = (next_chunk, process)
+                    next_chunk += 1
+
+                if not running:
+                    continue
+
+                for receiver in wait(list(running), timeout=max(0.0, deadline - time.monotonic())):
+                    index, process = running.pop(receiver)
+                    try:
+                        status, payload, page_count = receiver.recv()
+                    except EOFError:
+                        status, payload, page_count = "error", "worker exited without a result", None
+                    if status != "ok":
+                        logger.warning("Pages %s-%s failed: %s", chunks[index][0] + 1, chunks[index][1], payload)
+                        payload = ""
+                        cut_short = True
+                    elif index == 0:
+                        chunks += self._chunks(min(chunks[0][1], page_count), page_count)
+                    texts[index] = payload
+                    receiver.close()
+                    process.join()
+                    self._slots.release()
+
+                if self._ordered_length(texts) >= self.max_chars:
+                    break
+
+            text = "\n".join(texts[index] for index in sorted(texts))
+            return PartialText(text) if cut_short else text
+        finally:
+            for receiver, (_, process) in running.items():
+                process.kill()
+                process.join()
+                receiver.close()
+                self._slots.release()
@@ -0,0 +1,393 @@
+# app/services/profile_repository.py
+
+import copy
+import time
+import uuid
+import asyncio
+import functools
+import threading
+import contextlib
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models.project import pack_records, unpack_records
+from app.services.blob_store import CODEC_RECORDS, split_chunks, codec_name, blob_digest
+from app.services.metrics import stage
+from app.services.structured_logging import get_logger
+
+logger = get_logger("profile_repository")
+
+# Kage: Profiles already read during the current request, by user id. None outside a request scope.
+_request_profiles = contextvars.ContextVar("kaku_request_profiles", default=None)
+
+
+class ProfileRepository:
+    """
+    Kage: The keeper of the persistent realm. Every Firestore round trip of the
+    application passes through here and runs on a bounded thread pool, so the
+    synchronous client never stalls the event loop and a burst of requests cannot
+    open unbounded connections.
+
+    Profiles live at artifacts/{app_id}/users/{user_id}/cv_data/profile.
+
+    Loaded profiles are remembered twice: for the rest of the request (see
+    request_scope) and for a short TTL across requests. Every write through the
+    repository forgets the written profile in both. Writes made by another
+    instance are seen once the TTL runs out.
+
+    Changes are written field by field (see save_profile_changes): only what
+    changed is sent, so concurrent writers of different fields never undo each other.
+
+    Bulky analysis results never enter the profile: they are compressed, cut into
+    chunks under users/{user_id}/project_analysis, and the profile keeps only a
+    compact summary and a pointer (see save_project_analysis).
+    """
+    # Firestore's limits of writes per batch, and (with headroom) of bytes per commit.
+    MAX_BATCH_WRITES = 500
+    MAX_BATCH_BYTES = 8 * 1024 * 1024
+    ANALYSIS_COLLECTION = "project_analysis"
+    # Tries at switching the analysis pointer while other writes keep changing the profile.
+    POINTER_SWAP_ATTEMPTS = 5
+    # The only project fields kept in the profile document.
+    PROJECT_SUMMARY_FIELDS = ("name", "html_url", "score", "stargazers_count", "is_private", "last_pushed_at")
+
+    def __init__(self, db, app_id: str, profile_template: dict, max_workers: int = 8, cache_ttl: float = 30.0, max_cached: int = 1024):
+        """
+        Args:
+            db: A firebase_admin Firestore client, or None when persistence is dormant.
+            app_id (str): The application namespace under 'artifacts'.
+            profile_template (dict): Defaults of a new profile; missing keys of stored profiles are filled from it.
+            max_workers (int): Threads available for blocking Firebase calls.
+            cache_ttl (float): Seconds a loaded profile is reused across requests. 0 disables it.
+            max_cached (int): Profiles held across requests, least recently used first out.
+        """
+        self.db = db
+        self.app_id = app_id
+        self.profile_template = profile_template
+        self.max_workers = max(1, int(max_workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="firestore")
+        self.cache_ttl = float(cache_ttl)
+        self.max_cached = max(1, int(max_cached))
+        self._cached = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Bumped by every write. A read that raced a write is not remembered.
+        self._write_generation = 0
+
+    @property
+    def available(self) -> bool:
+        return bool(self.db and self.app_id)
+
+    def default_profile(self) -> dict:
+        return self.profile_template.copy()
+
+    @staticmethod
+    @contextlib.contextmanager
+    def request_scope():
+        """Kage: Within this scope (one HTTP request), a profile is read from Firestore at most once."""
+        token = _request_profiles.set({})
+        try:
+            yield
+        finally:
+            _request_profiles.reset(token)
+
+    def _recall(self, user_id: str):
+        scoped = _request_profiles.get()
+        if scoped is not None and user_id in scoped:
+            return scoped[user_id]
+        if self.cache_ttl <= 0:
+            return None
+        with self._cache_lock:
+            entry = self._cached.get(user_id)
+            if entry is None:
+                return None
+            expires, profile = entry
+            if time.monotonic() >= expires:
+                del self._cached[user_id]
+                return None
+            self._cached.move_to_end(user_id)
+        if scoped is not None:
+            scoped[user_id] = profile
+        return profile
+
+    def _remember(self, user_id: str, profile: dict, generation: int):
+        with self._cache_lock:
+            if generation != self._write_generation:
+                return
+        scoped = _request_profiles.get()
+        if scoped is not None:
+            scoped[user_id] = profile
+        if self.cache_ttl <= 0:
+            return
+        with self._cache_lock:
+            self._cached[user_id] = (time.monotonic() + self.cache_ttl, profile)
+            self._cached.move_to_end(user_id)
+            while len(self._cached) > self.max_cached:
+                self._cached.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """Kage: Forgets a profile, in this request and across requests."""
+        scoped = _request_profiles.get()
+        if scoped is not None:
+            scoped.pop(user_id, None)
+        with self._cache_lock:
+            self._cached.pop(user_id, None)
+            self._write_generation += 1
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Kage: Runs a blocking Firebase Admin call (Firestore or Auth) on the repository's pool.
+        """
+        loop = asyncio.get_running_loop()
+        name = getattr(func, "__name__", "call")
+        with stage(f"firebase.{'query' if name == '<lambda>' else name}"):
+            return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+
+    def _profile_ref(self, user_id: str):
+        return self.db.collection('artifacts').document(self.app_id).collection('users').document(user_id).collection('cv_data').document('profile')
+
+    def _analysis_collection(self, user_id: str):
+        return self.db.collection('artifacts').document(self.app_id).collection('users').document(user_id).collection(self.ANALYSIS_COLLECTION)
+
+    async def get_profile(self, user_id: str):
+        """
+        Kage: Reads a stored profile as it is.
+
+        Returns:
+            dict: The stored profile, or None if the document does not exist.
+        """
+        snapshot = await self.run(self._profile_ref(user_id).get)
+        return snapshot.to_dict() if snapshot.exists else None
+
+    async def load_profile(self, user_id: str) -> dict:
+        """
+        Kage: Retrieves a profile completed with template defaults. An absent profile
+        is created from the template. Failures are reported and answered with the template.
+
+        Remembered profiles are served without a Firestore read. The caller always
+        receives its own copy and may change it freely.
+        """
+        if not self.available:
+            return self.default_profile()
+
+        remembered = self._recall(user_id)
+        if remembered is not None:
+            return copy.deepcopy(remembered)
+
+        with self._cache_lock:
+            generation = self._write_generation
+        try:
+            loaded_data = await self.get_profile(user_id)
+            if loaded_data is None:
+                await self.set_profile(user_id, self.profile_template)
+                return self.default_profile()
+            for key, default_value in self.profile_template.items():
+                if key not in loaded_data:
+                    loaded_data[key] = default_value
+            self._remember(user_id, loaded_data, generation)
+            return copy.deepcopy(loaded_data)
+        except Exception as e:
+            logger.exception("Data retrieval failed for %s: %s", user_id, e)
+            return self.default_profile()
+
+    async def set_profile(self, user_id: str, data: dict, merge: bool = False):
+        """Kage: Writes a whole profile, or merges it into the stored one."""
+        self.invalidate(user_id)
+        try:
+            await self.run(self._profile_ref(user_id).set, data, merge=merge)
+        finally:
+            self.invalidate(user_id)
+
+    async def update_profile(self, user_id: str, fields: dict):
+        """
+        Kage: Updates only the given fields. A profile that does not exist yet is
+        created with them (a merge write), never overwritten.
+        """
+        self.invalidate(user_id)
+        try:
+            try:
+                await self.run(self._profile_ref(user_id).update, fields)
+            except Exception as e:
+                # Kage: google.api_core drags in grpc; it is imported only when an update fails.
+                from google.api_core.exceptions import NotFound
+                if not isinstance(e, NotFound):
+                    raise
+                await self.run(self._profile_ref(user_id).set, fields, merge=True)
+        finally:
+            self.invalidate(user_id)
+
+    @staticmethod
+    def diff_profile(current: dict, updated: dict) -> dict:
+        """
+        Kage: The top-level fields of `updated` that are new or differ from `current`.
+        Sentinels such as firestore.DELETE_FIELD always count as changes.
+        """
+        return {key: value for key, value in updated.items() if key not in current or current[key] != value}
+
+    async def save_profile_changes(self, user_id: str, current: dict, updated: dict) -> dict:
+        """
+        Kage: Writes the difference between a loaded profile and its updated form as a
+        field-level update. Nothing is written when nothing changed.
+
+        Returns:
+            dict: The fields that were written.
+        """
+        changes = self.diff_profile(current, updated)
+        if changes:
+            await self.update_profile(user_id, changes)
+        return changes
+
+    async def _commit_operations(self, operations: list):
+        """
+        Kage: Commits (kind, document_ref, data) operations, kind being "set", "update" or
+        "delete", in batches bounded by MAX_BATCH_WRITES and MAX_BATCH_BYTES.
+        Each batch is atomic; the sequence of batches is not.
+        """
+        batch, count, size = None, 0, 0
+        for kind, ref, data in operations:
+            weight = sum(len(value) for value in (data or {}).values() if isinstance(value, bytes)) + 1024
+            if batch is not None and (count >= self.MAX_BATCH_WRITES or size + weight > self.MAX_BATCH_BYTES):
+                await self.run(batch.commit)
+                batch = None
+            if batch is None:
+                batch, count, size = self.db.batch(), 0, 0
+            if kind == "set":
+                batch.set(ref, data)
+            elif kind == "update":
+                batch.update(ref, data)
+            else:
+                batch.delete(ref)
+            count, size = count + 1, size + weight
+        if batch is not None:
+            await self.run(batch.commit)
+
+    def _swap_analysis_pointer(self, user_id: str, fields: dict):
+        """
+        Kage: Writes the pointer and summary only onto the profile as it was just read,
+        retrying when another write came between. Blocking; runs on the pool.
+
+        Returns:
+            dict: The pointer it replaced, or None.
+        """
+        from google.api_core.exceptions import Conflict, FailedPrecondition
+        ref = self._profile_ref(user_id)
+        for _ in range(self.POINTER_SWAP_ATTEMPTS):
+            snapshot = ref.get()
+            try:
+                if not snapshot.exists:
+                    ref.create(fields)
+                    return None
+                replaced = (snapshot.to_dict() or {}).get("projects_analysis")
+                ref.update(fields, option=self.db.write_option(last_update_time=snapshot.update_time))
+                return replaced
+            except (Conflict, FailedPrecondition):
+                continue
+        raise RuntimeError(f"Profile kept changing for {self.POINTER_SWAP_ATTEMPTS} attempts; analysis pointer not switched.")
+
+    async def save_project_analysis(self, user_id: str, projects: list, binding: str = None) -> dict:
+        """
+        Kage: Persists analyzed projects (ProjectRecord) outside the hot profile document.
+
+        The records are packed in their binary form (see pack_records), their text
+        kept as compressed as it already is, and cut into chunks of a new generation. Once
+        every chunk is written, the profile's pointer and summary switch to it in a
+        single conditional update, and the chunks of the generation it replaced are
+        deleted. A reader never sees a half-written generation, and two saves racing
+        each other never delete the generation the other put in place.
+
+        When the stored generation already holds the same bytes under the same binding,
+        no chunk is written; only the pointer's updated_at moves.
+
+        Args:
+            binding (str, optional): Identifies the GitHub binding the projects were read
+                with (see load_project_analysis).
+
+        Returns:
+            dict: The pointer stored in the profile under "projects_analysis".
+        """
+        packed = CODEC_RECORDS + pack_records(projects)
+        digest = blob_digest(packed)
+        current = (await self.load_profile(user_id)).get("projects_analysis")
+        if current and current.get("digest") == digest and current.get("binding") == binding:
+            pointer = {**current, "updated_at": time.time()}
+            await self.update_profile(user_id, {"projects_analysis": pointer})
+            logger.debug("Analysis of %s projects unchanged for %s; chunks kept.", len(projects), user_id)
+            return pointer
+
+        chunks = split_chunks(packed)
+        generation = uuid.uuid4().hex[:16]
+        collection = self._analysis_collection(user_id)
+
+        await self._commit_operations([
+            ("set", collection.document(f"{generation}-{index:04d}"), {"generation": generation, "index": index, "data": chunk})
+            for index, chunk in enumerate(chunks)
+        ])
+
+        pointer = {
+            "generation": generation,
+            "chunks": len(chunks),
+            "bytes": len(packed),
+            "codec": codec_name(packed),
+            "digest": digest,
+            "count": len(projects),
+            "binding": binding,
+            "updated_at": time.time(),
+        }
+        summary = [{key: project.get(key) for key in self.PROJECT_SUMMARY_FIELDS} for project in projects]
+        self.invalidate(user_id)
+        try:
+            replaced = await self.run(self._swap_analysis_pointer, user_id, {"projects_analysis": pointer, "projects_summary": summary})
+        except BaseException:
+            await self._commit_operations([("delete", collection.document(f"{generation}-{index:04d}"), None) for index in range(len(chunks))])
+            raise
+        finally:
+            self.invalidate(user_id)
+
+        if replaced and replaced.get("generation") and replaced["generation"] != generation:
+            await self._commit_operations([
+                ("delete", collection.document(f"{replaced['generation']}-{index:04d}"), None)
+                for index in range(replaced.get("chunks", 0))
+            ])
+        logger.info("Analysis of %s projects stored for %s: %s bytes in %s chunk(s), %s.", len(projects), user_id, len(packed), len(chunks), pointer['codec'])
+        return pointer
+
+    async def load_project_analysis(self, user_id: str, pointer: dict = None):
+        """
+        Kage: Reads back the analyzed projects written by save_project_analysis.
+
+        Args:
+            pointer (dict, optional): The profile's "projects_analysis", when the caller
+                already holds the profile. Read from the profile otherwise.
+
+        Returns:
+            list: The stored projects as ProjectRecord, or None if nothing is stored or the
+            blob is incomplete or in an unknown format.
+        """
+        if pointer is None:
+            pointer = (await self.load_profile(user_id)).get("projects_analysis")
+        if not pointer:
+            return None
+
+        collection = self._analysis_collection(user_id)
+        refs = [collection.document(f"{pointer['generation']}-{index:04d}") for index in range(pointer["chunks"])]
+        snapshots = await self.run(lambda: list(self.db.get_all(refs)))
+        chunks = {}
+        for snapshot in snapshots:
+            if snapshot.exists:
+                data = snapshot.to_dict()
+                chunks[data["index"]] = data["data"]
+        if len(chunks) != pointer["chunks"]:
+            logger.warning("Stored analysis for %s is incomplete: %s/%s chunks.", user_id, len(chunks), pointer['chunks'])
+            return None
+
+        packed = b"".join(chunks[index] for index in range(pointer["chunks"]))
+        if blob_digest(packed) != pointer.get("digest"):
+            logger.warning("Stored analysis for %s failed its digest check.", user_id)
+            return None
+        if packed[:1] != CODEC_RECORDS:
+            logger.warning("Stored analysis for %s has an unknown codec %r.", user_id, packed[:1])
+            return None
+        return unpack_records(packed[1:])
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,57 @@
+# app/services/rate_limit.py
+
+import time
+import asyncio
+
+
+class AsyncRateLimiter:
+    """
+    Kage: The governor of the oracle's gate. Calls are spaced to a steady rate and
+    capped in number at once, so a burst of work drains at the pace the API quota
+    allows instead of failing against it.
+
+    Usage:
+        async with limiter:
+            ...  # one API call
+    """
+    def __init__(self, requests_per_minute: float = 60.0, max_concurrency: int = 4):
+        """
+        Args:
+            requests_per_minute (float): Sustained call rate. 0 or less disables spacing.
+            max_concurrency (int): Calls allowed in flight at once.
+        """
+        self.requests_per_minute = float(requests_per_minute)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._interval = 60.0 / self.requests_per_minute if self.requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Kage: Waits for a free slot, then for the call's turn."""
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_slot)
+                self._next_slot = start + self._interval
+            if start > now:
+                await asyncio.sleep(start - now)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    def release(self):
+        self._semaphore.release()
+
+    def penalize(self, seconds: float):
+        """Kage: The API asked for patience (HTTP 429). No call starts before it has passed."""
+        self._next_slot = max(self._next_slot, time.monotonic() + max(0.0, float(seconds)))
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
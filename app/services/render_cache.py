@@ -0,0 +1,102 @@
+# app/services/render_cache.py
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from app.services.structured_logging import get_logger
+
+logger = get_logger("render_cache")
+
+
+class RenderCache:
+    """
+    Kage: The memory of forged forms. Identical inputs yield identical documents,
+    so a document is forged once and remembered under the hash of what shaped it.
+    Bounded by entry count, total size and age; the least recently used fall first.
+    """
+    def __init__(self, max_entries: int = 128, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        logger.info("RenderCache initialized. Entries: %s, bytes: %s, TTL: %ss", self.max_entries, self.max_bytes, self.ttl_seconds)
+
+    @staticmethod
+    def make_key(resume_digest: str, template: str, output_format: str) -> str:
+        """
+        Kage: Derives the identity of a form from its content and its shape.
+
+        Args:
+            resume_digest (str): The digest of the resume content (see ResumeBuilder).
+            template (str): The template name.
+            output_format (str): The requested format (pdf, docx, html, ...).
+
+        Returns:
+            str: A SHA-256 hex digest.
+        """
+        material = f"{resume_digest}|{template}|{output_format.lower()}".encode("utf-8")
+        return hashlib.sha256(material).hexdigest()
+
+    @staticmethod
+    def etag_for(key: str) -> str:
+        """Kage: A strong validator, quoted as HTTP demands."""
+        return f'"{key}"'
+
+    @staticmethod
+    def etag_matches(if_none_match: str, etag: str) -> bool:
+        """Kage: Honors the If-None-Match list, weak validators and the wildcard."""
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == "*" or candidate == etag:
+                return True
+        return False
+
+    def get(self, key: str):
+        """
+        Kage: Recalls a forged form.
+
+        Returns:
+            dict: {"etag", "content", "media_type", "filename"}, or None if absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry["created"] > self.ttl_seconds:
+                self._evict(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, content: bytes, media_type: str, filename: str) -> dict:
+        """Kage: Remembers a forged form, releasing the oldest memories when over budget."""
+        entry = {
+            "etag": self.etag_for(key),
+            "content": content,
+            "media_type": media_type,
+            "filename": filename,
+            "created": time.monotonic(),
+        }
+        if len(content) > self.max_bytes:
+            return entry
+
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = entry
+            self._total_bytes += len(content)
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+        return entry
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= len(entry["content"])
@@ -0,0 +1,176 @@
+# app/services/request_profiler.py
+
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextlib
+from collections import Counter
+
+from app.services.structured_logging import get_logger
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # Kage: The built-in sampler stands in, at the cost of async attribution.
+    Profiler = None
+
+logger = get_logger("profiler")
+
+_PROFILE_ID_CHARS = set("0123456789abcdef")
+
+
+class _StackSampler(threading.Thread):
+    """
+    Kage: Samples one thread's stack at a fixed interval and folds identical stacks
+    together. Everything that runs on that thread is seen, so on the event loop
+    thread concurrent requests share the picture.
+    """
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="kaku-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class RequestProfiler:
+    """
+    Kage: The observer of a single slow request. A sampling profiler runs around the
+    request and its flame graph is kept on disk for an administrator to fetch.
+
+    With pyinstrument installed the profile follows the request's own coroutines and
+    is stored in the speedscope format. Without it, the event loop thread is sampled
+    and stored as folded stacks. Both open in https://www.speedscope.app, and folded
+    stacks also in flamegraph.pl.
+
+    One request is profiled at a time; a second asking meanwhile runs unprofiled.
+    """
+    def __init__(self, store_dir: str, interval: float = 0.001, max_profiles: int = 50):
+        """
+        Args:
+            store_dir (str): Where profiles and their descriptions are written.
+            interval (float): Seconds between samples.
+            max_profiles (int): Profiles kept; the oldest are deleted first.
+        """
+        self.store_dir = store_dir
+        self.interval = float(interval)
+        self.max_profiles = max(1, int(max_profiles))
+        self._busy = threading.Lock()
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    @property
+    def backend(self) -> str:
+        return "pyinstrument" if Profiler is not None else "sampler"
+
+    @contextlib.asynccontextmanager
+    async def profile(self, label: str, user_id: str = None):
+        """
+        Kage: Profiles the enclosed block. Yields a dict whose "id" is set once the
+        profile is stored, or stays None if another profile was already running.
+        """
+        record = {"id": None}
+        if not self._busy.acquire(blocking=False):
+            yield record
+            return
+        try:
+            started, wall = time.perf_counter(), time.time()
+            if Profiler is not None:
+                profiler = Profiler(interval=self.interval, async_mode="enabled")
+                profiler.start()
+
+                def finish():
+                    profiler.stop()
+                    return profiler.output(renderer=SpeedscopeRenderer()), "speedscope.json"
+            else:
+                sampler = _StackSampler(threading.get_ident(), self.interval)
+                sampler.start()
+
+                def finish():
+                    sampler.stop()
+                    return sampler.folded(), "folded.txt"
+            try:
+                yield record
+            finally:
+                # A failed request is profiled too; it is often the interesting one.
+                content, extension = finish()
+                record["id"] = self._store(content, extension, {
+                    "label": label,
+                    "user_id": user_id,
+                    "started_at": wall,
+                    "duration_seconds": round(time.perf_counter() - started, 6),
+                    "backend": self.backend,
+                })
+        finally:
+            self._busy.release()
+
+    def _store(self, content: str, extension: str, meta: dict) -> str:
+        profile_id = uuid.uuid4().hex
+        meta = {**meta, "id": profile_id, "file": f"{profile_id}.{extension}"}
+        try:
+            with open(os.path.join(self.store_dir, meta["file"]), "w", encoding="utf-8") as f:
+                f.write(content)
+            with open(os.path.join(self.store_dir, f"{profile_id}.meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            self._prune()
+            logger.info("Profile %s stored for %s (%.3fs).", profile_id, meta["label"], meta["duration_seconds"])
+        except OSError as e:
+            logger.warning("Profile of %s could not be stored: %s", meta["label"], e)
+        return profile_id
+
+    def list(self) -> list:
+        """Kage: Descriptions of the stored profiles, newest first."""
+        profiles = []
+        for name in os.listdir(self.store_dir):
+            if name.endswith(".meta.json"):
+                try:
+                    with open(os.path.join(self.store_dir, name), encoding="utf-8") as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(profiles, key=lambda meta: meta.get("started_at", 0), reverse=True)
+
+    def get(self, profile_id: str):
+        """
+        Kage: A stored profile.
+
+        Returns:
+            tuple: (content, media_type, filename), or None if there is no such profile.
+        """
+        if not profile_id or not set(profile_id) <= _PROFILE_ID_CHARS:
+            return None
+        try:
+            with open(os.path.join(self.store_dir, f"{profile_id}.meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(os.path.join(self.store_dir, meta["file"]), "rb") as f:
+                content = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        media_type = "application/json" if meta["file"].endswith(".json") else "text/plain; charset=utf-8"
+        return content, media_type, meta["file"]
+
+    def _prune(self):
+        for meta in self.list()[self.max_profiles:]:
+            for name in (meta.get("file"), f"{meta['id']}.meta.json"):
+                with contextlib.suppress(OSError, TypeError):
+                    os.remove(os.path.join(self.store_dir, name))
@@ -0,0 +1,169 @@
+# app/services/resume_builder.py
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from app.models.resume import ResumeModel, ResumeProject, ResumeWorkEntry
+from app.services.structured_logging import get_logger
+
+logger = get_logger("resume")
+
+# Kage: Only what reaches the page shapes the form. Secrets and bookkeeping never enter the digest.
+RESUME_PROFILE_FIELDS = (
+    "name", "email", "phone", "linkedin", "github_profile", "professional_summary",
+    "user_defined_skills", "user_defined_technologies", "languages", "work_experience",
+)
+RESUME_PROJECT_FIELDS = (
+    "name", "html_url", "summary", "achievements", "languages", "technologies", "score",
+)
+
+# Define a list of common, often too granular, Python libraries or generic terms
+# that might be identified by LLM but are not ideal for high-level CV tech lists.
+# This list can be expanded based on feedback.
+EXCLUDE_TECH_KEYWORDS = [
+    # Generic/Low-level Python libraries/tools
+    "requests", "json", "os", "uuid", "random", "traceback", "dotenv",
+    "smtplib", "email", "header", "urllib.parse", "httpx", "jwt",
+    "uvicorn", "pygithub", "pyjwt", "pyyaml", "toml", "pypdf",
+    "python-docx", "docx2pdf", "keyboard", "pygetwindow", "rasterio",
+    "pyinstaller", "pyopengl", "pyqt5", # PyQt5 is a framework, but often listed with its components
+
+    # Generic development concepts/features (better covered by skills/achievements)
+    "api design", "authentication", "backend development", "frontend development",
+    "github integration", "cv parsing", "data extraction", "llm-powered project analysis",
+    "oauth", "project summarization", "resume generation", "scoring systems",
+    "template design", "web ui development", "rest apis", "websocket",
+
+    # Languages/Markup already covered in Programming Languages section (or to be combined)
+    "css", "css3", "html", "html5", "javascript", "python", "bash", "c", "c++",
+    "dart", "go", "java", "kotlin", "rust", "swift", "typescript", "tex",
+
+    # Specific SDKs/components if the platform itself is listed
+    "firebase js sdk", "firebase-admin",
+
+    # Other potentially too granular or implied tools
+    "jinja2", # Template engine, can be implied by Python web frameworks
+    "git", # Source control is a skill, not a specific tech for this list
+    "linux", # Operating system, often implied by development environment
+    "vs code", # IDE, generally not listed as a core project technology
+    "excel", "google sheets", "power bi", "tableau", # Data analysis tools, but not core *project* tech
+]
+_EXCLUDED_TECH = frozenset(keyword.lower() for keyword in EXCLUDE_TECH_KEYWORDS)
+
+
+class ResumeBuilder:
+    """
+    Kage: The selector. Decides what the form says: the strongest projects,
+    the most recent work, the essential achievements, the technologies worth
+    naming. The result is format-neutral and remembered by the digest of its
+    inputs, so every renderer shares a single selection.
+    """
+    MAX_PROJECTS = 4
+    MAX_WORK_EXPERIENCE_ENTRIES = 2
+    MAX_ACHIEVEMENTS = 3
+
+    def __init__(self, max_cached: int = 256):
+        self.max_cached = max(1, int(max_cached))
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        logger.info("ResumeBuilder initialized. Cached models: %s", self.max_cached)
+
+    @staticmethod
+    def digest_inputs(projects_data: list, user_cv_data: dict) -> str:
+        """
+        Kage: Derives the identity of a resume from the fields that reach the page.
+
+        Returns:
+            str: A SHA-256 hex digest.
+        """
+        material = {
+            "profile": {key: user_cv_data.get(key) for key in RESUME_PROFILE_FIELDS},
+            "projects": [{key: project.get(key) for key in RESUME_PROJECT_FIELDS} for project in projects_data],
+        }
+        encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    @staticmethod
+    def filter_technologies_for_display(technologies) -> list:
+        """
+        Kage: Filters out overly granular or less relevant technologies for CV display.
+        Focuses on major frameworks, tools, and platforms, as requested by the Master.
+        """
+        return [tech for tech in technologies if tech.lower() not in _EXCLUDED_TECH]
+
+    @staticmethod
+    def _present(value) -> str:
+        """Kage: "N/A" is an absence, not a value worth printing."""
+        return "" if not value or value == "N/A" else value
+
+    def _build_project(self, project: dict) -> ResumeProject:
+        # Kage: Combine Programming Languages and Key Technologies into a single filtered line.
+        combined = set(project.get('languages', {}) or {})
+        combined.update(project.get('technologies', []) or [])
+        return ResumeProject(
+            name=project.get('name', 'Unnamed Project'),
+            url=project.get('html_url') or "",
+            summary=project.get('summary') or "",
+            achievements=list(project.get('achievements') or [])[:self.MAX_ACHIEVEMENTS],
+            technologies=sorted(self.filter_technologies_for_display(combined)),
+            score=project.get('score', 0),
+        )
+
+    def _build(self, projects_data: list, user_cv_data: dict, digest: str) -> ResumeModel:
+        # Kage: Sort projects by score in descending order and keep the most impactful.
+        top_projects = sorted(projects_data, key=lambda p: p.get('score', 0), reverse=True)[:self.MAX_PROJECTS]
+
+        work_experience = [
+            ResumeWorkEntry(
+                title=entry.get('title', 'N/A'),
+                company=entry.get('company', 'N/A'),
+                start_date=entry.get('start_date', 'N/A'),
+                end_date=entry.get('end_date', 'N/A'),
+                responsibilities=list(entry.get('responsibilities') or []),
+            )
+            for entry in (user_cv_data.get('work_experience') or [])[:self.MAX_WORK_EXPERIENCE_ENTRIES]
+            if isinstance(entry, dict)
+        ]
+
+        return ResumeModel(
+            name=user_cv_data.get('name') or 'Your Name',
+            email=self._present(user_cv_data.get('email')),
+            phone=self._present(user_cv_data.get('phone')),
+            linkedin=self._present(user_cv_data.get('linkedin')),
+            github_profile=self._present(user_cv_data.get('github_profile')),
+            professional_summary=user_cv_data.get('professional_summary') or "",
+            skills=sorted(user_cv_data.get('user_defined_skills') or []),
+            technologies=sorted(user_cv_data.get('user_defined_technologies') or []),
+            languages=sorted(user_cv_data.get('languages') or []),
+            work_experience=work_experience,
+            projects=[self._build_project(project) for project in top_projects],
+            digest=digest,
+        )
+
+    def build(self, projects_data: list, user_cv_data: dict) -> ResumeModel:
+        """
+        Kage: Selects the content of the resume. Identical inputs return the
+        remembered model.
+
+        Args:
+            projects_data (list): Analyzed and scored projects, in any order.
+            user_cv_data (dict): The user profile.
+
+        Returns:
+            ResumeModel: The selected content. Treat it as read-only; it may be shared.
+        """
+        digest = self.digest_inputs(projects_data, user_cv_data)
+        with self._lock:
+            model = self._models.get(digest)
+            if model is not None:
+                self._models.move_to_end(digest)
+                return model
+
+        model = self._build(projects_data, user_cv_data, digest)
+        with self._lock:
+            self._models[digest] = model
+            while len(self._models) > self.max_cached:
+                self._models.popitem(last=False)
+        return model
@@ -0,0 +1,214 @@
+# app/services/resume_renderers.py
+
+import re
+import json
+from html import escape
+from urllib.parse import urlsplit
+
+from app.models.resume import ResumeModel
+
+# Kage: The lighter shapes of the form. DOCX and PDF are forged by CVWriter and PDFRenderer.
+TEXT_FORMATS = {
+    "html": ("text/html; charset=utf-8", "html"),
+    "md": ("text/markdown; charset=utf-8", "md"),
+    "json": ("application/json", "json"),
+}
+
+# Kage: The only link targets a resume carries. Anything else from a CV (javascript:, data:, ...) is shown, never linked.
+SAFE_URL_SCHEMES = ("http", "https", "mailto")
+_URL_NOISE = re.compile(r"[\x00-\x20\x7f]+")
+
+
+def safe_href(url: str) -> str:
+    """
+    Kage: The URL if it may become a link, else "". A bare "linkedin.com/in/..." is
+    read as https. Whitespace and control characters browsers ignore inside a
+    scheme are removed before the scheme is judged.
+    """
+    url = _URL_NOISE.sub("", url or "")
+    if not url:
+        return ""
+    scheme = urlsplit(url).scheme.lower() if ":" in url.split("/", 1)[0] else ""
+    if not scheme:
+        return "https://" + url.lstrip("/")
+    return url if scheme in SAFE_URL_SCHEMES else ""
+
+
+def _link(url: str, label: str) -> str:
+    href = safe_href(url)
+    return f'<a href="{escape(href)}">{label}</a>' if href else f"{label}: {escape(url)}"
+
+
+_HTML_STYLE = """
+body { font-family: Calibri, Arial, sans-serif; font-size: 10.5pt; max-width: 800px; margin: 2em auto; color: #111; }
+h1 { text-align: center; margin-bottom: 0.2em; }
+h2 { border-bottom: 1px solid #ccc; margin-top: 1.2em; }
+.contact { text-align: center; }
+.entry-title { font-weight: bold; font-size: 11pt; margin-bottom: 0; }
+.duration, .tech { font-style: italic; }
+p, li { margin: 0.15em 0; }
+"""
+
+
+def render_html(resume: ResumeModel) -> str:
+    """
+    Kage: A standalone HTML page of the resume. Suitable for preview without
+    forging a DOCX first. Every value is escaped; links are http(s) or mailto only.
+    """
+    parts = [
+        "<!DOCTYPE html>",
+        '<html lang="en"><head><meta charset="utf-8">',
+        f"<title>{escape(resume.name)}</title>",
+        f"<style>{_HTML_STYLE}</style>",
+        "</head><body>",
+        f"<h1>{escape(resume.name)}</h1>",
+    ]
+
+    contact = []
+    if resume.linkedin:
+        contact.append(_link(resume.linkedin, "LinkedIn"))
+    if resume.github_profile:
+        contact.append(_link(resume.github_profile, "GitHub"))
+    contact.extend(escape(item) for item in (resume.email, resume.phone) if item)
+    if contact:
+        parts.append(f'<p class="contact">{" | ".join(contact)}</p>')
+
+    if resume.professional_summary:
+        parts.append(f"<h2>Professional Summary</h2><p>{escape(resume.professional_summary)}</p>")
+    for heading, items in (("Skills", resume.skills), ("Technologies", resume.technologies), ("Languages", resume.languages)):
+        if items:
+            parts.append(f"<h2>{heading}</h2><p><strong>{escape(', '.join(items))}</strong></p>")
+
+    if resume.work_experience:
+        parts.append("<h2>Work Experience</h2>")
+        for entry in resume.work_experience:
+            parts.append(f'<p class="entry-title">{escape(entry.title)} | {escape(entry.company)}</p>')
+            parts.append(f'<p class="duration">{escape(entry.start_date)} - {escape(entry.end_date)}</p>')
+            if entry.responsibilities:
+                parts.append("<ul>" + "".join(f"<li>{escape(item)}</li>" for item in entry.responsibilities) + "</ul>")
+
+    if resume.projects:
+        parts.append("<h2>Projects</h2>")
+        for project in resume.projects:
+            title = escape(project.name)
+            if project.url:
+                title += " | " + _link(project.url, "View Project")
+            parts.append(f'<p class="entry-title">{title}</p>')
+            if project.summary:
+                parts.append(f"<p>{escape(project.summary)}</p>")
+            if project.achievements:
+                parts.append("<p><strong>Key Achievements:</strong></p>")
+                parts.append("<ul>" + "".join(f"<li>{escape(item)}</li>" for item in project.achievements) + "</ul>")
+            if project.technologies:
+                parts.append(f'<p class="tech">Technologies &amp; Languages: {escape(", ".join(project.technologies))}</p>')
+
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def _md_link(url: str, label: str) -> str:
+    href = safe_href(url)
+    return f"[{label}]({href})" if href else f"{label}: {url}"
+
+
+def render_markdown(resume: ResumeModel) -> str:
+    """Kage: The resume as Markdown. Plain, portable, diffable. Links as in render_html."""
+    lines = [f"# {resume.name}", ""]
+
+    contact = []
+    if resume.linkedin:
+        contact.append(_md_link(resume.linkedin, "LinkedIn"))
+    if resume.github_profile:
+        contact.append(_md_link(resume.github_profile, "GitHub"))
+    contact.extend(item for item in (resume.email, resume.phone) if item)
+    if contact:
+        lines += [" | ".join(contact), ""]
+
+    if resume.professional_summary:
+        lines += ["## Professional Summary", "", resume.professional_summary, ""]
+    for heading, items in (("Skills", resume.skills), ("Technologies", resume.technologies), ("Languages", resume.languages)):
+        if items:
+            lines += [f"## {heading}", "", f"**{', '.join(items)}**", ""]
+
+    if resume.work_experience:
+        lines += ["## Work Experience", ""]
+        for entry in resume.work_experience:
+            lines += [f"**{entry.title} | {entry.company}**  ", f"*{entry.start_date} - {entry.end_date}*", ""]
+            lines += [f"- {item}" for item in entry.responsibilities]
+            lines.append("")
+
+    if resume.projects:
+        lines += ["## Projects", ""]
+        for project in resume.projects:
+            title = f"**{project.name}**"
+            if project.url:
+                title += " | " + _md_link(project.url, "View Project")
+            lines += [title, ""]
+            if project.summary:
+                lines += [project.summary, ""]
+            if project.achievements:
+                lines += ["**Key Achievements:**", ""]
+                lines += [f"- {item}" for item in project.achievements]
+                lines.append("")
+            if project.technologies:
+                lines += [f"*Technologies & Languages: {', '.join(project.technologies)}*", ""]
+
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def render_json_resume(resume: ResumeModel) -> str:
+    """
+    Kage: The resume in the JSON Resume schema (jsonresume.org), so other tools
+    may read what Kaku-Ryu selected.
+    """
+    profiles = []
+    if resume.linkedin:
+        profiles.append({"network": "LinkedIn", "url": resume.linkedin})
+    if resume.github_profile:
+        profiles.append({"network": "GitHub", "url": resume.github_profile})
+
+    document = {
+        "basics": {
+            "name": resume.name,
+            "email": resume.email,
+            "phone": resume.phone,
+            "summary": resume.professional_summary,
+            "profiles": profiles,
+        },
+        "work": [
+            {
+                "name": entry.company,
+                "position": entry.title,
+                "startDate": entry.start_date,
+                "endDate": entry.end_date,
+                "highlights": entry.responsibilities,
+            }
+            for entry in resume.work_experience
+        ],
+        "projects": [
+            {
+                "name": project.name,
+                "url": project.url,
+                "description": project.summary,
+                "highlights": project.achievements,
+                "keywords": project.technologies,
+            }
+            for project in resume.projects
+        ],
+        "skills": [{"name": skill} for skill in resume.skills] + [{"name": tech, "level": "Technology"} for tech in resume.technologies],
+        "languages": [{"language": language} for language in resume.languages],
+    }
+    return json.dumps(document, indent=2, ensure_ascii=False)
+
+
+def render_text(resume: ResumeModel, output_format: str) -> str:
+    """
+    Kage: Dispatches to the renderer of a text format.
+
+    Raises:
+        ValueError: If the format is not one of TEXT_FORMATS.
+    """
+    renderers = {"html": render_html, "md": render_markdown, "json": render_json_resume}
+    if output_format not in renderers:
+        raise ValueError(f"Unknown text format '{output_format}'.")
+    return renderers[output_format](resume)
@@ -1,6 +1,10 @@
 # app/services/scoring.py
 
 from datetime import datetime, timedelta, timezone # Corrected import: added timezone directly
+from app.services.metrics import timed
+from app.services.structured_logging import get_logger
+
+logger = get_logger("scoring")
 
 class ScoringEngine:
     def __init__(self):
@@ -8,8 +12,9 @@ class ScoringEngine:
         Initializes the ScoringEngine.
         Future enhancements might include loading scoring weights from configuration.
         """
-        print("[Kage Scoring] Scoring Engine initialized.")
+        logger.info("Scoring Engine initialized.")
 
+    @timed("scoring")
     def calculate_score(self, project_data: dict) -> float:
         """
         Calculates a numerical score for a single project based on its analyzed data.
@@ -80,7 +85,7 @@ class ScoringEngine:
                 elif days_since_last_push <= 365:
                     score += 5
             except ValueError:
-                print(f"[Kage Scoring] Warning: Invalid date format for last_pushed_at: {last_pushed_at_str}")
+                logger.debug("Invalid date format for last_pushed_at: %s", last_pushed_at_str)
                 pass # Continue without adding recency score
 
         # --- GitHub Metrics ---
@@ -163,7 +168,7 @@ class ScoringEngine:
         # NEW: Scoring based on Performance Metrics
         performance_metrics = project_data.get('performance_metrics', {})
         if performance_metrics:
-            print(f"[Kage Scoring] Detected performance metrics for {project_data.get('name', 'Unnamed')}: {performance_metrics}")
+            logger.debug("Detected performance metrics for %s: %s", project_data.get('name', 'Unnamed'), sorted(performance_metrics))
             score += 25 # Base bonus for having any performance metrics
 
             # Example: Bonus for high accuracy (adjust threshold as needed)
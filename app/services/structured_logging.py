@@ -0,0 +1,131 @@
+# app/services/structured_logging.py
+
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import contextlib
+import contextvars
+import logging.handlers
+
+# Kage: The correlation id of the request being served. None outside a request.
+request_id_var = contextvars.ContextVar("kaku_request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came in through `extra`.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+ROOT_LOGGER = "kaku"
+
+_listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Kage: A logger under the application's root, e.g. get_logger("github") -> "kaku.github"."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+@contextlib.contextmanager
+def correlation_scope(request_id: str):
+    """Kage: Every record logged within this scope, and in tasks started from it, carries the id."""
+    token = request_id_var.set(request_id)
+    try:
+        yield
+    finally:
+        request_id_var.reset(token)
+
+
+class _CorrelationFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Kage: Hands records to the queue with as little work as possible in the caller:
+    the message is interpolated and an exception rendered, nothing more. Formatting
+    and the write to stdout happen on the listener's thread.
+    """
+    def prepare(self, record):
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """Kage: One JSON object per line: time, level, logger, message, request id, extra fields."""
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Kage: The readable form, for a terminal: `[kaku.github] INFO (request id) message`."""
+    def format(self, record):
+        request_id = getattr(record, "request_id", None)
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} [{record.name}] {record.levelname}"
+        if request_id:
+            line += f" ({request_id})"
+        line += f" {record.getMessage()}"
+        if record.exc_text:
+            line += f"\n{record.exc_text}"
+        return line
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", stream=None):
+    """
+    Kage: Routes the application's loggers through a queue to one background writer.
+    A log call costs an enqueue; console I/O never blocks a request. Calling again
+    replaces the previous configuration.
+
+    Args:
+        level (str): The lowest level written, e.g. "DEBUG" or "INFO".
+        fmt (str): "json" for one JSON object per line, "text" for a terminal.
+        stream: Where records are written. Defaults to stdout.
+    """
+    global _listener
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(TextFormatter() if fmt == "text" else JSONFormatter())
+
+    records = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    handler.addFilter(_CorrelationFilter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [handler]
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=False)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Kage: Writes out everything still queued and stops the writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
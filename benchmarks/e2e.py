@@ -0,0 +1,467 @@
+# benchmarks/e2e.py
+"""
+Kage: The end-to-end benchmark. The application runs in this process, driven
+through its ASGI interface, while GitHub and Gemini are answered by the local
+stand-ins of benchmarks/fakes.py in a child process. Firestore is an in-memory
+stand-in. Nothing leaves the machine and no key is needed.
+
+For each synthetic portfolio size it measures:
+
+    projects_cold    GET /api/projects, the evaluation forgotten before each call
+    projects_warm    GET /api/projects, page by page from the remembered evaluation
+    download_resume  GET /download-resume, as served (the render cache included)
+    upload_cv        POST /upload-cv, a distinct CV each time so each is parsed
+
+Each scenario reports latency percentiles, throughput and errors, then repeats
+one request under tracemalloc for its peak traced memory. Results can be saved
+as a baseline and later runs compared against it.
+
+Run from the repository root:
+
+    python benchmarks/e2e.py [--sizes 10,100,1000] [--requests 20] [--concurrency 4]
+    python benchmarks/e2e.py --save-baseline          # record benchmarks/baselines/e2e.json
+    python benchmarks/e2e.py --tolerance 0.25         # compare; exit status 1 on regression
+
+Baselines hold wall-clock figures and are only comparable on the machine that
+recorded them.
+
+PyGithub pauses between requests (0.25 s by default), which alone would make
+projects_cold a measure of sleeping. The stand-in is called without the pause;
+--github-throttle puts one back.
+"""
+
+import io
+import os
+import copy
+import sys
+import json
+import time
+import asyncio
+import platform
+import argparse
+import tempfile
+import resource
+import statistics
+import subprocess
+import tracemalloc
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import bench_token
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baselines", "e2e.json")
+BENCH_APP_ID = "kaku-bench"
+
+# Kage: What a regression is. Latency and memory may not grow, throughput may not fall, past the tolerance.
+HIGHER_IS_WORSE = ("p50_ms", "p95_ms", "peak_traced_bytes")
+LOWER_IS_WORSE = ("throughput_rps",)
+
+
+class _Snapshot:
+    def __init__(self, data, update_time=None):
+        # Kage: A snapshot does not follow later writes, as in Firestore.
+        self._data = copy.deepcopy(data)
+        self.update_time = update_time
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class _Document:
+    def __init__(self, store: "InMemoryFirestore", path: tuple):
+        self._store = store
+        self._path = path
+
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+
+    def collection(self, name: str) -> "_Collection":
+        return _Collection(self._store, self._path + (name,))
+
+    def get(self) -> _Snapshot:
+        return _Snapshot(self._store.documents.get(self._path), self._store.update_times.get(self._path))
+
+    def _touch(self):
+        self._store.clock += 1
+        self._store.update_times[self._path] = self._store.clock
+
+    def set(self, data: dict, merge: bool = False):
+        current = self._store.documents.get(self._path) if merge else None
+        self._store.documents[self._path] = {**(current or {}), **data}
+        self._touch()
+
+    def create(self, data: dict):
+        if self._path in self._store.documents:
+            from google.api_core.exceptions import Conflict
+            raise Conflict(f"Document already exists: {'/'.join(self._path)}")
+        self.set(data)
+
+    def update(self, fields: dict, option: dict = None):
+        if self._path not in self._store.documents:
+            from google.api_core.exceptions import NotFound
+            raise NotFound(f"No document to update: {'/'.join(self._path)}")
+        if option and option.get("last_update_time") != self._store.update_times.get(self._path):
+            from google.api_core.exceptions import FailedPrecondition
+            raise FailedPrecondition(f"Document changed since it was read: {'/'.join(self._path)}")
+        self._store.documents[self._path].update(fields)
+        self._touch()
+
+    def delete(self):
+        self._store.documents.pop(self._path, None)
+        self._store.update_times.pop(self._path, None)
+
+
+class _Collection:
+    def __init__(self, store: "InMemoryFirestore", path: tuple):
+        self._store = store
+        self._path = path
+
+    def document(self, name: str) -> _Document:
+        return _Document(self._store, self._path + (name,))
+
+    def list_documents(self) -> list:
+        return [_Document(self._store, path) for path in list(self._store.documents) if path[:-1] == self._path]
+
+
+class _Batch:
+    def __init__(self):
+        self._operations = []
+
+    def set(self, ref, data):
+        self._operations.append(lambda: ref.set(data))
+
+    def update(self, ref, data):
+        self._operations.append(lambda: ref.update(data))
+
+    def delete(self, ref):
+        self._operations.append(ref.delete)
+
+    def commit(self):
+        for operation in self._operations:
+            operation()
+
+
+class InMemoryFirestore:
+    """Kage: The part of the Firestore client ProfileRepository uses, held in a dict."""
+    def __init__(self):
+        self.documents = {}
+        # A logical clock standing in for Firestore's update times.
+        self.update_times = {}
+        self.clock = 0
+
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self, (name,))
+
+    def batch(self) -> _Batch:
+        return _Batch()
+
+    @staticmethod
+    def write_option(**kwargs) -> dict:
+        return kwargs
+
+    def get_all(self, refs):
+        return [ref.get() for ref in refs]
+
+
+def start_fakes(args) -> tuple:
+    """Kage: Starts the stand-ins in a child process. Returns (process, {"github": url, "gemini": url})."""
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.fakes",
+            "--sizes", ",".join(str(size) for size in args.sizes),
+            "--seed", str(args.seed),
+            "--github-latency", str(args.github_latency),
+            "--gemini-latency", str(args.gemini_latency),
+            "--jitter", str(args.jitter),
+            "--github-error-rate", str(args.github_error_rate),
+            "--gemini-error-rate", str(args.gemini_error_rate),
+        ],
+        cwd=REPO_ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    line = process.stdout.readline()
+    if not line:
+        process.kill()
+        raise RuntimeError("The GitHub and Gemini stand-ins did not start.")
+    return process, json.loads(line)
+
+
+def stop_fakes(process) -> dict:
+    """Kage: Stops the stand-ins. Returns their request and error counts."""
+    process.stdin.close()
+    try:
+        output, _ = process.communicate(timeout=10)
+        return json.loads(output.strip().splitlines()[-1]) if output.strip() else {}
+    except (subprocess.TimeoutExpired, ValueError):
+        process.kill()
+        return {}
+
+
+def configure_environment(urls: dict, cache_dir: str, args):
+    """Kage: Points the application at the stand-ins. Must run before app.main is imported."""
+    os.environ["GITHUB_API_URL"] = urls["github"]
+    os.environ["GITHUB_SECONDS_BETWEEN_REQUESTS"] = str(args.github_throttle)
+    os.environ["GEMINI_API_BASE"] = f"{urls['gemini']}/v1beta"
+    os.environ["GEMINI_API"] = "bench-key"
+    os.environ["__app_id"] = BENCH_APP_ID
+    os.environ["KAKU_CACHE_DIR"] = cache_dir
+    os.environ.pop("__firebase_config", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Kage: The real quota would make the benchmark measure the rate limiter.
+    os.environ.setdefault("GEMINI_REQUESTS_PER_MINUTE", str(args.gemini_rpm))
+
+
+def id_token(user_id: str) -> str:
+    """Kage: A token for the id_token query parameter, whose uid get_current_user_id reads without verifying."""
+    import jwt
+    return jwt.encode({"uid": user_id}, "kaku-bench", algorithm="HS256")
+
+
+def cv_document(index: int) -> bytes:
+    """Kage: A small .docx CV. The index makes its content, and so its hash, unique."""
+    from docx import Document
+    document = Document()
+    document.add_heading(f"Bench Candidate {index}", level=0)
+    document.add_paragraph(f"bench.candidate{index}@example.com | +1 555 01{index % 100:02d} | linkedin.com/in/bench{index}")
+    document.add_heading("Summary", level=1)
+    document.add_paragraph("Engineer building data pipelines and APIs. " * 4)
+    document.add_heading("Experience", level=1)
+    for job in range(3):
+        document.add_paragraph(f"Engineer, Company {job} ({2015 + job * 3} - {2018 + job * 3})")
+        for bullet in range(4):
+            document.add_paragraph(f"Delivered project {index}-{job}-{bullet} with measurable results.", style="List Bullet")
+    document.add_heading("Skills", level=1)
+    document.add_paragraph("Python, Go, SQL, Kubernetes, Terraform")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def summarize(latencies: list, statuses: Counter, wall: float) -> dict:
+    ordered = sorted(latencies)
+
+    def percentile(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3) if ordered else None
+
+    return {
+        "requests": len(ordered),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else None,
+        "first_ms": round(latencies[0] * 1000, 3) if latencies else None,
+        "throughput_rps": round(len(ordered) / wall, 3) if wall > 0 else None,
+    }
+
+
+async def measure(send, requests: int, concurrency: int, before_each=None) -> dict:
+    """Kage: Sends `requests` requests, at most `concurrency` at a time, and summarizes them."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    latencies, statuses = [], Counter()
+
+    async def one(index):
+        async with semaphore:
+            if before_each is not None:
+                before_each(index)
+            started = time.perf_counter()
+            response = await send(index)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(max(1, requests))))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+async def traced_peak(send, index: int, before=None) -> int:
+    """Kage: The peak traced memory of one request, above what was traced before it."""
+    if before is not None:
+        before(index)
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        await send(index)
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+async def run_size(kaku, client, db: InMemoryFirestore, size: int, args) -> dict:
+    user_id = f"bench-{size}"
+    token = id_token(user_id)
+    db.collection("artifacts").document(BENCH_APP_ID).collection("users").document(user_id) \
+        .collection("cv_data").document("profile").set({
+            **kaku.user_cv_data_template, "name": f"Bench User {size}", "email": f"bench{size}@example.com",
+            "github_token_encrypted": bench_token(size), "email_verified": True,
+        })
+    kaku.profile_repository.invalidate(user_id)
+    forget = lambda _: kaku._forget_evaluated_projects(user_id)
+    pages = max(1, -(-size // args.page_size))
+
+    async def projects(index):
+        return await client.get("/api/projects", params={"id_token": token, "page": index % pages + 1, "limit": args.page_size})
+
+    # Kage: refresh, so a cold call evaluates rather than recall the evaluation stored by the last one.
+    async def projects_cold(index):
+        return await client.get("/api/projects", params={"id_token": token, "page": 1, "limit": args.page_size, "refresh": "true"})
+
+    async def download(index):
+        return await client.get("/download-resume", params={"id_token": token, "format": args.resume_format})
+
+    documents = [cv_document(size * 100_000 + index) for index in range(args.requests + 1)]
+
+    async def upload(index):
+        files = {"file": (f"cv-{index}.docx", documents[index], "application/vnd.openxmlformats-officedocument.wordprocessingml.document")}
+        return await client.post("/upload-cv", params={"id_token": token}, files=files)
+
+    results = {}
+    cold_runs = max(1, args.cold_runs)
+    results["projects_cold"] = await measure(projects_cold, cold_runs, 1, before_each=forget)
+    results["projects_cold"]["peak_traced_bytes"] = await traced_peak(projects_cold, 0, before=forget)
+
+    await projects(0)
+    results["projects_warm"] = await measure(projects, args.requests, args.concurrency)
+    results["projects_warm"]["peak_traced_bytes"] = await traced_peak(projects, 0)
+
+    results["download_resume"] = await measure(download, args.requests, args.concurrency)
+    results["download_resume"]["peak_traced_bytes"] = await traced_peak(download, 0)
+
+    results["upload_cv"] = await measure(upload, args.requests, args.concurrency)
+    results["upload_cv"]["peak_traced_bytes"] = await traced_peak(upload, args.requests)
+
+    for scenario, figures in results.items():
+        print(
+            f"[Kage Bench] {size:>5} repos  {scenario:<16} p50 {figures['p50_ms']:>9.1f} ms  p95 {figures['p95_ms']:>9.1f} ms  "
+            f"{figures['throughput_rps']:>8.2f} req/s  peak {figures['peak_traced_bytes'] / 1048576:>7.2f} MiB  "
+            f"errors {figures['errors']}",
+            flush=True,
+        )
+    return results
+
+
+async def run_suite(args) -> dict:
+    process, urls = start_fakes(args)
+    try:
+        with tempfile.TemporaryDirectory(prefix="kaku-bench-") as cache_dir:
+            configure_environment(urls, cache_dir, args)
+            import httpx
+            import app.main as kaku
+
+            await kaku.app.router.startup()
+            db = InMemoryFirestore()
+            kaku.db = db
+            kaku.profile_repository.db = db
+            results = {}
+            maxrss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            try:
+                transport = httpx.ASGITransport(app=kaku.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://kaku.bench", timeout=None) as client:
+                    for size in args.sizes:
+                        results[str(size)] = await run_size(kaku, client, db, size, args)
+            finally:
+                await kaku.app.router.shutdown()
+            maxrss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    finally:
+        fakes = stop_fakes(process)
+
+    return {
+        "meta": {
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("baseline", "save_baseline", "output")},
+            # ru_maxrss is KiB on Linux and bytes on macOS.
+            "maxrss_growth": maxrss_after - maxrss_before,
+            "fakes": fakes,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Kage: The figures that got worse than the baseline by more than the tolerance.
+
+    Returns:
+        list: Human-readable regression lines; empty when none.
+    """
+    regressions = []
+    for size, scenarios in current["results"].items():
+        for scenario, figures in scenarios.items():
+            reference = baseline.get("results", {}).get(size, {}).get(scenario)
+            if not reference:
+                continue
+            for key in HIGHER_IS_WORSE + LOWER_IS_WORSE:
+                now, before = figures.get(key), reference.get(key)
+                if not now or not before:
+                    continue
+                worse = now > before * (1 + tolerance) if key in HIGHER_IS_WORSE else now < before * (1 - tolerance)
+                if worse:
+                    regressions.append(f"{size} repos {scenario} {key}: {before} -> {now} ({(now / before - 1) * 100:+.0f}%)")
+            if figures["errors"] > reference.get("errors", 0):
+                regressions.append(f"{size} repos {scenario} errors: {reference.get('errors', 0)} -> {figures['errors']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the application end to end against local GitHub and Gemini stand-ins.")
+    parser.add_argument("--sizes", default="10,100,1000", help="Portfolio sizes, comma-separated.")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario.")
+    parser.add_argument("--cold-runs", type=int, default=2, help="Full evaluations timed per size.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--resume-format", default="docx", choices=("pdf", "docx", "html", "md", "json"))
+    parser.add_argument("--github-latency", type=float, default=0.0, help="Seconds added to every GitHub call.")
+    parser.add_argument("--gemini-latency", type=float, default=0.0, help="Seconds added to every Gemini call.")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--github-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--github-throttle", type=float, default=0.0, help="PyGithub's pause between requests, in seconds (its own default is 0.25).")
+    parser.add_argument("--gemini-rpm", type=float, default=100_000, help="The application's Gemini pace during the run.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Record this run as the baseline instead of comparing.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change before a figure is a regression.")
+    parser.add_argument("--output", help="Also write this run's results here.")
+    args = parser.parse_args(argv)
+    args.sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    print(f"[Kage Bench] PyGithub pause between requests: {args.github_throttle:g} s.", flush=True)
+    report = asyncio.run(run_suite(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[Kage Bench] Baseline recorded at {os.path.relpath(args.baseline, REPO_ROOT)}.")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("[Kage Bench] No baseline to compare against. Record one with --save-baseline.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.tolerance)
+    for line in regressions:
+        print(f"[Kage Bench] Regression: {line}")
+    if not regressions:
+        print(f"[Kage Bench] Within {args.tolerance:.0%} of the baseline recorded {baseline.get('meta', {}).get('recorded_at', '?')}.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+# benchmarks/fakes.py
+"""
+Kage: Stand-ins for GitHub and Gemini. Local HTTP servers that answer the calls
+the application makes, with synthetic portfolios behind them and configurable
+latency and error rates in front of them. Nothing leaves the machine.
+
+benchmarks/e2e.py starts them in a separate process, so their work does not
+count against the application's CPU or memory. They can also be run alone:
+
+    python -m benchmarks.fakes --sizes 10,100,1000 [--github-latency 0.05] [--error-rate 0.01]
+
+The first line printed is a JSON object with the two base URLs. The servers run
+until stdin closes. Portfolio `n` answers to the GitHub token `bench-token-n`.
+"""
+
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+LANGUAGES = ("Python", "TypeScript", "JavaScript", "Go", "Rust", "Java", "Kotlin", "C++", "Shell", "HTML", "CSS", "Dockerfile")
+TOPICS = ("api", "cli", "dashboard", "scraper", "compiler", "game", "bot", "pipeline", "library", "service", "model", "plugin")
+PYTHON_PACKAGES = ("fastapi", "flask", "django", "numpy", "pandas", "requests", "httpx", "pydantic", "sqlalchemy", "pytest", "torch", "scikit-learn")
+NPM_PACKAGES = ("react", "vue", "express", "next", "typescript", "vite", "jest", "axios", "lodash", "tailwindcss")
+WORDS = (
+    "build", "fast", "service", "data", "model", "stream", "cache", "render", "parse", "index", "query", "deploy",
+    "monitor", "schedule", "retry", "token", "queue", "worker", "client", "server", "config", "plugin", "metric", "event",
+)
+
+TOKEN_PREFIX = "bench-token-"
+
+
+def bench_token(size: int) -> str:
+    return f"{TOKEN_PREFIX}{size}"
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_portfolio(size: int, login: str = None, seed: int = 0) -> dict:
+    """
+    Kage: A deterministic portfolio of `size` listed repositories, plus the forks and
+    the profile README repository a real account has, which the listener skips.
+
+    Returns:
+        dict: {"login": ..., "repos": [repository dicts]}.
+    """
+    rng = random.Random(f"{seed}-{size}")
+    login = login or f"bench-user-{size}"
+    repos = [{"name": login, "description": "Profile README.", "fork": False, "private": False, "files": {}}]
+    for index in range(size + max(1, size // 20)):
+        topic = rng.choice(TOPICS)
+        languages = rng.sample(LANGUAGES, rng.randint(1, 4))
+        files = {}
+        if "Python" in languages:
+            files["requirements.txt"] = "\n".join(f"{name}=={rng.randint(0, 9)}.{rng.randint(0, 30)}" for name in rng.sample(PYTHON_PACKAGES, rng.randint(2, 8)))
+        if "TypeScript" in languages or "JavaScript" in languages:
+            files["package.json"] = json.dumps({"name": f"{topic}-{index}", "dependencies": {name: "^1.0.0" for name in rng.sample(NPM_PACKAGES, rng.randint(2, 6))}})
+        if rng.random() < 0.1:
+            files["analysis.ipynb"] = json.dumps({"cells": [], "nbformat": 4})
+        readme = f"# {topic}-{index}\n\n" + "\n\n".join(_sentence(rng, rng.randint(8, 30)) for _ in range(rng.randint(5, 120)))
+        files["README.md"] = readme
+        repos.append({
+            "name": f"{topic}-{index}",
+            "description": _sentence(rng, rng.randint(4, 12)),
+            "fork": index >= size,
+            "private": rng.random() < 0.2,
+            "stargazers_count": int(rng.paretovariate(1.2)) - 1,
+            "forks_count": rng.randint(0, 15),
+            "subscribers_count": rng.randint(0, 10),
+            "languages": {language: rng.randint(1_000, 400_000) for language in languages},
+            "commits": [_sentence(rng, rng.randint(3, 12)) for _ in range(rng.randint(1, 30))],
+            "created_at": f"20{rng.randint(15, 23)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00Z",
+            "pushed_at": f"202{rng.randint(3, 5)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00Z",
+            "files": files,
+        })
+    rng.shuffle(repos)
+    return {"login": login, "repos": repos}
+
+
+class FakeService:
+    """
+    Kage: A threaded local HTTP server. Every request waits `latency` seconds plus up to
+    `jitter` more, and fails with `error_status` at `error_rate`. Subclasses answer
+    through handle().
+    """
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503, seed: int = 0):
+        self.latency = max(0.0, float(latency))
+        self.jitter = max(0.0, float(jitter))
+        self.error_rate = min(1.0, max(0.0, float(error_rate)))
+        self.error_status = int(error_status)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, payload = service._dispatch(self.command, self.path, self.headers, body)
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"{self.name}-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _dispatch(self, method: str, path: str, headers, body: bytes):
+        with self._rng_lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return self.error_status, {}, {"message": f"Injected failure of the {self.name} stand-in."}
+        parts = urlsplit(path)
+        return self.handle(method, unquote(parts.path), parse_qs(parts.query), headers, body)
+
+    def handle(self, method: str, path: str, query: dict, headers, body: bytes):
+        raise NotImplementedError
+
+
+class FakeGitHub(FakeService):
+    """Kage: The REST endpoints PyGithub calls for a listing, for the portfolios it was given."""
+    name = "github"
+    PER_PAGE = 30
+    RATE_LIMIT = 5000
+
+    def __init__(self, portfolios: dict, **kwargs):
+        """
+        Args:
+            portfolios (dict): Token -> synthetic_portfolio() result.
+        """
+        kwargs.setdefault("error_status", 502)
+        super().__init__(**kwargs)
+        self.portfolios = portfolios
+        self._by_full_name = {}
+        for portfolio in portfolios.values():
+            for repo in portfolio["repos"]:
+                self._by_full_name[f"{portfolio['login']}/{repo['name']}"] = (portfolio, repo)
+        self._remaining = self.RATE_LIMIT
+
+    def _rate_headers(self) -> dict:
+        with self._rng_lock:
+            self._remaining = self._remaining - 1 if self._remaining > 0 else self.RATE_LIMIT
+            return {"X-RateLimit-Limit": str(self.RATE_LIMIT), "X-RateLimit-Remaining": str(self._remaining)}
+
+    def _repo_json(self, portfolio: dict, repo: dict) -> dict:
+        full_name = f"{portfolio['login']}/{repo['name']}"
+        return {
+            "id": int(hashlib.sha1(full_name.encode()).hexdigest()[:8], 16),
+            "name": repo["name"],
+            "full_name": full_name,
+            "owner": {"login": portfolio["login"], "id": 1, "type": "User", "url": f"{self.url}/users/{portfolio['login']}"},
+            "private": repo.get("private", False),
+            "fork": repo.get("fork", False),
+            "description": repo.get("description", ""),
+            "url": f"{self.url}/repos/{full_name}",
+            "html_url": f"https://github.com/{full_name}",
+            "clone_url": f"https://github.com/{full_name}.git",
+            "stargazers_count": repo.get("stargazers_count", 0),
+            "watchers_count": repo.get("stargazers_count", 0),
+            "subscribers_count": repo.get("subscribers_count", 0),
+            "forks_count": repo.get("forks_count", 0),
+            "language": next(iter(repo.get("languages") or {}), None),
+            "default_branch": "main",
+            "created_at": repo.get("created_at", "2020-01-01T00:00:00Z"),
+            "updated_at": repo.get("pushed_at", "2024-01-01T00:00:00Z"),
+            "pushed_at": repo.get("pushed_at", "2024-01-01T00:00:00Z"),
+        }
+
+    def _content_json(self, full_name: str, path: str, content: str = None) -> dict:
+        entry = {
+            "type": "file", "name": path.rsplit("/", 1)[-1], "path": path,
+            "sha": hashlib.sha1(f"{full_name}/{path}".encode()).hexdigest(),
+            "url": f"{self.url}/repos/{full_name}/contents/{path}",
+        }
+        if content is not None:
+            encoded = content.encode("utf-8")
+            entry.update({"encoding": "base64", "size": len(encoded), "content": base64.b64encode(encoded).decode("ascii")})
+        return entry
+
+    def handle(self, method, path, query, headers, body):
+        token = (headers.get("Authorization") or "").split(" ")[-1]
+        portfolio = self.portfolios.get(token)
+        rate = self._rate_headers()
+        if portfolio is None:
+            return 401, rate, {"message": "Bad credentials"}
+
+        if path == "/user":
+            return 200, rate, {"login": portfolio["login"], "id": 1, "type": "User", "url": f"{self.url}/users/{portfolio['login']}"}
+
+        if path == "/user/repos":
+            page = int((query.get("page") or ["1"])[0])
+            per_page = int((query.get("per_page") or [self.PER_PAGE])[0])
+            repos = portfolio["repos"]
+            pages = max(1, -(-len(repos) // per_page))
+            links = []
+            if page < pages:
+                links.append(f'<{self.url}/user/repos?page={page + 1}&per_page={per_page}>; rel="next"')
+                links.append(f'<{self.url}/user/repos?page={pages}&per_page={per_page}>; rel="last"')
+            if links:
+                rate["Link"] = ", ".join(links)
+            window = repos[(page - 1) * per_page:page * per_page]
+            return 200, rate, [self._repo_json(portfolio, repo) for repo in window]
+
+        if not path.startswith("/repos/"):
+            return 404, rate, {"message": "Not Found"}
+        segments = path[len("/repos/"):].split("/")
+        full_name = "/".join(segments[:2])
+        found = self._by_full_name.get(full_name)
+        if found is None or found[0] is not portfolio:
+            return 404, rate, {"message": "Not Found"}
+        repo, rest = found[1], segments[2:]
+
+        if not rest:
+            return 200, rate, self._repo_json(portfolio, repo)
+        if rest == ["languages"]:
+            return 200, rate, repo.get("languages", {})
+        if rest == ["readme"]:
+            if "README.md" not in repo["files"]:
+                return 404, rate, {"message": "Not Found"}
+            return 200, rate, self._content_json(full_name, "README.md", repo["files"]["README.md"])
+        if rest == ["commits"]:
+            per_page = int((query.get("per_page") or [self.PER_PAGE])[0])
+            return 200, rate, [
+                {"sha": hashlib.sha1(f"{full_name}{index}".encode()).hexdigest(), "commit": {"message": message}}
+                for index, message in enumerate(repo.get("commits", [])[:per_page])
+            ]
+        if rest[0] == "contents":
+            file_path = "/".join(rest[1:]).strip("/")
+            if not file_path:
+                return 200, rate, [self._content_json(full_name, name) for name in sorted(repo["files"])]
+            if file_path not in repo["files"]:
+                return 404, rate, {"message": "Not Found"}
+            return 200, rate, self._content_json(full_name, file_path, repo["files"][file_path])
+        return 404, rate, {"message": "Not Found"}
+
+
+class FakeGemini(FakeService):
+    """
+    Kage: generateContent for the two prompts the application sends. A project
+    analysis prompt is answered with an analysis, anything else with a parsed CV.
+    Answers are derived from the prompt, so equal prompts get equal answers.
+    """
+    name = "gemini"
+
+    def handle(self, method, path, query, headers, body):
+        if method != "POST" or not path.endswith(":generateContent"):
+            return 404, {}, {"error": {"code": 404, "message": "Not Found"}}
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {}, {"error": {"code": 400, "message": "Invalid JSON payload."}}
+        prompt = "\n".join(
+            part.get("text", "")
+            for content in request.get("contents", []) for part in content.get("parts", []) if isinstance(part, dict)
+        )
+        rng = random.Random(hashlib.sha1(prompt.encode("utf-8", "ignore")).hexdigest())
+        answer = self._analysis(rng) if "Project Name:" in prompt else self._cv(rng)
+        text = json.dumps(answer)
+        prompt_tokens, answer_tokens = len(prompt) // 4 + 1, len(text) // 4 + 1
+        return 200, {}, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": answer_tokens, "totalTokenCount": prompt_tokens + answer_tokens},
+        }
+
+    @staticmethod
+    def _analysis(rng: random.Random) -> dict:
+        return {
+            "summary": _sentence(rng, rng.randint(15, 40)),
+            "skills": rng.sample(("API Design", "Testing", "Concurrency", "Data Modeling", "CI/CD", "Caching", "Observability", "Security"), 4),
+            "technologies": rng.sample(PYTHON_PACKAGES + NPM_PACKAGES, 5),
+            "achievements": [_sentence(rng, rng.randint(8, 16)) for _ in range(rng.randint(2, 5))],
+            "keywords": rng.sample(WORDS, 5),
+            "estimated_complexity_qualitative": rng.choice(("Low", "Medium", "High")),
+            "performance_metrics": {"accuracy": round(rng.uniform(0.7, 0.99), 3)} if rng.random() < 0.2 else {},
+        }
+
+    @staticmethod
+    def _cv(rng: random.Random) -> dict:
+        return {
+            "name": "Bench Candidate",
+            "professional_summary": _sentence(rng, rng.randint(20, 40)),
+            "user_defined_skills": rng.sample(("Python", "Go", "SQL", "Kubernetes", "Terraform", "React", "Rust"), 4),
+            "user_defined_technologies": rng.sample(PYTHON_PACKAGES, 4),
+            "spoken_languages": ["English"],
+            "work_experience": [
+                {
+                    "title": rng.choice(("Engineer", "Senior Engineer", "Developer")),
+                    "company": f"Company {rng.randint(1, 99)}",
+                    "start_date": f"20{rng.randint(10, 20)}",
+                    "end_date": "Present" if index == 0 else f"20{rng.randint(20, 23)}",
+                    "responsibilities": [_sentence(rng, rng.randint(6, 14)) for _ in range(3)],
+                }
+                for index in range(rng.randint(1, 4))
+            ],
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serves the GitHub and Gemini stand-ins until stdin closes.")
+    parser.add_argument("--sizes", default="10,100,1000", help="Portfolio sizes, comma-separated.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--github-latency", type=float, default=0.0, help="Seconds added to every GitHub call.")
+    parser.add_argument("--gemini-latency", type=float, default=0.0, help="Seconds added to every Gemini call.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many more seconds, at random.")
+    parser.add_argument("--github-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    portfolios = {bench_token(size): synthetic_portfolio(size, seed=args.seed) for size in sizes}
+    github = FakeGitHub(portfolios, latency=args.github_latency, jitter=args.jitter, error_rate=args.github_error_rate, seed=args.seed).start()
+    gemini = FakeGemini(latency=args.gemini_latency, jitter=args.jitter, error_rate=args.gemini_error_rate, seed=args.seed).start()
+    print(json.dumps({"github": github.url, "gemini": gemini.url}), flush=True)
+    try:
+        sys.stdin.read()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        github.stop()
+        gemini.stop()
+        print(json.dumps({
+            "github": {"requests": github.requests, "errors": github.errors},
+            "gemini": {"requests": gemini.requests, "errors": gemini.errors},
+        }), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
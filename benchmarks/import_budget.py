@@ -0,0 +1,105 @@
+# benchmarks/import_budget.py
+"""
+Kage: The cold start budget. Imports the application in a fresh interpreter,
+exactly as the server would, and fails when the import grows too slow or pulls
+in a module that should only load on first use.
+
+Run from the repository root:
+
+    python benchmarks/import_budget.py [--budget-ms 1500] [--runs 3]
+
+Exit status 1 means the budget was broken.
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the application must not import at load time. Each belongs to a path
+# that builds it on demand: GitHub listings, document forging, CV extraction, Firestore.
+DEFERRED_MODULES = (
+    "github",
+    "docx",
+    "pypdf",
+    "yaml",
+    "toml",
+    "google.cloud.firestore",
+    "grpc",
+    "app.services.github_listener",
+    "app.services.cv_writer",
+)
+
+# Kage: Prints the deferred modules that were imported anyway, one per line.
+PROBE = (
+    "import sys, app.main\n"
+    "for name in sys.argv[1:]:\n"
+    "    if name in sys.modules: print(name)\n"
+)
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_import(module: str = "app.main") -> tuple:
+    """
+    Kage: Imports a module under -X importtime in a fresh interpreter.
+
+    Returns:
+        tuple: (total milliseconds, the ten slowest top-level imports as (ms, name) pairs).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        # Top-level entries are indented by a single space; nested ones by more.
+        if match and len(match.group(3)) == 1:
+            top_level.append((int(match.group(2)) / 1000, match.group(4)))
+    total = sum(ms for ms, _ in top_level)
+    return total, sorted(top_level, reverse=True)[:10]
+
+
+def eager_deferred_modules() -> list:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, *DEFERRED_MODULES],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{result.stderr[-2000:]}")
+    return result.stdout.split()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Checks the import-time budget of the application.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", 1500)))
+    parser.add_argument("--runs", type=int, default=3, help="The best of this many runs is judged.")
+    args = parser.parse_args(argv)
+
+    failed = False
+    eager = eager_deferred_modules()
+    if eager:
+        print(f"[Kage Budget] Imported at load time but meant for first use: {', '.join(eager)}")
+        failed = True
+
+    runs = [measure_import() for _ in range(max(1, args.runs))]
+    total, slowest = min(runs, key=lambda run: run[0])
+    print(f"[Kage Budget] import app.main: {total:.0f} ms (budget {args.budget_ms:.0f} ms, best of {len(runs)})")
+    for ms, name in slowest:
+        print(f"    {ms:8.1f} ms  {name}")
+    if total > args.budget_ms:
+        print("[Kage Budget] Over budget.")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# tests/test_mailer.py
+
+import time
+import socket
+import asyncio
+
+import pytest
+
+controller_module = pytest.importorskip("aiosmtpd.controller")
+from aiosmtpd.smtp import AuthResult
+
+from app.services.mailer import MailQueue
+
+
+class RecordingHandler:
+    """Kage: Accepts every message and remembers which connection carried it."""
+    def __init__(self):
+        self.deliveries = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.deliveries.append((session.peer, envelope.rcpt_tos))
+        return "250 Message accepted"
+
+
+def _accept_any_login(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = controller_module.Controller(
+        handler, hostname="127.0.0.1", port=_free_port(),
+        authenticator=_accept_any_login, auth_require_tls=False,
+    )
+    controller.start()
+    try:
+        yield handler, controller.port
+    finally:
+        controller.stop()
+
+
+async def _wait_for(handler: RecordingHandler, count: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while len(handler.deliveries) < count:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"{len(handler.deliveries)}/{count} messages delivered in {timeout}s.")
+        await asyncio.sleep(0.05)
+
+
+def test_queued_mail_is_delivered_over_one_reused_connection(smtp_server):
+    handler, port = smtp_server
+    mail_queue = MailQueue("127.0.0.1", port, "kage", "secret", "no-reply@kaku-ryu.com",
+                           use_starttls=False, max_attempts=1, timeout=5.0)
+
+    async def scenario():
+        mail_queue.start()
+        try:
+            for index in range(3):
+                mail_queue.send(f"user{index}@example.com", "Validation", f"Message {index}")
+            await _wait_for(handler, 3)
+            # A later message, in a batch of its own, goes out over the connection left open.
+            mail_queue.send("late@example.com", "Validation", "Late message")
+            await _wait_for(handler, 4)
+        finally:
+            await mail_queue.stop()
+
+    asyncio.run(scenario())
+
+    recipients = [rcpt_tos for _, rcpt_tos in handler.deliveries]
+    assert recipients == [["user0@example.com"], ["user1@example.com"], ["user2@example.com"], ["late@example.com"]]
+    assert len({peer for peer, _ in handler.deliveries}) == 1